@@ -3,6 +3,8 @@ from flask_cors import CORS
 from pymongo import MongoClient
 import os
 from dotenv import load_dotenv
+from app.services.camera import parse_camera_config, get_camera_manager
+from app.services.tracking import UNKNOWN_RECHECK_SECONDS
 
 # Load environment variables
 load_dotenv()
@@ -11,6 +13,38 @@ load_dotenv()
 mongo_client = None
 db = None
 
+def connect_db(config):
+    """Connect to MongoDB and create indexes; leaves db as None when unreachable"""
+    global mongo_client, db
+    try:
+        mongo_client = MongoClient(config['MONGO_URI'], serverSelectionTimeoutMS=config['MONGO_TIMEOUT_MS'])
+        db = mongo_client[config['DATABASE_NAME']]
+        
+        # Test database connection
+        mongo_client.server_info()
+        print("✓ MongoDB connected successfully!")
+        
+        # Create indexes for better performance
+        db['victims'].create_index('name')
+        db['victims'].create_index([('status', 1), ('_id', 1)])
+        # Lets an interrupted bulk import resume without duplicating rows
+        db['victims'].create_index([('import_id', 1), ('import_row', 1)], unique=True, sparse=True)
+        # Keyset pagination sorts detections on (timestamp, _id), newest first
+        db['detections'].create_index([('timestamp', -1), ('_id', -1)])
+        db['detections'].create_index([('person_id', 1), ('timestamp', -1), ('_id', -1)])
+        db['detections'].create_index([('camera_id', 1), ('timestamp', -1), ('_id', -1)])
+        db['detections'].create_index([('location', 1), ('timestamp', -1), ('_id', -1)])
+        db['embeddings'].create_index(
+            [('photo_filename', 1), ('model_name', 1), ('detector_backend', 1)],
+            unique=True
+        )
+        
+    except Exception as e:
+        print(f"✗ MongoDB connection failed: {e}")
+        db = None
+    
+    return db
+
 def create_app(config_name='development'):
     """Application factory pattern"""
     app = Flask(__name__)
@@ -19,7 +53,9 @@ def create_app(config_name='development'):
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
     app.config['MONGO_URI'] = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
     app.config['DATABASE_NAME'] = os.getenv('DATABASE_NAME', 'missing_persons_db')
+    app.config['MONGO_TIMEOUT_MS'] = int(os.getenv('MONGO_TIMEOUT_MS', '5000'))
     app.config['UPLOAD_FOLDER'] = os.path.join(app.root_path, 'static', 'uploads')
+    app.config['EMBEDDINGS_FOLDER'] = os.getenv('EMBEDDINGS_FOLDER', os.path.join(app.instance_path, 'embeddings'))
     app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 16777216))
     app.config['DETECTION_COOLDOWN'] = int(os.getenv('DETECTION_COOLDOWN', 10))
     
@@ -28,35 +64,110 @@ def create_app(config_name='development'):
     app.config['DETECTOR_BACKEND'] = os.getenv('DETECTOR_BACKEND', 'opencv')
     app.config['RECOGNITION_THRESHOLD'] = float(os.getenv('RECOGNITION_THRESHOLD', '0.50'))
     app.config['DISTANCE_METRIC'] = os.getenv('DISTANCE_METRIC', 'cosine')
+    app.config['MATCH_TOP_K'] = int(os.getenv('MATCH_TOP_K', '5'))
+    app.config['PRELOAD_MODELS'] = os.getenv('PRELOAD_MODELS', 'true').lower() == 'true'
+    app.config['WARMUP_MODELS'] = os.getenv('WARMUP_MODELS', 'true').lower() == 'true'
+    
+    # Gallery search index: 'exact' matrix scan or 'ivf' approximate index
+    app.config['SEARCH_INDEX'] = os.getenv('SEARCH_INDEX', 'exact')
+    app.config['ANN_NLIST'] = int(os.getenv('ANN_NLIST', '0'))
+    app.config['ANN_NPROBE'] = int(os.getenv('ANN_NPROBE', '8'))
+    app.config['ANN_EXACT_THRESHOLD'] = int(os.getenv('ANN_EXACT_THRESHOLD', '10000'))
+    app.config['ANN_INDEX_PATH'] = os.path.join(
+        app.config['EMBEDDINGS_FOLDER'], f"ivf_{app.config['DEEPFACE_MODEL']}_{app.config['DISTANCE_METRIC']}.npz"
+    )
+    
+    # Home page stats from rolled-up counters kept by the detection writer (constant-time)
+    app.config['STATS_COUNTERS'] = os.getenv('STATS_COUNTERS', 'false').lower() == 'true'
+    
+    # Gallery hot-reload: 'auto' uses Mongo change streams when available, 'poll' always polls
+    app.config['GALLERY_WATCH'] = os.getenv('GALLERY_WATCH', 'auto')
+    app.config['GALLERY_POLL_SECONDS'] = float(os.getenv('GALLERY_POLL_SECONDS', '2.0'))
+    
+    # Detection events are written in batches by a background writer
+    app.config['EVENT_QUEUE_SIZE'] = int(os.getenv('EVENT_QUEUE_SIZE', '10000'))
+    app.config['EVENT_BATCH_SIZE'] = int(os.getenv('EVENT_BATCH_SIZE', '500'))
+    app.config['EVENT_FLUSH_SECONDS'] = float(os.getenv('EVENT_FLUSH_SECONDS', '0.5'))
+    app.config['EVENT_RETRY_SECONDS'] = float(os.getenv('EVENT_RETRY_SECONDS', '5.0'))
+    app.config['EVENT_SPILL_PATH'] = os.getenv(
+        'EVENT_SPILL_PATH', os.path.join(app.instance_path, 'spill', 'detections.jsonl')
+    )
+    
+    # Unknown-face sightings kept for retro-search when a person is registered later
+    app.config['SIGHTINGS'] = os.getenv('SIGHTINGS', 'true').lower() == 'true'
+    app.config['SIGHTINGS_FOLDER'] = os.getenv('SIGHTINGS_FOLDER', os.path.join(app.instance_path, 'sightings'))
+    app.config['SIGHTING_INTERVAL_SECONDS'] = float(os.getenv('SIGHTING_INTERVAL_SECONDS', '5.0'))
+    app.config['RETRO_GROUP_SECONDS'] = float(os.getenv('RETRO_GROUP_SECONDS', '60.0'))
+    
+    # Offline search of recorded footage
+    app.config['VIDEO_SEARCH_FOLDER'] = os.getenv('VIDEO_SEARCH_FOLDER', os.path.join(app.instance_path, 'videos'))
+    app.config['VIDEO_SEARCH_FPS'] = float(os.getenv('VIDEO_SEARCH_FPS', '2.0'))
+    app.config['VIDEO_SEARCH_WORKERS'] = int(os.getenv('VIDEO_SEARCH_WORKERS', '0'))
+    
+    # Uploaded photos are stored downscaled, with thumbnails for the dashboard
+    app.config['IMAGE_MAX_SIZE'] = int(os.getenv('IMAGE_MAX_SIZE', '1024'))
+    app.config['THUMBNAIL_SIZE'] = int(os.getenv('THUMBNAIL_SIZE', '320'))
+    app.config['PHOTO_CACHE_SECONDS'] = int(os.getenv('PHOTO_CACHE_SECONDS', str(365 * 24 * 3600)))
+    
+    # In-process background jobs (registration, face checks)
+    app.config['JOB_WORKERS'] = int(os.getenv('JOB_WORKERS', '2'))
+    app.config['JOB_HISTORY'] = int(os.getenv('JOB_HISTORY', '1000'))
+    
+    # Bulk registration imports (a ZIP or CSV plus images)
+    app.config['IMPORT_FOLDER'] = os.getenv('IMPORT_FOLDER', os.path.join(app.instance_path, 'imports'))
+    app.config['IMPORT_WORKERS'] = int(os.getenv('IMPORT_WORKERS', '0'))
+    app.config['IMPORT_CHUNK_SIZE'] = int(os.getenv('IMPORT_CHUNK_SIZE', '32'))
     
     # Camera Configuration (NEW)
     app.config['CAMERA_INDEX'] = int(os.getenv('CAMERA_INDEX', '0'))
     app.config['MIRROR_CAMERA'] = os.getenv('MIRROR_CAMERA', 'true').lower() == 'true'
+    app.config['CAMERAS'] = parse_camera_config(
+        os.getenv('CAMERAS'), app.config['CAMERA_INDEX'], app.config['MIRROR_CAMERA']
+    )
     app.config['SKIP_DETECTION_FRAMES'] = int(os.getenv('SKIP_DETECTION_FRAMES', '5'))
+    app.config['DETECTION_MIN_INTERVAL'] = float(os.getenv('DETECTION_MIN_INTERVAL', '0'))
+    app.config['DETECTION_MAX_INTERVAL'] = float(os.getenv('DETECTION_MAX_INTERVAL', '2.0'))
+    # Off: cameras and detection run only while a /video_feed viewer is connected
+    app.config['ALWAYS_ON_DETECTION'] = os.getenv('ALWAYS_ON_DETECTION', 'false').lower() == 'true'
+    
+    # Motion / face-presence gate in front of the recognizer (per-camera overrides in CAMERAS)
+    app.config['MOTION_GATE'] = os.getenv('MOTION_GATE', 'true').lower() == 'true'
+    app.config['MOTION_METHOD'] = os.getenv('MOTION_METHOD', 'diff')
+    app.config['MOTION_THRESHOLD'] = float(os.getenv('MOTION_THRESHOLD', '0.01'))
+    app.config['FACE_PRESENCE_CHECK'] = os.getenv('FACE_PRESENCE_CHECK', 'false').lower() == 'true'
+    
+    # Face tracking: recognize new tracks, re-check known ones periodically
+    app.config['TRACK_IOU_THRESHOLD'] = float(os.getenv('TRACK_IOU_THRESHOLD', '0.3'))
+    app.config['TRACK_MAX_MISSED'] = int(os.getenv('TRACK_MAX_MISSED', '5'))
+    app.config['TRACK_RECHECK_SECONDS'] = float(os.getenv('TRACK_RECHECK_SECONDS', '5.0'))
+    app.config['TRACK_UNKNOWN_RECHECK_SECONDS'] = float(os.getenv('TRACK_UNKNOWN_RECHECK_SECONDS', str(UNKNOWN_RECHECK_SECONDS)))
+    
+    # Temporal voting: a track must match the same person in VOTE_MIN of its last VOTE_WINDOW frames
+    app.config['VOTE_WINDOW'] = int(os.getenv('VOTE_WINDOW', '5'))
+    app.config['VOTE_MIN'] = int(os.getenv('VOTE_MIN', '3'))
+    app.config['VOTE_MAX_AGE_SECONDS'] = float(os.getenv('VOTE_MAX_AGE_SECONDS', '10.0'))
+    
+    # Inference backend: 'thread' (in-process) or 'process' (worker pool + shared memory)
+    app.config['INFERENCE_BACKEND'] = os.getenv('INFERENCE_BACKEND', 'thread')
+    app.config['INFERENCE_WORKERS'] = int(os.getenv('INFERENCE_WORKERS', '0'))
+    
+    # Cross-camera batched recognition (thread backend)
+    app.config['BATCH_INFERENCE'] = os.getenv('BATCH_INFERENCE', 'true').lower() == 'true'
+    app.config['BATCH_WINDOW_MS'] = int(os.getenv('BATCH_WINDOW_MS', '50'))
+    app.config['MAX_BATCH_SIZE'] = int(os.getenv('MAX_BATCH_SIZE', '32'))
+    app.config['MAX_PENDING_PER_CAMERA'] = int(os.getenv('MAX_PENDING_PER_CAMERA', '1'))
     
     # Enable CORS
     CORS(app)
     
-    # Initialize MongoDB
-    global mongo_client, db
-    try:
-        mongo_client = MongoClient(app.config['MONGO_URI'])
-        db = mongo_client[app.config['DATABASE_NAME']]
-        
-        # Test database connection
-        mongo_client.server_info()
-        print("✓ MongoDB connected successfully!")
-        
-        # Create indexes for better performance
-        db['victims'].create_index('name')
-        db['detections'].create_index([('person_id', 1), ('timestamp', -1)])
-        
-    except Exception as e:
-        print(f"✗ MongoDB connection failed: {e}")
-        db = None
+    # Initialize MongoDB (the detection writer reconnects later if this fails)
+    connect_db(app.config)
     
-    # Create upload folder
+    # Create upload, embedding and video folders
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    os.makedirs(app.config['EMBEDDINGS_FOLDER'], exist_ok=True)
+    os.makedirs(app.config['VIDEO_SEARCH_FOLDER'], exist_ok=True)
+    os.makedirs(app.config['IMPORT_FOLDER'], exist_ok=True)
     
     # Print configuration for debugging
     print("\n" + "="*50)
@@ -65,8 +176,12 @@ def create_app(config_name='development'):
     print(f"  Detector: {app.config['DETECTOR_BACKEND']}")
     print(f"  Threshold: {app.config['RECOGNITION_THRESHOLD']}")
     print(f"  Distance Metric: {app.config['DISTANCE_METRIC']}")
+    print(f"  Search Index: {app.config['SEARCH_INDEX']}")
+    print(f"  Inference Backend: {app.config['INFERENCE_BACKEND']}")
     print(f"  Camera Index: {app.config['CAMERA_INDEX']}")
     print(f"  Mirror Camera: {app.config['MIRROR_CAMERA']}")
+    for cam in app.config['CAMERAS']:
+        print(f"  Camera {cam['id']}: {cam['source']} ({cam['location']})")
     print("="*50 + "\n")
     
     # Register blueprints
@@ -76,4 +191,17 @@ def create_app(config_name='development'):
     app.register_blueprint(main_bp)
     app.register_blueprint(api_bp, url_prefix='/api/v1')
     
+    # Command line tools (flask search-video ...)
+    from app.cli import search_video_command, import_persons_command
+    app.cli.add_command(search_video_command)
+    app.cli.add_command(import_persons_command)
+    
+    # Load the face models once, before the first request
+    from app.services.registry import init_face_service
+    init_face_service(app)
+    
+    # Watch every camera from startup instead of only while it is viewed
+    if app.config['ALWAYS_ON_DETECTION']:
+        get_camera_manager(app).start_monitoring()
+    
     return app
@@ -1,19 +1,96 @@
-from flask import Blueprint, jsonify, request, current_app
-from app.models.person import Person, Detection
-from app.services.search import FaceSearchService
-from app.utils.helpers import save_uploaded_file
 import os
+import zipfile
+from datetime import datetime
+from flask import Blueprint, Response, jsonify, request, current_app, url_for
+from werkzeug.utils import secure_filename
+from app.models.person import Person, Detection
+from app.services.registry import get_face_service, get_service_status
+from app.services.gallery import get_gallery_stats
+from app.services.events import get_writer_stats
+from app.services.broker import get_event_broker
+from app.services.jobs import get_job_queue, get_job_stats
+from app.services.registration import check_face, submit_registration
+from app.utils.helpers import decode_uploaded_image, remove_stored_image, save_uploaded_file
+from app.utils.pagination import (
+    PaginationError, decode_cursor, encode_cursor, parse_fields, parse_limit, parse_time
+)
 
 api_bp = Blueprint('api', __name__)
 
+PERSON_FIELDS = ('name', 'age', 'contact', 'photo_path', 'description', 'registered_date',
+                 'status', 'last_seen_location', 'last_seen_time')
+DETECTION_FIELDS = ('person_id', 'person_name', 'camera_id', 'location', 'confidence', 'timestamp',
+                    'track_id', 'min_distance', 'mean_distance', 'frame_count')
+
+@api_bp.errorhandler(PaginationError)
+def pagination_error(e):
+    return jsonify({'error': str(e)}), 400
+
+def _page_response(items, next_cursor):
+    """JSON list of a page; the next page's cursor goes in X-Next-Cursor and Link"""
+    response = jsonify(items)
+    if next_cursor:
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{url_for(request.endpoint, **args)}>; rel="next"'
+    return response
+
+def _job_response(job):
+    """202 with the id and status URL of a queued job"""
+    return jsonify({
+        'job_id': job.job_id,
+        'status': job.status,
+        'status_url': url_for('api.get_job', job_id=job.job_id)
+    }), 202
+
 @api_bp.route('/persons', methods=['GET'])
 def get_persons():
-    """API: Get all registered persons"""
-    persons = Person.get_all()
+    """API: Page through registered persons (?status=&fields=&limit=&cursor=)"""
+    limit = parse_limit(request.args.get('limit', type=int), 100)
+    projection = parse_fields(request.args.get('fields'), PERSON_FIELDS)
+    cursor = request.args.get('cursor')
+    after = decode_cursor(cursor) if cursor else None
+    if after is not None:
+        if len(after) != 1:
+            raise PaginationError('Invalid cursor')
+        after = after[0]
+    
+    persons = Person.find_page(
+        status=request.args.get('status'), projection=projection, limit=limit + 1, after=after
+    )
+    next_cursor = encode_cursor([persons[limit - 1]['_id']]) if len(persons) > limit else None
+    
+    persons = persons[:limit]
     # Convert ObjectId to string
     for person in persons:
         person['_id'] = str(person['_id'])
-    return jsonify(persons)
+    return _page_response(persons, next_cursor)
+
+@api_bp.route('/persons', methods=['POST'])
+def register_person():
+    """API: Register a missing person (multipart name, age, contact, description, photo)
+    
+    The photo is checked and embedded in the background; poll the returned status_url.
+    The job result holds the new person_id.
+    """
+    name = request.form.get('name')
+    age = request.form.get('age')
+    contact = request.form.get('contact')
+    photo = request.files.get('photo')
+    if not all([name, age, contact, photo]):
+        return jsonify({'error': 'name, age, contact and photo are required'}), 400
+    
+    filename, filepath, image = save_uploaded_file(
+        photo, current_app.config['UPLOAD_FOLDER'],
+        max_size=current_app.config['IMAGE_MAX_SIZE'], thumb_size=current_app.config['THUMBNAIL_SIZE']
+    )
+    if not filename:
+        return jsonify({'error': 'Invalid file type'}), 400
+    
+    job = submit_registration(current_app._get_current_object(), name, age, contact,
+                              request.form.get('description', ''), filename, filepath, image)
+    return _job_response(job)
 
 @api_bp.route('/persons/<person_id>', methods=['GET'])
 def get_person(person_id):
@@ -24,18 +101,213 @@ def get_person(person_id):
         return jsonify(person)
     return jsonify({'error': 'Person not found'}), 404
 
+@api_bp.route('/persons/<person_id>', methods=['DELETE'])
+def delete_person(person_id):
+    """API: Delete a person and drop them from the face gallery"""
+    person = Person.get_by_id(person_id)
+    if not person:
+        return jsonify({'error': 'Person not found'}), 404
+    
+    Person.delete(person_id)
+    
+    # The person is gone either way; a service still loading only ever matches persons in the database
+    try:
+        get_face_service().remove_photo(person['photo_path'])
+    except Exception as e:
+        print(f"✗ Could not remove {person['photo_path']} from the face gallery: {e}")
+    try:
+        # The canonical photo, its face crop and thumbnails
+        remove_stored_image(current_app.config['UPLOAD_FOLDER'], person['photo_path'])
+    except OSError as e:
+        print(f"✗ Could not remove the stored photo {person['photo_path']}: {e}")
+    
+    return jsonify({'deleted': True})
+
+@api_bp.route('/persons/<person_id>/status', methods=['PUT'])
+def update_person_status(person_id):
+    """API: Mark a person missing or found (found persons leave the gallery)"""
+    status = (request.get_json(silent=True) or {}).get('status')
+    if status not in ('missing', 'found'):
+        return jsonify({'error': "status must be 'missing' or 'found'"}), 400
+    
+    if not Person.get_by_id(person_id):
+        return jsonify({'error': 'Person not found'}), 404
+    
+    Person.update_status(person_id, status)
+    return jsonify({'_id': person_id, 'status': status})
+
+@api_bp.route('/persons/<person_id>/retro_search', methods=['POST'])
+def start_retro_search(person_id):
+    """API: Search past unknown-face sightings for a person (runs in the background)
+    
+    Safe to repeat: detections already logged for the same sightings are not stored again.
+    """
+    from app.services.sightings import get_retro_search
+    
+    person = Person.get_by_id(person_id)
+    if not person:
+        return jsonify({'error': 'Person not found'}), 404
+    
+    retro_search = get_retro_search(current_app._get_current_object())
+    if retro_search is None:
+        return jsonify({'error': 'Sighting store is disabled'}), 409
+    
+    embedding = get_face_service().embedding_store.get(person['photo_path'])
+    if embedding is None:
+        return jsonify({'error': 'No embedding for this person yet'}), 409
+    
+    retro_search.submit(person_id, person['name'], embedding)
+    return jsonify(retro_search.result(person_id)), 202
+
+@api_bp.route('/persons/<person_id>/retro_search', methods=['GET'])
+def get_retro_search_result(person_id):
+    """API: Status of the last retro-search for a person"""
+    from app.services.sightings import get_retro_search
+    
+    retro_search = get_retro_search(current_app._get_current_object())
+    result = retro_search.result(person_id) if retro_search is not None else None
+    if result is None:
+        return jsonify({'error': 'No retro-search for this person'}), 404
+    return jsonify(result)
+
+@api_bp.route('/persons/import', methods=['POST'])
+def import_persons():
+    """API: Bulk-register persons in the background
+    
+    Send a ZIP `archive` holding a CSV (name, age, contact, description, photo)
+    and the photos, or a `csv` file plus the `images`. Poll the returned status_url.
+    """
+    from app.services.bulk_import import get_import_manager
+    
+    archive = request.files.get('archive')
+    csv_file = request.files.get('csv')
+    manager = get_import_manager(current_app._get_current_object())
+    
+    try:
+        if archive and archive.filename:
+            job = manager.create(archive=archive.stream)
+        elif csv_file and csv_file.filename:
+            job = manager.create(csv_file=csv_file, images=request.files.getlist('images'))
+        else:
+            return jsonify({'error': 'Send a ZIP archive or a CSV file with images'}), 400
+    except (ValueError, zipfile.BadZipFile) as e:
+        return jsonify({'error': f"Invalid import: {e}"}), 400
+    
+    return jsonify({
+        'import_id': job.import_id,
+        'status': job.status,
+        'status_url': url_for('api.get_import', import_id=job.import_id)
+    }), 202
+
+@api_bp.route('/persons/import/<import_id>', methods=['GET'])
+def get_import(import_id):
+    """API: Progress and per-row failures of a bulk import"""
+    from app.services.bulk_import import get_import_manager
+    
+    result = get_import_manager(current_app._get_current_object()).get(import_id)
+    if result is None:
+        return jsonify({'error': 'Import not found'}), 404
+    return jsonify(result)
+
+@api_bp.route('/persons/import/<import_id>/resume', methods=['POST'])
+def resume_import(import_id):
+    """API: Re-run an import; rows already stored are skipped"""
+    from app.services.bulk_import import get_import_manager
+    
+    job = get_import_manager(current_app._get_current_object()).start(import_id)
+    if job is None:
+        return jsonify({'error': 'Import not found'}), 404
+    return jsonify({
+        'import_id': job.import_id,
+        'status': job.status,
+        'status_url': url_for('api.get_import', import_id=job.import_id)
+    }), 202
+
 @api_bp.route('/detections', methods=['GET'])
 def get_detections():
-    """API: Get recent detections"""
-    limit = request.args.get('limit', 50, type=int)
-    detections = Detection.get_recent(limit=limit)
+    """API: Page through detections, newest first
+    
+    Filters: person_id, camera_id, location, since, until (ISO 8601).
+    Paging: limit, cursor (from X-Next-Cursor), fields.
+    """
+    limit = parse_limit(request.args.get('limit', type=int), 50)
+    fields = request.args.get('fields')
+    # _id and timestamp form the page key, so they are always returned
+    projection = parse_fields(fields, DETECTION_FIELDS, always=('_id', 'timestamp'))
+    join = projection is None or 'person_name' in projection
+    if projection is not None:
+        projection.pop('person_name', None)
+        if join:
+            projection['person_id'] = 1
+    
+    cursor = request.args.get('cursor')
+    after = decode_cursor(cursor) if cursor else None
+    if after is not None and len(after) != 2:
+        raise PaginationError('Invalid cursor')
+    
+    filters = {
+        'person_id': request.args.get('person_id'),
+        'camera_id': request.args.get('camera_id'),
+        'location': request.args.get('location'),
+        'since': parse_time(request.args.get('since')),
+        'until': parse_time(request.args.get('until'))
+    }
+    detections = Detection.find_page(filters, projection=projection, limit=limit + 1, after=after)
+    
+    next_cursor = None
+    if len(detections) > limit:
+        last = detections[limit - 1]
+        next_cursor = encode_cursor([last['timestamp'], last['_id']])
+    
+    detections = detections[:limit]
+    if join:
+        Detection.join_persons(detections)
+        if projection is not None:
+            for detection in detections:
+                detection.pop('person', None)
     
     for detection in detections:
         detection['_id'] = str(detection['_id'])
-        person = Person.get_by_id(detection['person_id'])
-        detection['person_name'] = person['name'] if person else 'Unknown'
     
-    return jsonify(detections)
+    return _page_response(detections, next_cursor)
+
+@api_bp.route('/detections/stream', methods=['GET'])
+def stream_detections():
+    """API: Live detection events as Server-Sent Events, or NDJSON with ?format=ndjson
+    
+    Optional filters: camera_id, person_id. Resume with the Last-Event-ID
+    header (sent by EventSource on reconnect) or ?last_event_id=.
+    """
+    ndjson = (request.args.get('format') == 'ndjson' or
+              request.accept_mimetypes.best == 'application/x-ndjson')
+    subscription = get_event_broker().subscribe(
+        last_event_id=request.headers.get('Last-Event-ID') or request.args.get('last_event_id'),
+        camera_id=request.args.get('camera_id'),
+        person_id=request.args.get('person_id')
+    )
+    
+    def generate():
+        try:
+            if not ndjson:
+                yield 'retry: 3000\n\n'
+            while True:
+                items = subscription.get(timeout=15.0)
+                if not items:
+                    # Keep proxies and clients from timing out an idle stream
+                    yield '\n' if ndjson else ': keepalive\n\n'
+                    continue
+                if ndjson:
+                    yield ''.join(f'{data}\n' for _, data in items)
+                else:
+                    yield ''.join(f'id: {event_id}\nevent: detection\ndata: {data}\n\n'
+                                  for event_id, data in items)
+        finally:
+            subscription.close()
+    
+    response = Response(generate(), mimetype='application/x-ndjson' if ndjson else 'text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @api_bp.route('/detections/person/<person_id>', methods=['GET'])
 def get_person_detections(person_id):
@@ -49,29 +321,137 @@ def get_person_detections(person_id):
 
 @api_bp.route('/verify_face', methods=['POST'])
 def verify_face():
-    """API: Verify if uploaded image contains a face"""
+    """API: Check in the background whether an uploaded image contains a face"""
     if 'photo' not in request.files:
         return jsonify({'error': 'No photo provided'}), 400
     
-    photo = request.files['photo']
-    filename, filepath = save_uploaded_file(photo, current_app.config['UPLOAD_FOLDER'])
+    # Decoded in memory: nothing is written to the upload folder
+    image = decode_uploaded_image(request.files['photo'])
     
-    if not filename:
+    if image is None:
         return jsonify({'error': 'Invalid file type'}), 400
     
-    service = FaceSearchService()
-    has_face = service.verify_face_in_image(filepath)
+    # Detection runs in the background; poll the returned status_url for has_face
+    job = get_job_queue(current_app._get_current_object()).submit(
+        'verify_face', check_face, current_app._get_current_object(), image
+    )
+    return _job_response(job)
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """API: Status and result of a background job"""
+    job = get_job_queue(current_app._get_current_object()).get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@api_bp.route('/stats', methods=['GET'])
+def get_detection_stats():
+    """API: Person and detection counts"""
+    from app.services.stats import get_stats
+    hours = request.args.get('hours', 24, type=int)
+    return jsonify(get_stats(current_app.config.get('STATS_COUNTERS', False), recent_hours=hours))
+
+@api_bp.route('/search_video', methods=['POST'])
+def search_video():
+    """API: Start a background search of a recorded video
     
-    # Clean up
-    os.remove(filepath)
+    Send the file as multipart `video`, or `path` relative to VIDEO_SEARCH_FOLDER.
+    Options: sample_fps, workers, threshold. Poll the returned status_url.
+    Each worker loads its own model, so workers is capped at VIDEO_SEARCH_WORKERS
+    (or the CPU count). Uploaded videos are deleted when the job ends.
+    """
+    from app.services.video_search import get_video_search_manager
     
-    return jsonify({'has_face': has_face})
+    folder = os.path.realpath(current_app.config['VIDEO_SEARCH_FOLDER'])
+    params = request.get_json(silent=True) or request.form
+    video = request.files.get('video')
+    
+    try:
+        max_workers = current_app.config['VIDEO_SEARCH_WORKERS'] or os.cpu_count() or 1
+        workers = int(params['workers']) if params.get('workers') not in (None, '') else None
+        if workers is not None and workers <= 0:
+            raise ValueError(workers)
+        options = {
+            'sample_fps': float(params.get('sample_fps', current_app.config['VIDEO_SEARCH_FPS'])),
+            'workers': min(workers, max_workers) if workers else current_app.config['VIDEO_SEARCH_WORKERS'] or None,
+            'threshold': float(params['threshold']) if params.get('threshold') else None
+        }
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid sample_fps, workers or threshold'}), 400
+    
+    if video and video.filename:
+        filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{secure_filename(video.filename)}"
+        path = os.path.join(folder, filename)
+        video.save(path)
+        options['remove_video'] = True
+    elif params.get('path'):
+        path = os.path.realpath(os.path.join(folder, params['path']))
+        # Only footage under the video folder can be scanned
+        if os.path.commonpath([folder, path]) != folder or not os.path.isfile(path):
+            return jsonify({'error': 'Video not found'}), 404
+    else:
+        return jsonify({'error': 'Send a video file or a path'}), 400
+    
+    job = get_video_search_manager(current_app._get_current_object()).submit(path, **options)
+    return jsonify({
+        'job_id': job.job_id,
+        'status': job.status,
+        'status_url': url_for('api.get_video_search', job_id=job.job_id)
+    }), 202
+
+@api_bp.route('/search_video/<job_id>', methods=['GET'])
+def get_video_search(job_id):
+    """API: Status and match timeline of a video search (?timeline=0 for status only)"""
+    from app.services.video_search import get_video_search_manager
+    
+    job = get_video_search_manager(current_app._get_current_object()).get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict(include_timeline=request.args.get('timeline', '1') != '0'))
+
+@api_bp.route('/search_video/<job_id>', methods=['DELETE'])
+def cancel_video_search(job_id):
+    """API: Cancel a running video search"""
+    from app.services.video_search import get_video_search_manager
+    
+    job = get_video_search_manager(current_app._get_current_object()).get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    job.cancel()
+    return jsonify({'job_id': job_id, 'cancelled': True})
+
+@api_bp.route('/cameras', methods=['GET'])
+def get_cameras():
+    """API: Configured cameras and their capture/detection state"""
+    from app.services.camera import get_camera_manager
+    return jsonify(get_camera_manager(current_app._get_current_object()).status())
+
+@api_bp.route('/inference/stats', methods=['GET'])
+def get_inference_stats():
+    """API: Batch sizes and per-camera lag of the inference scheduler"""
+    from app.services.scheduler import get_scheduler_stats
+    return jsonify(get_scheduler_stats() or {'batches': 0, 'cameras': {}})
 
 @api_bp.route('/health', methods=['GET'])
 def health_check():
-    """API: Health check endpoint"""
+    """API: Health check endpoint (503 until the face service is ready)"""
+    face_service = get_service_status()
+    
+    if face_service['ready']:
+        status = 'healthy'
+    elif face_service['error']:
+        status = 'degraded'
+    else:
+        status = 'starting'
+    
     return jsonify({
-        'status': 'healthy',
+        'status': status,
         'service': 'Missing Person Detection API',
-        'version': '1.0.0'
-    })
+        'version': '1.0.0',
+        'face_service': face_service,
+        'gallery': get_gallery_stats(),
+        'events': get_writer_stats(),
+        'live_feed': get_event_broker().stats(),
+        'jobs': get_job_stats()
+    }), 200 if status == 'healthy' else 503
@@ -0,0 +1,93 @@
+import csv
+import json
+import os
+import sys
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+TIMELINE_COLUMNS = ['time', 'offset', 'frame', 'person_id', 'name', 'distance', 'confidence', 'box']
+
+
+@click.command('search-video')
+@click.argument('video', type=click.Path(exists=True, dir_okay=False))
+@click.option('--fps', 'sample_fps', type=float, default=None, help='Frames sampled per second of video.')
+@click.option('--workers', type=int, default=None, help='Worker processes (1 = in-process).')
+@click.option('--threshold', type=float, default=None, help='Match distance threshold.')
+@click.option('--output', '-o', type=click.File('w'), default='-', help='Timeline file (default stdout).')
+@click.option('--format', 'output_format', type=click.Choice(['json', 'csv']), default='json')
+@with_appcontext
+def search_video_command(video, sample_fps, workers, threshold, output, output_format):
+    """Search a recorded VIDEO for registered persons and write the match timeline."""
+    from app.services.video_search import VideoSearchJob, run_video_search
+
+    app = current_app._get_current_object()
+    job = VideoSearchJob(
+        video,
+        sample_fps=sample_fps or app.config['VIDEO_SEARCH_FPS'],
+        workers=workers or app.config['VIDEO_SEARCH_WORKERS'] or None,
+        threshold=threshold
+    )
+    run_video_search(app, job)
+
+    result = job.to_dict()
+    click.echo(
+        f"{job.status}: {result['matches']} match(es), {result['frames_sampled']} frames sampled "
+        f"in {result['elapsed']}s ({result['speed']}x real time)", err=True
+    )
+    for person in result['persons']:
+        click.echo(f"  {person['name']}: {person['hits']} hit(s) from {person['first_seen']}s "
+                   f"to {person['last_seen']}s, best distance {person['best_distance']}", err=True)
+
+    if output_format == 'csv':
+        writer = csv.DictWriter(output, fieldnames=TIMELINE_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(job.timeline)
+    else:
+        json.dump(result, output, indent=2, default=str)
+        output.write('\n')
+
+    if job.status != 'done':
+        click.echo(f"Error: {job.error}", err=True)
+        sys.exit(1)
+
+
+@click.command('import-persons')
+@click.argument('source', required=False, type=click.Path(exists=True, dir_okay=False))
+@click.argument('images', nargs=-1, type=click.Path(exists=True, dir_okay=False))
+@click.option('--resume', 'import_id', default=None, help='Id of an earlier import to resume.')
+@click.option('--workers', type=int, default=None, help='Worker processes (1 = in-process).')
+@with_appcontext
+def import_persons_command(source, images, import_id, workers):
+    """Register persons from a ZIP SOURCE, or a CSV SOURCE and its IMAGES."""
+    from app.services.bulk_import import ImportJob, prepare_import_dir, run_import
+
+    app = current_app._get_current_object()
+    if import_id is None:
+        if source is None:
+            raise click.UsageError('Give a ZIP or CSV file, or --resume an earlier import.')
+        job = ImportJob(None, workers=workers or app.config['IMPORT_WORKERS'] or None,
+                        chunk_size=app.config['IMPORT_CHUNK_SIZE'], max_size=app.config['IMAGE_MAX_SIZE'],
+                        thumb_size=app.config['THUMBNAIL_SIZE'])
+        job.import_dir = os.path.join(app.config['IMPORT_FOLDER'], job.import_id)
+        if source.lower().endswith('.zip'):
+            prepare_import_dir(job.import_dir, archive=source)
+        else:
+            prepare_import_dir(job.import_dir, csv_file=source, images=images)
+    else:
+        job = ImportJob(os.path.join(app.config['IMPORT_FOLDER'], import_id), import_id=import_id,
+                        workers=workers or app.config['IMPORT_WORKERS'] or None,
+                        chunk_size=app.config['IMPORT_CHUNK_SIZE'], max_size=app.config['IMAGE_MAX_SIZE'],
+                        thumb_size=app.config['THUMBNAIL_SIZE'])
+    run_import(app, job)
+
+    result = job.to_dict()
+    click.echo(f"{job.status}: {result['imported']} imported, {result['already_imported']} already imported, "
+               f"{result['failed']} failed of {result['total']} rows in {result['elapsed']}s", err=True)
+    for failure in result['failures']:
+        click.echo(f"  row {failure['row']} ({failure['name']}): {failure['error']}", err=True)
+    click.echo(f"Import id: {job.import_id} (rerun with --resume to retry failed rows)", err=True)
+
+    if job.status != 'done':
+        click.echo(f"Error: {job.error}", err=True)
+        sys.exit(1)
@@ -1,5 +1,48 @@
+import threading
+import time
 from datetime import datetime
 from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+class _TTLCache:
+    """Small thread-safe cache whose entries expire after `ttl` seconds"""
+    
+    MISSING = object()
+    
+    def __init__(self, ttl=60.0, max_size=2048):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                return self.MISSING
+            return entry[1]
+    
+    def set(self, key, value):
+        with self._lock:
+            if len(self._entries) >= self.max_size and key not in self._entries:
+                # Oldest insert goes first
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+    
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+# person id -> summary (or None for unknown ids), shared by every page and API call
+_person_summaries = _TTLCache()
+
+SUMMARY_FIELDS = {'name': 1, 'age': 1, 'photo_path': 1, 'status': 1}
+
 
 class Person:
     """Model for missing persons"""
@@ -11,10 +54,9 @@ class Person:
         return db['victims'] if db is not None else None
     
     @staticmethod
-    def create(name, age, contact, photo_path, description=None):
-        """Create a new missing person record"""
-        collection = Person.get_collection()
-        person_data = {
+    def new_record(name, age, contact, photo_path, description=None):
+        """Document for a new missing person"""
+        return {
             'name': name,
             'age': age,
             'contact': contact,
@@ -25,15 +67,123 @@ class Person:
             'last_seen_location': None,
             'last_seen_time': None
         }
+    
+    @staticmethod
+    def create(name, age, contact, photo_path, description=None):
+        """Create a new missing person record"""
+        collection = Person.get_collection()
+        person_data = Person.new_record(name, age, contact, photo_path, description)
         result = collection.insert_one(person_data)
+        Person.bump_version()
         return str(result.inserted_id)
     
+    @staticmethod
+    def create_many(records):
+        """Insert many person documents (from new_record) in one round trip.
+        
+        Records carrying import_id/import_row that were already inserted by
+        an interrupted run are skipped; returns the ids actually inserted, as
+        strings. Any other write error is raised; with the unordered insert
+        the records without a write error are stored all the same.
+        """
+        collection = Person.get_collection()
+        if not records:
+            return []
+        for record in records:
+            record.setdefault('_id', ObjectId())
+        skipped = set()
+        try:
+            collection.insert_many(records, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            if any(error['code'] != 11000 for error in errors):
+                raise
+            skipped = {error['index'] for error in errors}
+        
+        inserted = [str(record['_id']) for i, record in enumerate(records) if i not in skipped]
+        if inserted:
+            Person.bump_version()
+        return inserted
+    
+    @staticmethod
+    def get_imported_rows(import_id):
+        """Row numbers of an import that are already stored"""
+        collection = Person.get_collection()
+        return {doc['import_row'] for doc in collection.find({'import_id': import_id}, {'import_row': 1})}
+    
     @staticmethod
     def get_all():
         """Get all missing persons"""
         collection = Person.get_collection()
         return list(collection.find())
     
+    @staticmethod
+    def find_page(status=None, projection=None, limit=100, after=None):
+        """One page of persons in _id order, starting after the `after` _id"""
+        collection = Person.get_collection()
+        query = {}
+        if status:
+            query['status'] = status
+        if after is not None:
+            query['_id'] = {'$gt': after}
+        return list(collection.find(query, projection).sort('_id', 1).limit(limit))
+    
+    @staticmethod
+    def get_summaries(person_ids):
+        """Map person ids to {name, age, photo_path, status} with one $in query for cache misses"""
+        summaries = {}
+        missing = []
+        for person_id in set(person_ids):
+            summary = _person_summaries.get(person_id)
+            if summary is _TTLCache.MISSING:
+                missing.append(person_id)
+            else:
+                summaries[person_id] = summary
+        
+        object_ids = [ObjectId(pid) for pid in missing if ObjectId.is_valid(pid)]
+        if object_ids:
+            collection = Person.get_collection()
+            for person in collection.find({'_id': {'$in': object_ids}}, SUMMARY_FIELDS):
+                person['_id'] = str(person['_id'])
+                summaries[person['_id']] = person
+        
+        for person_id in missing:
+            summaries.setdefault(person_id, None)
+            _person_summaries.set(person_id, summaries[person_id])
+        
+        return summaries
+    
+    @staticmethod
+    def count():
+        """Number of registered persons (from collection metadata)"""
+        return Person.get_collection().estimated_document_count()
+    
+    @staticmethod
+    def get_searchable():
+        """Get the persons the face gallery should match (not found yet)"""
+        collection = Person.get_collection()
+        return list(collection.find(
+            {'status': {'$ne': 'found'}},
+            {'name': 1, 'photo_path': 1, 'status': 1}
+        ))
+    
+    @staticmethod
+    def bump_version():
+        """Advance the gallery version so running galleries reload"""
+        from app import db
+        if db is None:
+            return
+        db['meta'].update_one({'_id': 'gallery_version'}, {'$inc': {'version': 1}}, upsert=True)
+    
+    @staticmethod
+    def get_version():
+        """Current gallery version (0 before the first change)"""
+        from app import db
+        if db is None:
+            return 0
+        doc = db['meta'].find_one({'_id': 'gallery_version'})
+        return doc['version'] if doc else 0
+    
     @staticmethod
     def get_by_id(person_id):
         """Get person by ID"""
@@ -57,6 +207,27 @@ class Person:
             }
         )
     
+    @staticmethod
+    def bulk_update_last_seen(updates):
+        """Apply (person_id, location, timestamp) updates in one round trip.
+        
+        An update only lands if it is newer than the stored last-seen time,
+        so late or replayed events never move a person backwards.
+        """
+        collection = Person.get_collection()
+        requests = [
+            UpdateOne(
+                {
+                    '_id': ObjectId(person_id),
+                    '$or': [{'last_seen_time': None}, {'last_seen_time': {'$lt': timestamp}}]
+                },
+                {'$set': {'last_seen_location': location, 'last_seen_time': timestamp}}
+            )
+            for person_id, location, timestamp in updates
+        ]
+        if requests:
+            collection.bulk_write(requests, ordered=False)
+    
     @staticmethod
     def update_status(person_id, status):
         """Update person status (missing/found)"""
@@ -65,12 +236,16 @@ class Person:
             {'_id': ObjectId(person_id)},
             {'$set': {'status': status}}
         )
+        _person_summaries.invalidate(str(person_id))
+        Person.bump_version()
     
     @staticmethod
     def delete(person_id):
         """Delete a person record"""
         collection = Person.get_collection()
         result = collection.delete_one({'_id': ObjectId(person_id)})
+        _person_summaries.invalidate(str(person_id))
+        Person.bump_version()
         return result.deleted_count > 0
 
 
@@ -84,8 +259,8 @@ class Detection:
         return db['detections'] if db is not None else None
     
     @staticmethod
-    def log(person_id, camera_id, location, confidence, timestamp):
-        """Log a detection event"""
+    def log(person_id, camera_id, location, confidence, timestamp, **details):
+        """Log a detection event (details: track_id, min/mean distance, frame_count...)"""
         collection = Detection.get_collection()
         detection_data = {
             'person_id': person_id,
@@ -94,15 +269,98 @@ class Detection:
             'confidence': confidence,
             'timestamp': timestamp
         }
+        detection_data.update({k: v for k, v in details.items() if v is not None})
         result = collection.insert_one(detection_data)
         return str(result.inserted_id)
     
+    @staticmethod
+    def insert_many(detections):
+        """Insert a batch of detection documents; ones already stored are skipped
+        
+        Returns the documents that were actually inserted by this call.
+        """
+        collection = Detection.get_collection()
+        try:
+            collection.insert_many(detections, ordered=False)
+        except BulkWriteError as e:
+            # Replayed batches may contain events that made it in before a failure
+            errors = e.details.get('writeErrors', [])
+            if any(error['code'] != 11000 for error in errors):
+                raise
+            skipped = {error['index'] for error in errors}
+            return [doc for i, doc in enumerate(detections) if i not in skipped]
+        return detections
+    
     @staticmethod
     def get_recent(limit=50):
         """Get recent detections"""
         collection = Detection.get_collection()
         return list(collection.find().sort('timestamp', -1).limit(limit))
     
+    @staticmethod
+    def count(since=None):
+        """Number of detections, optionally only those at or after `since`"""
+        collection = Detection.get_collection()
+        if since is None:
+            return collection.estimated_document_count()
+        return collection.count_documents({'timestamp': {'$gte': since}})
+    
+    @staticmethod
+    def find_page(filters=None, projection=None, limit=50, after=None):
+        """One page of detections, newest first, starting after the (timestamp, _id) key `after`.
+        
+        filters: person_id, camera_id, location, since, until
+        """
+        collection = Detection.get_collection()
+        filters = filters or {}
+        query = {key: filters[key] for key in ('person_id', 'camera_id', 'location') if filters.get(key)}
+        
+        time_range = {}
+        if filters.get('since'):
+            time_range['$gte'] = filters['since']
+        if filters.get('until'):
+            time_range['$lt'] = filters['until']
+        if time_range:
+            query['timestamp'] = time_range
+        
+        if after is not None:
+            timestamp, last_id = after
+            query['$or'] = [
+                {'timestamp': {'$lt': timestamp}},
+                {'timestamp': timestamp, '_id': {'$lt': last_id}}
+            ]
+        
+        cursor = collection.find(query, projection).sort([('timestamp', -1), ('_id', -1)])
+        return list(cursor.limit(limit))
+    
+    @staticmethod
+    def get_after(detection_id, limit=100):
+        """Detections stored after `detection_id`, oldest first, with person names"""
+        if not ObjectId.is_valid(detection_id):
+            return []
+        collection = Detection.get_collection()
+        if collection is None:
+            return []
+        detections = list(collection.find({'_id': {'$gt': ObjectId(detection_id)}}).sort('_id', 1).limit(limit))
+        for detection in Detection.join_persons(detections):
+            detection.pop('person', None)
+        return detections
+    
+    @staticmethod
+    def get_recent_with_persons(limit=50):
+        """Get recent detections with `person` summaries and `person_name` joined in"""
+        return Detection.join_persons(Detection.get_recent(limit))
+    
+    @staticmethod
+    def join_persons(detections):
+        """Add `person` summaries and `person_name` to detections with one batched lookup"""
+        persons = Person.get_summaries(d['person_id'] for d in detections)
+        for detection in detections:
+            person = persons.get(detection['person_id'])
+            detection['person'] = person
+            detection['person_name'] = person['name'] if person else 'Unknown'
+        return detections
+    
     @staticmethod
     def get_by_person(person_id, limit=20):
         """Get detections for specific person"""
@@ -114,3 +372,131 @@ class Detection:
         """Get detections at specific location"""
         collection = Detection.get_collection()
         return list(collection.find({'location': location}).sort('timestamp', -1).limit(limit))
+
+
+class FaceEmbedding:
+    """Model for cached gallery face embeddings"""
+    
+    @staticmethod
+    def get_collection():
+        """Get the embeddings collection"""
+        from app import db
+        return db['embeddings'] if db is not None else None
+    
+    @staticmethod
+    def upsert(photo_filename, model_name, detector_backend, embedding):
+        """Store the embedding for a photo/model/detector"""
+        collection = FaceEmbedding.get_collection()
+        if collection is None:
+            return
+        collection.update_one(
+            {
+                'photo_filename': photo_filename,
+                'model_name': model_name,
+                'detector_backend': detector_backend
+            },
+            {'$set': {'embedding': embedding, 'updated_at': datetime.now()}},
+            upsert=True
+        )
+    
+    @staticmethod
+    def get_all(model_name, detector_backend):
+        """Get all embeddings computed with a model/detector"""
+        collection = FaceEmbedding.get_collection()
+        if collection is None:
+            return []
+        return list(collection.find({'model_name': model_name, 'detector_backend': detector_backend}))
+    
+    @staticmethod
+    def delete(photo_filename, model_name, detector_backend):
+        """Delete the embedding for a photo/model/detector"""
+        collection = FaceEmbedding.get_collection()
+        if collection is None:
+            return
+        collection.delete_one({
+            'photo_filename': photo_filename,
+            'model_name': model_name,
+            'detector_backend': detector_backend
+        })
+
+
+class DetectionCounter:
+    """Model for rolled-up detection counts (one document per hour plus a total)"""
+    
+    # Held by the detection writer from insert to increment and by rebuild(),
+    # so a rebuild never counts a batch the writer is about to increment
+    lock = threading.Lock()
+    
+    @staticmethod
+    def get_collection():
+        """Get the detection_counts collection"""
+        from app import db
+        return db['detection_counts'] if db is not None else None
+    
+    @staticmethod
+    def bucket(timestamp):
+        """Hourly bucket start for a timestamp"""
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    
+    @staticmethod
+    def increment(timestamps):
+        """Count a batch of detections with one bulk_write"""
+        hours = {}
+        for timestamp in timestamps:
+            hour = DetectionCounter.bucket(timestamp)
+            hours[hour] = hours.get(hour, 0) + 1
+        if not hours:
+            return
+        
+        # No upsert on the total: its absence tells get_stats the counters still need a rebuild
+        requests = [UpdateOne({'_id': 'total'}, {'$inc': {'count': sum(hours.values())}})]
+        requests += [
+            UpdateOne({'_id': hour}, {'$inc': {'count': count}}, upsert=True)
+            for hour, count in hours.items()
+        ]
+        DetectionCounter.get_collection().bulk_write(requests, ordered=False)
+    
+    @staticmethod
+    def get_total():
+        """Total detection count, or None before the counters were built"""
+        doc = DetectionCounter.get_collection().find_one({'_id': 'total'})
+        return doc['count'] if doc else None
+    
+    @staticmethod
+    def sum_since(since):
+        """Detections in the hourly buckets from `since`'s hour onwards"""
+        result = list(DetectionCounter.get_collection().aggregate([
+            {'$match': {'_id': {'$gte': DetectionCounter.bucket(since)}}},
+            {'$group': {'_id': None, 'count': {'$sum': '$count'}}}
+        ]))
+        return result[0]['count'] if result else 0
+    
+    @staticmethod
+    def rebuild():
+        """Recompute every counter from the detections collection
+        
+        Buckets are overwritten in place rather than deleted first, so
+        readers never see empty counters mid-rebuild.
+        """
+        with DetectionCounter.lock:
+            hours = list(Detection.get_collection().aggregate([
+                {'$group': {
+                    '_id': {'$dateFromParts': {
+                        'year': {'$year': '$timestamp'},
+                        'month': {'$month': '$timestamp'},
+                        'day': {'$dayOfMonth': '$timestamp'},
+                        'hour': {'$hour': '$timestamp'}
+                    }},
+                    'count': {'$sum': 1}
+                }}
+            ]))
+            collection = DetectionCounter.get_collection()
+            
+            total = sum(hour['count'] for hour in hours)
+            requests = [UpdateOne({'_id': hour['_id']}, {'$set': {'count': hour['count']}}, upsert=True)
+                        for hour in hours]
+            requests.append(UpdateOne({'_id': 'total'}, {'$set': {'count': total}}, upsert=True))
+            collection.bulk_write(requests, ordered=False)
+            # Hours whose detections are all gone
+            collection.delete_many({'_id': {'$nin': [hour['_id'] for hour in hours] + ['total']}})
+        return total
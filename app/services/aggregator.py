@@ -0,0 +1,61 @@
+import time
+from collections import deque
+
+
+class VoteAggregator:
+    """Windowed vote over per-track recognition results.
+
+    Every recognition of a track adds a vote: the matched person and its
+    distance, or None when nothing matched. A detection event is emitted
+    once a person holds `min_votes` of the last `window` votes of a track
+    (votes older than `max_age` seconds are ignored), and only once per
+    person per track. Events carry min/mean distance and the frame count.
+    """
+
+    def __init__(self, window=5, min_votes=3, max_age=10.0):
+        self.window = window
+        self.min_votes = min(min_votes, window)
+        self.max_age = max_age
+        self._tracks = {}
+
+    def _state(self, key):
+        if key not in self._tracks:
+            self._tracks[key] = {'votes': deque(maxlen=self.window), 'emitted': set()}
+        return self._tracks[key]
+
+    def add(self, camera_id, track_id, match, now=None):
+        """Record one recognition result; returns an event dict when the vote passes"""
+        now = now if now is not None else time.time()
+        state = self._state((camera_id, track_id))
+        votes = state['votes']
+
+        votes.append((now, match))
+        while votes and now - votes[0][0] > self.max_age:
+            votes.popleft()
+
+        if match is None:
+            return None
+
+        person_id = match['person_id']
+        supporting = [m for _, m in votes if m is not None and m['person_id'] == person_id]
+        if len(supporting) < self.min_votes or person_id in state['emitted']:
+            return None
+
+        state['emitted'].add(person_id)
+        distances = [m['distance'] for m in supporting]
+        best = min(supporting, key=lambda m: m['distance'])
+
+        return dict(
+            match,
+            confidence=best['confidence'],
+            min_distance=min(distances),
+            mean_distance=sum(distances) / len(distances),
+            frame_count=len(supporting)
+        )
+
+    def forget(self, camera_id, track_id):
+        """Drop the votes of a track that left the scene"""
+        self._tracks.pop((camera_id, track_id), None)
+
+    def __len__(self):
+        return len(self._tracks)
@@ -0,0 +1,210 @@
+import os
+import threading
+import numpy as np
+from app.services.matcher import EmbeddingMatcher, top_matches
+
+
+def spherical_kmeans(vectors, n_clusters, iterations=10, sample_size=None, seed=0):
+    """Cluster L2-normalized vectors by cosine similarity"""
+    rng = np.random.default_rng(seed)
+
+    sample_size = sample_size or n_clusters * 64
+    if len(vectors) > sample_size:
+        vectors = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        counts = np.bincount(assignment, minlength=n_clusters)
+
+        # Re-seed empty clusters from random points
+        empty = counts == 0
+        sums[empty] = vectors[rng.integers(len(vectors), size=int(empty.sum()))]
+
+        norms = np.linalg.norm(sums, axis=1)
+        centroids = sums / np.where(norms > 0, norms, 1.0)[:, None]
+
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """Inverted-file approximate nearest-neighbour index.
+
+    Gallery embeddings are partitioned around k-means centroids, each
+    partition being an EmbeddingMatcher. A query only scans the `nprobe`
+    partitions whose centroids are closest, so nprobe is the recall vs
+    latency knob (nprobe == n_lists is exact). Galleries smaller than
+    `exact_threshold` stay in a single partition and are searched exactly.
+
+    Only the centroids are persisted to `path`; the vectors themselves come
+    from the embedding store, so saving is cheap and a restart skips
+    k-means training.
+    """
+
+    def __init__(self, distance_metric='cosine', n_lists=None, nprobe=8,
+                 exact_threshold=10000, path=None):
+        self.distance_metric = distance_metric
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.exact_threshold = exact_threshold
+        self.path = path
+        self.centroids = None
+        self._lists = [EmbeddingMatcher(distance_metric)]
+        self._assignment = {}
+        self._trained_size = 0
+        self._lock = threading.RLock()
+
+    @property
+    def trained(self):
+        return self.centroids is not None
+
+    def _assign(self, vectors):
+        normalized, _ = EmbeddingMatcher._normalize(vectors)
+        return np.argmax(normalized @ self.centroids.T, axis=1)
+
+    def _train(self, vectors):
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(vectors))))
+        normalized, _ = EmbeddingMatcher._normalize(vectors)
+        self.centroids = spherical_kmeans(normalized, min(n_lists, len(vectors)))
+        self._trained_size = len(vectors)
+        print(f"✓ ANN index trained: {len(self.centroids)} lists over {len(vectors)} faces")
+        self.save()
+
+    def _partition(self, items):
+        if not self.trained:
+            self._lists = [EmbeddingMatcher(self.distance_metric)]
+            self._lists[0].build(items)
+            self._assignment = {label: 0 for label, _ in items}
+            return
+
+        assignment = self._assign([vector for _, vector in items]) if items else []
+        buckets = [[] for _ in range(len(self.centroids))]
+        for (label, vector), list_id in zip(items, assignment):
+            buckets[list_id].append((label, vector))
+
+        self._lists = []
+        for bucket in buckets:
+            matcher = EmbeddingMatcher(self.distance_metric)
+            matcher.build(bucket)
+            self._lists.append(matcher)
+        self._assignment = {label: int(list_id) for (label, _), list_id in zip(items, assignment)}
+
+    def build(self, items):
+        """Replace the gallery with (label, embedding) pairs"""
+        items = list(items)
+
+        with self._lock:
+            self.centroids = None
+            if items and len(items) >= self.exact_threshold:
+                dim = len(np.ravel(items[0][1]))
+                if not self.load(dim):
+                    self._train(np.asarray([vector for _, vector in items], dtype=np.float32))
+            self._partition(items)
+
+    def add(self, label, embedding):
+        """Add or replace a single gallery embedding"""
+        with self._lock:
+            self.remove(label)
+
+            list_id = int(self._assign(embedding)[0]) if self.trained else 0
+            self._lists[list_id].add(label, embedding)
+            self._assignment[label] = list_id
+
+            # Train once the gallery is big enough, retrain when it has grown a lot
+            size = len(self._assignment)
+            if (not self.trained and size >= self.exact_threshold) or \
+                    (self.trained and size >= 4 * self._trained_size):
+                items = self.items()
+                self._train(np.asarray([vector for _, vector in items], dtype=np.float32))
+                self._partition(items)
+
+    def remove(self, label):
+        """Remove a gallery embedding; returns False if it was not present"""
+        with self._lock:
+            list_id = self._assignment.pop(label, None)
+            if list_id is None:
+                return False
+            return self._lists[list_id].remove(label)
+
+    def items(self):
+        """Snapshot of (label, embedding) pairs"""
+        with self._lock:
+            return [item for matcher in self._lists for item in matcher.items()]
+
+    def search(self, probes, threshold, top_k=5):
+        """Top-k matches under threshold for each probe"""
+        with self._lock:
+            if not self.trained:
+                return self._lists[0].search(probes, threshold, top_k)
+
+            probes = np.atleast_2d(np.asarray(probes, dtype=np.float32))
+            normalized, _ = EmbeddingMatcher._normalize(probes)
+            coarse = normalized @ self.centroids.T
+            nprobe = min(self.nprobe, len(self.centroids))
+
+            results = []
+            for probe, scores in zip(probes, coarse):
+                row, labels = [], []
+                for list_id in np.argpartition(-scores, nprobe - 1)[:nprobe]:
+                    distances, list_labels = self._lists[list_id].distances(probe)
+                    row.append(distances[0])
+                    labels.extend(list_labels)
+
+                row = np.concatenate(row) if row else np.empty(0, dtype=np.float32)
+                results.append(top_matches(row, labels, threshold, top_k))
+
+            return results
+
+    def save(self):
+        """Persist the trained centroids"""
+        if not self.path or not self.trained:
+            return
+        try:
+            np.savez(self.path, centroids=self.centroids, trained_size=self._trained_size,
+                     distance_metric=self.distance_metric)
+        except Exception as e:
+            print(f"✗ Could not save ANN index: {e}")
+
+    def load(self, dim):
+        """Restore centroids saved for the same metric and dimension"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            data = np.load(self.path)
+            centroids = data['centroids']
+            if str(data['distance_metric']) != self.distance_metric or centroids.shape[1] != dim:
+                return False
+            if self.n_lists and len(centroids) != self.n_lists:
+                return False
+            self.centroids = centroids.astype(np.float32)
+            self._trained_size = int(data['trained_size'])
+            print(f"✓ ANN index loaded: {len(self.centroids)} lists")
+            return True
+        except Exception as e:
+            print(f"✗ Could not load ANN index: {e}")
+            return False
+
+    def __contains__(self, label):
+        return label in self._assignment
+
+    def __len__(self):
+        return len(self._assignment)
+
+
+def create_matcher(config):
+    """Build the gallery matcher selected by SEARCH_INDEX"""
+    metric = config.get('DISTANCE_METRIC', 'cosine')
+
+    if config.get('SEARCH_INDEX', 'exact') == 'ivf':
+        return IVFIndex(
+            distance_metric=metric,
+            n_lists=config.get('ANN_NLIST') or None,
+            nprobe=config.get('ANN_NPROBE', 8),
+            exact_threshold=config.get('ANN_EXACT_THRESHOLD', 10000),
+            path=config.get('ANN_INDEX_PATH')
+        )
+
+    return EmbeddingMatcher(metric)
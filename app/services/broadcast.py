@@ -0,0 +1,133 @@
+import threading
+import time
+from datetime import datetime
+import cv2
+
+# Stream variants: output width (None = camera resolution), JPEG quality, fps cap (0 = every frame)
+STREAM_VARIANTS = {
+    'full': {'width': None, 'quality': 75, 'max_fps': 0, 'overlay': True},
+    'low': {'width': 480, 'quality': 65, 'max_fps': 10, 'overlay': True},
+    'thumb': {'width': 320, 'quality': 60, 'max_fps': 5, 'overlay': True},
+    'raw': {'width': None, 'quality': 80, 'max_fps': 0, 'overlay': False}
+}
+
+
+def draw_overlays(frame, detections, camera_id, location, live=True, scale=1.0):
+    """Draw identified faces, the camera label and the time onto a frame (in place)"""
+    thickness = 3 if scale >= 1 else 2
+    font_scale = 0.7 * max(scale, 0.6)
+
+    for det in detections:
+        # Box the matched face and label it
+        x, y, w, h = [int(v * scale) for v in det['box']]
+        label = f"{det['name']} {det['confidence']*100:.0f}%"
+        label_height = int(30 * max(scale, 0.6))
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 0, 255), thickness)
+        cv2.rectangle(frame, (x, max(0, y - label_height)),
+                      (x + max(w, int(12 * len(label) * max(scale, 0.6))), y), (0, 0, 255), -1)
+        cv2.putText(frame, label, (x + 5, max(20, y - 8)),
+                    cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), 2)
+
+    # Minimal status overlay
+    status_color = (0, 255, 0) if live else (255, 255, 0)
+    cv2.putText(frame, f"LIVE {camera_id} - {location}", (10, 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6 * max(scale, 0.6), status_color, 2)
+
+    # Timestamp
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    cv2.putText(frame, timestamp, (10, frame.shape[0] - 10),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.5 * max(scale, 0.6), (255, 255, 255), 1)
+    return frame
+
+
+class FrameBroadcaster:
+    """Draws and JPEG-encodes one camera stream variant once for all viewers.
+
+    A single thread turns the camera's latest frame into a ready-to-send
+    multipart chunk. Viewers wait for a chunk newer than the one they last
+    sent, so a slow viewer simply skips frames instead of queueing them
+    and the encode cost no longer grows with the number of viewers.
+    """
+
+    def __init__(self, camera, get_detections, variant='full'):
+        self.camera = camera
+        self.get_detections = get_detections
+        self.variant = variant
+        self.settings = STREAM_VARIANTS[variant]
+        self.frames_encoded = 0
+        self._chunk = None
+        self._seq = 0
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"broadcast-{self.camera.camera_id}-{self.variant}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+
+    def _render(self, frame):
+        width = self.settings['width']
+        scale = 1.0
+        if width and frame.shape[1] > width:
+            scale = width / frame.shape[1]
+            # The resize makes the private copy we draw on
+            frame = cv2.resize(frame, (width, int(frame.shape[0] * scale)), interpolation=cv2.INTER_AREA)
+        else:
+            # Published camera frames are shared; draw on a private copy
+            frame = frame.copy()
+
+        if self.settings['overlay']:
+            detections = self.get_detections()
+            draw_overlays(frame, detections or [], self.camera.camera_id, self.camera.location,
+                          live=detections is not None, scale=scale)
+
+        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.settings['quality']])
+        if not ret:
+            return None
+        return b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n'
+
+    def _run(self):
+        min_interval = 1.0 / self.settings['max_fps'] if self.settings['max_fps'] else 0
+        last_seq = 0
+        last_encoded = 0.0
+
+        while not self._stop.is_set():
+            last_seq, frame = self.camera.read_latest(last_seq)
+            if frame is None:
+                continue
+
+            now = time.monotonic()
+            if min_interval and now - last_encoded < min_interval:
+                continue
+            last_encoded = now
+
+            try:
+                chunk = self._render(frame)
+            except Exception as e:
+                print(f"Broadcast error ({self.camera.camera_id}/{self.variant}): {e}")
+                continue
+
+            if chunk is not None:
+                with self._condition:
+                    self._chunk = chunk
+                    self._seq += 1
+                    self.frames_encoded += 1
+                    self._condition.notify_all()
+
+    def read_latest(self, last_seq=0, timeout=1.0):
+        """Wait for a chunk newer than last_seq; returns (seq, chunk), chunk None on timeout"""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._seq != last_seq or self._stop.is_set(), timeout=timeout
+            )
+            if self._seq == last_seq:
+                return last_seq, None
+            return self._seq, self._chunk
@@ -0,0 +1,138 @@
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class Subscription:
+    """One live feed client: a bounded buffer of (event_id, json) pairs.
+
+    When the client falls behind by more than `size` events the oldest
+    are dropped (and counted); the ids let the client notice the gap and
+    resume from the last id it saw.
+    """
+
+    def __init__(self, broker, size, camera_id=None, person_id=None):
+        self.broker = broker
+        self.camera_id = camera_id
+        self.person_id = person_id
+        self.dropped = 0
+        self._buffer = deque(maxlen=size)
+
+    def accepts(self, event):
+        return ((self.camera_id is None or event.get('camera_id') == self.camera_id) and
+                (self.person_id is None or event.get('person_id') == self.person_id))
+
+    def _push(self, item):
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append(item)
+
+    def get(self, timeout=15.0):
+        """Wait for events; returns the buffered (event_id, json) pairs, [] on timeout"""
+        deadline = time.monotonic() + timeout
+        with self.broker._condition:
+            # Woken by every publish; keep waiting while nothing matched this client
+            while not self._buffer:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.broker._condition.wait(remaining)
+            items = list(self._buffer)
+            self._buffer.clear()
+            return items
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class EventBroker:
+    """Fan-out of live detection events to feed subscribers.
+
+    Each event is serialized once on publish and copied by reference into
+    every subscriber's bounded buffer, so a slow client never blocks the
+    publisher or the other clients. The last `history` events are kept
+    for clients resuming with a Last-Event-ID; older ids can be served by
+    a `backfill(event_id, limit)` callable (e.g. from MongoDB).
+    """
+
+    def __init__(self, history=1000, buffer_size=256, backfill=None):
+        self.buffer_size = buffer_size
+        self.backfill = backfill
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+        self._condition = threading.Condition()
+        self.published = 0
+
+    def publish(self, event):
+        """Send an event (with a unique, increasing `_id`) to every matching subscriber"""
+        item = (str(event['_id']), json.dumps(event, default=_json_default))
+        with self._condition:
+            self._history.append((item, event))
+            self.published += 1
+            for subscription in self._subscribers:
+                if subscription.accepts(event):
+                    subscription._push(item)
+            self._condition.notify_all()
+
+    def subscribe(self, last_event_id=None, camera_id=None, person_id=None):
+        """New subscription, pre-filled with the events after `last_event_id`"""
+        subscription = Subscription(self, self.buffer_size, camera_id, person_id)
+
+        with self._condition:
+            ids = [item[0] for item, _ in self._history]
+            in_history = last_event_id in ids
+            if in_history:
+                for item, event in list(self._history)[ids.index(last_event_id) + 1:]:
+                    if subscription.accepts(event):
+                        subscription._push(item)
+            self._subscribers.add(subscription)
+
+        if last_event_id and not in_history and self.backfill is not None:
+            # Outside the lock so a slow database never stalls publishers
+            missed = [
+                (str(event['_id']), json.dumps(event, default=_json_default))
+                for event in self.backfill(last_event_id, self.buffer_size)
+                if subscription.accepts(event)
+            ]
+            with self._condition:
+                seen = {item[0] for item in missed}
+                live = [item for item in subscription._buffer if item[0] not in seen]
+                subscription._buffer.clear()
+                for item in missed + live:
+                    subscription._push(item)
+
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._condition:
+            self._subscribers.discard(subscription)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'subscribers': len(self._subscribers),
+                'published': self.published,
+                'dropped': sum(s.dropped for s in self._subscribers)
+            }
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_event_broker():
+    """Get the process-wide detection event broker"""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            from app.models.person import Detection
+            _broker = EventBroker(backfill=Detection.get_after)
+        return _broker
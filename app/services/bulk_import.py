@@ -0,0 +1,421 @@
+import csv
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+import cv2
+from pymongo.errors import BulkWriteError
+from werkzeug.utils import secure_filename
+from app.models.person import Person
+from app.utils.helpers import (
+    CANONICAL_SIZE, THUMBNAIL_SIZE, allowed_file, ingest_image, remove_stored_image, save_face_crop
+)
+
+REQUIRED_COLUMNS = ('name', 'age', 'contact', 'photo')
+CSV_NAME = 'persons.csv'
+
+
+def prepare_import_dir(import_dir, archive=None, csv_file=None, images=()):
+    """Unpack a ZIP (a CSV plus images) or a CSV with image files into import_dir.
+
+    Only the CSV and allowed image types are kept, under sanitized names,
+    so archive paths can never escape the import directory.
+    """
+    images_dir = os.path.join(import_dir, 'images')
+    os.makedirs(images_dir, exist_ok=True)
+    csv_path = os.path.join(import_dir, CSV_NAME)
+
+    if archive is not None:
+        with zipfile.ZipFile(archive) as zf:
+            for member in zf.infolist():
+                if member.is_dir():
+                    continue
+                name = os.path.basename(member.filename)
+                if name.lower().endswith('.csv'):
+                    target = csv_path
+                elif allowed_file(name):
+                    target = os.path.join(images_dir, secure_filename(name))
+                else:
+                    continue
+                with zf.open(member) as src, open(target, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+    else:
+        if hasattr(csv_file, 'save'):
+            csv_file.save(csv_path)
+        else:
+            shutil.copyfile(csv_file, csv_path)
+        for image in images:
+            if hasattr(image, 'save'):
+                if allowed_file(image.filename):
+                    image.save(os.path.join(images_dir, secure_filename(image.filename)))
+            elif allowed_file(image):
+                shutil.copyfile(image, os.path.join(images_dir, secure_filename(os.path.basename(image))))
+
+    if not os.path.exists(csv_path):
+        raise ValueError('No CSV file found in the import')
+    return csv_path
+
+
+def read_rows(import_dir):
+    """Parse the import CSV into (row_number, fields, image_path, error) tuples"""
+    with open(os.path.join(import_dir, CSV_NAME), newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        columns = {c.strip().lower() for c in reader.fieldnames or []}
+        missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+        if missing:
+            raise ValueError(f"CSV is missing column(s): {', '.join(missing)}")
+
+        rows = []
+        # Row numbers are 1-based CSV data lines, stable across resumes
+        for number, raw in enumerate(reader, start=1):
+            fields = {k.strip().lower(): (v or '').strip() for k, v in raw.items() if k}
+            error = None
+            empty = [c for c in REQUIRED_COLUMNS if not fields.get(c)]
+            image_path = os.path.join(import_dir, 'images', secure_filename(fields.get('photo', '')))
+            if empty:
+                error = f"missing {', '.join(empty)}"
+            elif not allowed_file(fields['photo']):
+                error = 'photo must be PNG, JPG, JPEG or GIF'
+            elif not os.path.isfile(image_path):
+                error = f"photo {fields['photo']} not found"
+            rows.append((number, fields, image_path, error))
+        return rows
+
+
+def embed_rows(service, rows):
+    """Detect the largest face in each (row, image) and embed them in one batch.
+
+    An image is a file path or a decoded BGR array. Returns
+    (row, embedding, face crop, error) tuples.
+    """
+    results = {}
+    crops = []
+    for number, image in rows:
+        if isinstance(image, str):
+            image = cv2.imread(image)
+        if image is None:
+            results[number] = (None, None, 'unreadable image')
+            continue
+        try:
+            faces = service.detect_faces(image)
+        except Exception as e:
+            results[number] = (None, None, f"face detection failed: {e}")
+            continue
+        if not faces:
+            results[number] = (None, None, 'no face detected')
+            continue
+        largest = max(faces, key=lambda face: face['box'][2] * face['box'][3])
+        crops.append((number, largest['face']))
+
+    if crops:
+        try:
+            embeddings = service.embed_faces([crop for _, crop in crops])
+            for (number, crop), embedding in zip(crops, embeddings):
+                results[number] = (embedding, crop, None)
+        except Exception as e:
+            for number, _ in crops:
+                results[number] = (None, None, f"embedding failed: {e}")
+
+    return [(number, *results[number]) for number, _ in rows]
+
+
+def ingest_rows(service, rows, upload_folder, max_size=CANONICAL_SIZE, thumb_size=THUMBNAIL_SIZE):
+    """Store each (row, image_path, prefix) normalized, then embed the stored images.
+
+    The face is detected on the upright, downscaled image that
+    ingest_image returns, so the embedding and the kept crop match the
+    stored photo. Returns (row, filename, embedding, face crop, error)
+    tuples; the files of rows that fail are removed again.
+    """
+    stored = {}
+    images = []
+    for number, image_path, prefix in rows:
+        with open(image_path, 'rb') as f:
+            result = ingest_image(f.read(), upload_folder, prefix=prefix, max_size=max_size, thumb_size=thumb_size)
+        if result is None:
+            stored[number] = None
+            continue
+        stored[number] = result[0]
+        images.append((number, result[2]))
+
+    embedded = {number: (embedding, face, error) for number, embedding, face, error in embed_rows(service, images)}
+
+    results = []
+    for number, _, _ in rows:
+        filename = stored[number]
+        if filename is None:
+            results.append((number, None, None, None, 'unreadable image'))
+            continue
+        embedding, face, error = embedded[number]
+        if error is not None:
+            remove_stored_image(upload_folder, filename)
+            filename = None
+        results.append((number, filename, embedding, face, error))
+    return results
+
+
+def _ingest_rows_in_worker(rows, upload_folder, max_size, thumb_size):
+    """Process pool task: ingest and embed a chunk of rows with the worker's own models"""
+    from app.services import workers
+    return ingest_rows(workers._worker_service, rows, upload_folder, max_size, thumb_size)
+
+
+class ImportJob:
+    """Bulk registration of persons from a CSV and images.
+
+    Rows are validated up front. Normalizing each photo (ingest_image),
+    face detection and embedding run in a process pool, a chunk of rows
+    per task so each worker embeds a batch.
+    Each finished chunk is stored with one `insert_many`. Every person
+    document carries the import id and row number, so running the same
+    import again skips rows already stored and only retries the rest.
+    New persons are retro-searched against stored sightings, one pass per
+    chunk. Failures are reported per row and saved to report.json.
+    """
+
+    def __init__(self, import_dir, import_id=None, workers=None, chunk_size=32,
+                 max_size=CANONICAL_SIZE, thumb_size=THUMBNAIL_SIZE):
+        self.import_id = import_id or uuid.uuid4().hex
+        self.import_dir = import_dir
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.chunk_size = chunk_size
+        self.max_size = max_size
+        self.thumb_size = thumb_size
+        self.status = 'queued'
+        self.error = None
+        self.created = datetime.now()
+        self.started = None
+        self.finished = None
+        self.total = 0
+        self.skipped = 0
+        self.imported = 0
+        self.failures = []
+
+    def _store_chunk(self, service, upload_folder, rows, results, retro_search=None):
+        records = []
+        embeddings = []
+        try:
+            for number, filename, embedding, face, error in results:
+                fields = rows[number]
+                if error is not None:
+                    self.failures.append({'row': number, 'name': fields.get('name'), 'error': error})
+                    continue
+
+                save_face_crop(upload_folder, filename, face)
+                embeddings.append(service.add_embedding(filename, embedding))
+
+                record = Person.new_record(fields['name'], fields['age'], fields['contact'],
+                                           filename, fields.get('description') or None)
+                record.update(import_id=self.import_id, import_row=number)
+                records.append(record)
+
+            person_ids = set(Person.create_many(records))
+            failure = None
+        except Exception as e:
+            person_ids = self._inserted_ids(e, records)
+            failure = e
+
+        stored = [(record, embedding) for record, embedding in zip(records, embeddings)
+                  if str(record.get('_id')) in person_ids]
+        stored_photos = {record['photo_path'] for record, _ in stored}
+
+        # Nothing refers to the other photos of this chunk; a resumed import redoes them
+        for record in records:
+            if record['photo_path'] not in stored_photos:
+                service.remove_photo(record['photo_path'])
+        for _, filename, _, _, error in results:
+            if error is None and filename not in stored_photos:
+                remove_stored_image(upload_folder, filename)
+
+        self.imported += len(stored)
+
+        # One pass over the stored unknown faces for the whole chunk
+        if retro_search is not None and stored:
+            retro_search.submit_many([(str(record['_id']), record['name'], embedding)
+                                      for record, embedding in stored])
+
+        if failure is not None:
+            raise failure
+
+    @staticmethod
+    def _inserted_ids(error, records):
+        """Ids an unordered insert stored before failing: every record without a write error"""
+        if not isinstance(error, BulkWriteError):
+            return set()
+        failed = {write_error['index'] for write_error in error.details.get('writeErrors', [])}
+        return {str(record['_id']) for i, record in enumerate(records) if i not in failed}
+
+    def run(self, service, upload_folder, model_config=None, retro_search=None):
+        self.status = 'running'
+        self.started = time.time()
+        self.failures = []
+        self.imported = 0
+        executor = None
+
+        try:
+            rows = read_rows(self.import_dir)
+            self.total = len(rows)
+            done = Person.get_imported_rows(self.import_id)
+            self.skipped = len(done)
+
+            pending = {}
+            work = []
+            for number, fields, image_path, error in rows:
+                if number in done:
+                    continue
+                if error is not None:
+                    self.failures.append({'row': number, 'name': fields.get('name'), 'error': error})
+                else:
+                    # Stable prefix so a resumed import rewrites the same files
+                    pending[number] = fields
+                    work.append((number, image_path, f"import_{self.import_id[:8]}_{number}"))
+
+            chunks = [work[i:i + self.chunk_size] for i in range(0, len(work), self.chunk_size)]
+
+            if self.workers > 1 and model_config is not None and len(chunks) > 1:
+                from app.services.workers import _init_worker
+                executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=model_config
+                )
+                futures = [executor.submit(_ingest_rows_in_worker, chunk, upload_folder,
+                                           self.max_size, self.thumb_size) for chunk in chunks]
+            else:
+                executor = ThreadPoolExecutor(max_workers=1)
+                futures = [executor.submit(ingest_rows, service, chunk, upload_folder,
+                                           self.max_size, self.thumb_size) for chunk in chunks]
+
+            for future in as_completed(futures):
+                self._store_chunk(service, upload_folder, pending, future.result(), retro_search)
+
+            self.failures.sort(key=lambda failure: failure['row'])
+            self.status = 'done'
+
+        except Exception as e:
+            self.status = 'failed'
+            self.error = str(e)
+            print(f"✗ Import {self.import_id} failed: {e}")
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+            self.finished = time.time()
+            self._write_report()
+
+        return self
+
+    def _write_report(self):
+        try:
+            with open(os.path.join(self.import_dir, 'report.json'), 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, indent=2, default=str)
+        except OSError as e:
+            print(f"✗ Could not write import report: {e}")
+
+    def to_dict(self):
+        elapsed = (self.finished or time.time()) - self.started if self.started else None
+        return {
+            'import_id': self.import_id,
+            'status': self.status,
+            'error': self.error,
+            'created': self.created.isoformat(),
+            'elapsed': round(elapsed, 2) if elapsed is not None else None,
+            'total': self.total,
+            'already_imported': self.skipped,
+            'imported': self.imported,
+            'failed': len(self.failures),
+            'failures': self.failures
+        }
+
+
+class ImportManager:
+    """Runs bulk imports in the background, one at a time"""
+
+    def __init__(self, app):
+        self.app = app
+        self.root = app.config['IMPORT_FOLDER']
+        self.jobs = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bulk-import')
+
+    def create(self, archive=None, csv_file=None, images=()):
+        """Unpack an upload into a new import directory and start it"""
+        import_id = uuid.uuid4().hex
+        import_dir = os.path.join(self.root, import_id)
+        try:
+            prepare_import_dir(import_dir, archive=archive, csv_file=csv_file, images=images)
+        except Exception:
+            shutil.rmtree(import_dir, ignore_errors=True)
+            raise
+        return self.start(import_id)
+
+    def start(self, import_id):
+        """Start (or resume) the import stored under import_id"""
+        import_dir = os.path.join(self.root, secure_filename(import_id))
+        if not os.path.exists(os.path.join(import_dir, CSV_NAME)):
+            return None
+        job = self.jobs.get(import_id)
+        if job is not None and job.status in ('queued', 'running'):
+            return job
+        job = ImportJob(import_dir, import_id=import_id,
+                        workers=self.app.config.get('IMPORT_WORKERS') or None,
+                        chunk_size=self.app.config.get('IMPORT_CHUNK_SIZE', 32),
+                        max_size=self.app.config.get('IMAGE_MAX_SIZE', CANONICAL_SIZE),
+                        thumb_size=self.app.config.get('THUMBNAIL_SIZE', THUMBNAIL_SIZE))
+        self.jobs[import_id] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        with self.app.app_context():
+            run_import(self.app, job)
+
+    def get(self, import_id):
+        job = self.jobs.get(import_id)
+        if job is not None:
+            return job.to_dict()
+
+        # Finished in an earlier run of the server
+        report = os.path.join(self.root, secure_filename(import_id), 'report.json')
+        if os.path.exists(report):
+            with open(report, encoding='utf-8') as f:
+                return json.load(f)
+        return None
+
+
+def run_import(app, job):
+    """Run an import against the app's face service"""
+    from app.services.registry import get_face_service
+    from app.services.sightings import get_retro_search
+
+    try:
+        service = get_face_service(app.config)
+    except Exception as e:
+        job.status = 'failed'
+        job.error = f"face service unavailable: {e}"
+        return job
+
+    config = app.config
+    model_config = (config.get('DEEPFACE_MODEL', 'VGG-Face'), config.get('DETECTOR_BACKEND', 'opencv'),
+                    config.get('DISTANCE_METRIC', 'cosine'))
+    return job.run(service, config['UPLOAD_FOLDER'], model_config=model_config,
+                   retro_search=get_retro_search(app))
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_import_manager(app):
+    """Get the process-wide bulk import manager"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ImportManager(app)
+        return _manager
+
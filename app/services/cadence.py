@@ -0,0 +1,41 @@
+class AdaptiveCadence:
+    """Decides how long a detection pipeline waits between passes.
+
+    While faces or motion are present the pipeline runs again after
+    `min_interval` (0 = as fast as the worker finishes). Each idle pass
+    multiplies the wait by `backoff`, up to `max_interval`. `min_frame_gap`
+    is the smallest number of camera frames between two detection passes.
+    """
+
+    def __init__(self, min_interval=0.0, max_interval=2.0, backoff=1.5, min_frame_gap=1,
+                 idle_step=0.25):
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.backoff = backoff
+        self.min_frame_gap = max(1, min_frame_gap)
+        self.idle_step = idle_step
+        self.interval = min_interval
+        self.active_passes = 0
+        self.idle_passes = 0
+
+    def due(self, seq, last_processed_seq):
+        """True once enough new frames arrived since the last pass"""
+        return seq - last_processed_seq >= self.min_frame_gap
+
+    def update(self, active):
+        """Record a pass and return the wait before the next one"""
+        if active:
+            self.active_passes += 1
+            self.interval = self.min_interval
+        else:
+            self.idle_passes += 1
+            self.interval = min(self.max_interval, max(self.interval, self.idle_step) * self.backoff)
+        return self.interval
+
+    def stats(self):
+        return {
+            'interval': round(self.interval, 3),
+            'active_passes': self.active_passes,
+            'idle_passes': self.idle_passes
+        }
+
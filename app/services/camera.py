@@ -0,0 +1,329 @@
+import json
+import os
+import threading
+import cv2
+from app.services.gate import check_gate_config
+
+
+def parse_camera_config(cameras_json=None, default_index=0, mirror=True):
+    """Build the camera list from the CAMERAS env var.
+
+    CAMERAS is a JSON list such as
+    [{"id": "CAM_001", "source": 0, "location": "Main Entrance"},
+     {"id": "CAM_002", "source": "rtsp://10.0.0.5/stream", "location": "Car Park", "mirror": false,
+      "gate": {"method": "background", "threshold": 0.02, "face_check": true}}]
+    where source is a device index, a stream URL or a video file path and
+    the optional gate entry overrides the motion gate settings (any
+    MotionGate argument; unknown keys raise ValueError).
+    Without it a single camera is built from CAMERA_INDEX.
+    """
+    if cameras_json:
+        cameras = []
+        for i, cam in enumerate(json.loads(cameras_json)):
+            camera_id = cam.get('id', f"CAM_{i + 1:03d}")
+            cameras.append({
+                'id': camera_id,
+                'source': cam.get('source', default_index),
+                'location': cam.get('location', 'Unknown'),
+                'mirror': cam.get('mirror', mirror),
+                'gate': check_gate_config(cam.get('gate', {}), camera_id)
+            })
+        return cameras
+
+    return [{
+        'id': 'CAM_001',
+        'source': default_index,
+        'location': 'Main Entrance',
+        'mirror': mirror,
+        'gate': {}
+    }]
+
+
+class CameraSource:
+    """Owns one capture device and publishes its latest frame.
+
+    A single thread reads the source; any number of viewers and one
+    detection pipeline read the most recent frame through read_latest().
+    Published frames are never modified afterwards, so readers that only
+    look at a frame need no copy.
+    """
+
+    def __init__(self, camera_id, source, location, mirror=True, width=640, height=480, fps=30,
+                 gate=None):
+        self.camera_id = camera_id
+        self.source = source
+        self.location = location
+        self.mirror = mirror
+        self.gate = gate or {}
+        self.width = width
+        self.height = height
+        self.fps = fps
+
+        self._frame = None
+        self._seq = 0
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._frame_interval = 0
+        self.connected = False
+
+    def _open(self):
+        source = self.source
+        if isinstance(source, str) and source.isdigit():
+            source = int(source)
+
+        if isinstance(source, int):
+            # DirectShow is only available (and only needed) on Windows
+            backend = cv2.CAP_DSHOW if os.name == 'nt' else cv2.CAP_ANY
+            capture = cv2.VideoCapture(source, backend)
+            capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+            capture.set(cv2.CAP_PROP_FPS, self.fps)
+        else:
+            capture = cv2.VideoCapture(source)
+
+        # Recorded files are replayed at their own frame rate, live sources as fast as they arrive
+        file_fps = capture.get(cv2.CAP_PROP_FPS) if isinstance(source, str) and os.path.isfile(source) else 0
+        self._frame_interval = 1.0 / file_fps if file_fps > 0 else 0
+
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return capture if capture.isOpened() else None
+
+    def _run(self):
+        capture = None
+
+        while not self._stop.is_set():
+            if capture is None:
+                capture = self._open()
+                if capture is None:
+                    print(f"❌ Camera {self.camera_id} unavailable ({self.source}), retrying...")
+                    self._stop.wait(2.0)
+                    continue
+                self.connected = True
+                print(f"✓ Camera {self.camera_id} opened ({self.source})")
+
+            success, frame = capture.read()
+            if not success:
+                print(f"✗ Camera {self.camera_id} read failed, reconnecting")
+                capture.release()
+                capture = None
+                self.connected = False
+                continue
+
+            if self.mirror:
+                frame = cv2.flip(frame, 1)
+
+            with self._condition:
+                self._frame = frame
+                self._seq += 1
+                self._condition.notify_all()
+
+            if self._frame_interval:
+                self._stop.wait(self._frame_interval)
+
+        if capture is not None:
+            capture.release()
+        self.connected = False
+        print(f"Camera {self.camera_id} stopped")
+
+    def start(self):
+        """Start the capture thread"""
+        if self._thread and self._thread.is_alive():
+            if not self._stop.is_set():
+                return
+            # A previous stop is still draining; let it release the device first
+            self._thread.join(timeout=5.0)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"camera-{self.camera_id}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the capture thread and release the device"""
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+
+    def read_latest(self, last_seq=0, timeout=1.0):
+        """Wait for a frame newer than last_seq; returns (seq, frame)"""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._seq != last_seq or self._stop.is_set(), timeout=timeout
+            )
+            if self._seq == last_seq:
+                return last_seq, None
+            return self._seq, self._frame
+
+    def info(self):
+        return {
+            'camera_id': self.camera_id,
+            'location': self.location,
+            'source': str(self.source),
+            'connected': self.connected,
+            'running': bool(self._thread and self._thread.is_alive())
+        }
+
+
+class CameraManager:
+    """Registry of configured cameras and their detection pipelines.
+
+    A camera and its pipeline start with the first subscriber and stop
+    when the last one leaves, so many viewers share one capture and one
+    detection thread. Video viewers also share one broadcaster (overlay
+    and JPEG encode) per camera and stream variant. Without
+    start_monitoring() a camera is only watched while someone views it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.cameras = {}
+        self.pipelines = {}
+        self.broadcasters = {}
+        self._subscribers = {}
+        self._stream_viewers = {}
+        self._monitored = set()
+        self._lock = threading.Lock()
+        # Per camera: starting one may wait for its old capture thread, which must not block the others
+        self._camera_locks = {}
+
+        for cam in app.config.get('CAMERAS', []):
+            self.cameras[cam['id']] = CameraSource(
+                cam['id'], cam['source'], cam['location'],
+                mirror=cam.get('mirror', True), gate=cam.get('gate')
+            )
+            self._subscribers[cam['id']] = 0
+            self._camera_locks[cam['id']] = threading.Lock()
+
+    @property
+    def default_camera_id(self):
+        return next(iter(self.cameras), None)
+
+    def subscribe(self, camera_id):
+        """Register a viewer, starting the camera if needed"""
+        with self._lock:
+            camera = self.cameras.get(camera_id)
+            if camera is None:
+                return None
+            self._subscribers[camera_id] += 1
+
+        self._sync(camera_id)
+        return camera
+
+    def unsubscribe(self, camera_id):
+        """Unregister a viewer, stopping the camera when nobody is left"""
+        with self._lock:
+            if self._subscribers.get(camera_id, 0) == 0:
+                return
+            self._subscribers[camera_id] -= 1
+
+        self._sync(camera_id)
+
+    def _sync(self, camera_id):
+        """Start or stop a camera and its pipeline to match its subscriber count
+
+        Runs outside the manager lock; the camera's own lock orders starts
+        and stops, and the count is re-read so the last call always wins.
+        """
+        from app.services.pipeline import DetectionPipeline
+
+        camera = self.cameras[camera_id]
+        with self._camera_locks[camera_id]:
+            with self._lock:
+                wanted = self._subscribers[camera_id] > 0
+                pipeline = self.pipelines.get(camera_id)
+
+            if wanted and pipeline is None:
+                camera.start()
+                pipeline = DetectionPipeline(self.app, camera)
+                pipeline.start()
+                with self._lock:
+                    self.pipelines[camera_id] = pipeline
+            elif not wanted and pipeline is not None:
+                with self._lock:
+                    self.pipelines.pop(camera_id, None)
+                pipeline.stop()
+                camera.stop()
+
+    def start_monitoring(self):
+        """Run every camera and its pipeline regardless of viewers
+
+        The manager holds one subscription per camera for the life of the
+        process, so the last viewer leaving no longer stops detection.
+        """
+        for camera_id in self.cameras:
+            with self._lock:
+                if camera_id in self._monitored:
+                    continue
+                self._monitored.add(camera_id)
+            self.subscribe(camera_id)
+
+    def _latest_detections(self, camera_id):
+        pipeline = self.pipelines.get(camera_id)
+        return pipeline.latest_detection if pipeline else None
+
+    def subscribe_stream(self, camera_id, variant='full'):
+        """Register a stream viewer; returns the shared broadcaster for the camera/variant"""
+        from app.services.broadcast import FrameBroadcaster
+
+        camera = self.subscribe(camera_id)
+        if camera is None:
+            return None
+
+        with self._lock:
+            key = (camera_id, variant)
+            broadcaster = self.broadcasters.get(key)
+            if broadcaster is None:
+                broadcaster = FrameBroadcaster(
+                    camera, lambda: self._latest_detections(camera_id), variant
+                )
+                broadcaster.start()
+                self.broadcasters[key] = broadcaster
+            self._stream_viewers[key] = self._stream_viewers.get(key, 0) + 1
+            return broadcaster
+
+    def unsubscribe_stream(self, camera_id, variant='full'):
+        """Unregister a stream viewer, stopping its broadcaster when nobody is left"""
+        with self._lock:
+            key = (camera_id, variant)
+            if self._stream_viewers.get(key, 0) > 0:
+                self._stream_viewers[key] -= 1
+                if self._stream_viewers[key] == 0:
+                    del self._stream_viewers[key]
+                    broadcaster = self.broadcasters.pop(key, None)
+                    if broadcaster:
+                        broadcaster.stop()
+
+        self.unsubscribe(camera_id)
+
+    def status(self):
+        with self._lock:
+            cameras = []
+            for camera_id, camera in self.cameras.items():
+                info = camera.info()
+                info['monitored'] = camera_id in self._monitored
+                info['viewers'] = self._subscribers[camera_id] - info['monitored']
+                pipeline = self.pipelines.get(camera_id)
+                info['detections'] = pipeline.detection_count if pipeline else 0
+                info['cadence'] = pipeline.cadence.stats() if pipeline else None
+                info['gate'] = pipeline.gate.stats() if pipeline else None
+                info['tracks'] = len(pipeline.tracker.tracks) if pipeline else 0
+                info['recognitions_skipped'] = pipeline.recognitions_skipped if pipeline else 0
+                info['streams'] = {
+                    variant: {'viewers': self._stream_viewers[(cid, variant)],
+                              'frames_encoded': broadcaster.frames_encoded}
+                    for (cid, variant), broadcaster in self.broadcasters.items() if cid == camera_id
+                }
+                cameras.append(info)
+            return cameras
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_camera_manager(app):
+    """Get the process-wide camera manager"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = CameraManager(app)
+        return _manager
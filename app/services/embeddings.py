@@ -0,0 +1,113 @@
+import os
+import threading
+import numpy as np
+
+
+class EmbeddingStore:
+    """Persistent cache of gallery face embeddings.
+
+    Vectors are keyed by photo filename and scoped to one model/detector
+    pair, so switching DEEPFACE_MODEL never mixes incompatible embeddings.
+    Each vector is written to disk as a .npy file and, when MongoDB is
+    available, mirrored to the `embeddings` collection. Passing
+    store_dir=None keeps the store in memory only.
+    """
+
+    def __init__(self, store_dir, model_name, detector_backend, use_mongo=True):
+        self.model_name = model_name
+        self.detector_backend = detector_backend
+        self.use_mongo = use_mongo
+        self.store_dir = None
+        self._vectors = {}
+        self._lock = threading.Lock()
+
+        if store_dir:
+            self.store_dir = os.path.join(store_dir, f"{model_name}__{detector_backend}")
+            os.makedirs(self.store_dir, exist_ok=True)
+        self.load()
+
+    def _path(self, filename):
+        return os.path.join(self.store_dir, f"{filename}.npy")
+
+    def load(self):
+        """Load every stored embedding for this model/detector"""
+        vectors = {}
+        entries = os.listdir(self.store_dir) if self.store_dir else []
+
+        for entry in entries:
+            if not entry.endswith('.npy'):
+                continue
+            try:
+                vectors[entry[:-4]] = np.load(os.path.join(self.store_dir, entry)).astype(np.float32)
+            except Exception as e:
+                print(f"✗ Could not load embedding {entry}: {e}")
+
+        # Pull anything persisted by another host that is missing locally
+        if self.use_mongo:
+            from app.models.person import FaceEmbedding
+            try:
+                for doc in FaceEmbedding.get_all(self.model_name, self.detector_backend):
+                    if doc['photo_filename'] not in vectors:
+                        vector = np.asarray(doc['embedding'], dtype=np.float32)
+                        vectors[doc['photo_filename']] = vector
+                        if self.store_dir:
+                            np.save(self._path(doc['photo_filename']), vector)
+            except Exception as e:
+                print(f"✗ Could not load embeddings from MongoDB: {e}")
+
+        with self._lock:
+            self._vectors = vectors
+
+        print(f"✓ Embedding store: {len(vectors)} vector(s) for {self.model_name}/{self.detector_backend}")
+        return len(vectors)
+
+    def put(self, filename, vector):
+        """Store the embedding for a registered photo"""
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        if self.store_dir:
+            np.save(self._path(filename), vector)
+
+        with self._lock:
+            self._vectors[filename] = vector
+
+        if self.use_mongo:
+            from app.models.person import FaceEmbedding
+            try:
+                FaceEmbedding.upsert(filename, self.model_name, self.detector_backend, vector.tolist())
+            except Exception as e:
+                print(f"✗ Could not mirror embedding to MongoDB: {e}")
+
+        return vector
+
+    def get(self, filename):
+        """Get the embedding for a photo, or None if not computed yet"""
+        with self._lock:
+            return self._vectors.get(filename)
+
+    def remove(self, filename):
+        """Forget the embedding for a photo"""
+        with self._lock:
+            self._vectors.pop(filename, None)
+
+        if self.store_dir and os.path.exists(self._path(filename)):
+            os.remove(self._path(filename))
+
+        if self.use_mongo:
+            from app.models.person import FaceEmbedding
+            try:
+                FaceEmbedding.delete(filename, self.model_name, self.detector_backend)
+            except Exception as e:
+                print(f"✗ Could not remove embedding from MongoDB: {e}")
+
+    def items(self):
+        """Snapshot of (filename, vector) pairs"""
+        with self._lock:
+            return list(self._vectors.items())
+
+    def __contains__(self, filename):
+        with self._lock:
+            return filename in self._vectors
+
+    def __len__(self):
+        with self._lock:
+            return len(self._vectors)
@@ -0,0 +1,212 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from bson import json_util
+from bson.objectid import ObjectId
+from app.models.person import Person, Detection, DetectionCounter
+
+
+class DetectionWriter:
+    """Background sink that persists detection events in batches.
+
+    Pipelines hand events to `submit`, which only enqueues. A writer
+    thread drains the bounded queue, stores each batch with one
+    `insert_many` and coalesces the batch's last-seen updates into one
+    `bulk_write` (newest event per person wins), and optionally bumps the
+    rolled-up detection counters. While MongoDB is unreachable batches
+    are appended to a local JSONL spill file, which is replayed once a
+    connection is back; event ids are assigned up front so a replay never
+    stores an event twice.
+    """
+
+    def __init__(self, spill_path, max_queue=10000, batch_size=500, flush_interval=0.5,
+                 retry_interval=5.0, reconnect=None, update_counters=False):
+        self.spill_path = spill_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self.reconnect = reconnect
+        self.update_counters = update_counters
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._spill_lock = threading.Lock()
+        self._retry_at = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {'submitted': 0, 'written': 0, 'spilled': 0, 'replayed': 0,
+                       'batches': 0, 'failures': 0}
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='detection-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Flush what is queued (to MongoDB or the spill file) and stop"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, event):
+        """Queue a detection event; never blocks the caller"""
+        event.setdefault('_id', ObjectId())
+        self._stats['submitted'] += 1
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # Detections are too important to drop: overflow goes straight to disk
+            self._spill([event])
+        return str(event['_id'])
+
+    def _take_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _available(self):
+        """True if MongoDB can be written to right now (reconnecting if due)"""
+        if Detection.get_collection() is not None:
+            return time.time() >= self._retry_at
+        if time.time() < self._retry_at:
+            return False
+
+        if self.reconnect is not None:
+            self.reconnect()
+        if Detection.get_collection() is None:
+            self._retry_at = time.time() + self.retry_interval
+            return False
+        return True
+
+    def _write(self, batch):
+        # A counter rebuild must see a batch either before its insert or after its increment
+        with DetectionCounter.lock:
+            inserted = Detection.insert_many(batch)
+            # Only events stored now: a replayed batch may repeat events counted before
+            if self.update_counters and inserted:
+                DetectionCounter.increment(event['timestamp'] for event in inserted)
+
+        latest = {}
+        for event in batch:
+            current = latest.get(event['person_id'])
+            if current is None or event['timestamp'] >= current['timestamp']:
+                latest[event['person_id']] = event
+        Person.bulk_update_last_seen(
+            (person_id, event['location'], event['timestamp'])
+            for person_id, event in latest.items()
+        )
+
+    def flush(self, batch):
+        """Write one batch, spilling it to disk if MongoDB is not reachable"""
+        if not batch:
+            return
+        if not self._available():
+            self._spill(batch)
+            return
+
+        try:
+            self._write(batch)
+            self._stats['written'] += len(batch)
+            self._stats['batches'] += 1
+        except Exception as e:
+            print(f"Detection writer: write failed, spilling {len(batch)} event(s): {e}")
+            self._stats['failures'] += 1
+            self._retry_at = time.time() + self.retry_interval
+            self._spill(batch)
+
+    def _spill(self, batch):
+        with self._spill_lock:
+            os.makedirs(os.path.dirname(self.spill_path) or '.', exist_ok=True)
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                for event in batch:
+                    f.write(json_util.dumps(event) + '\n')
+            self._stats['spilled'] += len(batch)
+
+    def replay(self):
+        """Move spilled events back into MongoDB; returns the number replayed"""
+        replaying = self.spill_path + '.replaying'
+        if not (os.path.exists(self.spill_path) or os.path.exists(replaying)) or not self._available():
+            return 0
+
+        with self._spill_lock:
+            # A file left by an interrupted replay goes first
+            if not os.path.exists(replaying):
+                os.replace(self.spill_path, replaying)
+
+        with open(replaying, encoding='utf-8') as f:
+            events = [json_util.loads(line) for line in f if line.strip()]
+
+        try:
+            for i in range(0, len(events), self.batch_size):
+                self._write(events[i:i + self.batch_size])
+        except Exception as e:
+            print(f"Detection writer: replay failed, will retry: {e}")
+            self._stats['failures'] += 1
+            self._retry_at = time.time() + self.retry_interval
+            return 0
+
+        os.remove(replaying)
+        self._stats['replayed'] += len(events)
+        print(f"✓ Detection writer: replayed {len(events)} spilled event(s)")
+        return len(events)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.flush(self._take_batch())
+            try:
+                self.replay()
+            except Exception as e:
+                print(f"Detection writer error: {e}")
+
+        # Drain on shutdown
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        self.flush(batch)
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats['queued'] = self._queue.qsize()
+        stats['spill_pending'] = os.path.exists(self.spill_path) or os.path.exists(self.spill_path + '.replaying')
+        return stats
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_detection_writer(app):
+    """Get the process-wide detection writer, starting it on first use"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            from app import connect_db
+            config = app.config
+            _writer = DetectionWriter(
+                config['EVENT_SPILL_PATH'],
+                max_queue=config.get('EVENT_QUEUE_SIZE', 10000),
+                batch_size=config.get('EVENT_BATCH_SIZE', 500),
+                flush_interval=config.get('EVENT_FLUSH_SECONDS', 0.5),
+                retry_interval=config.get('EVENT_RETRY_SECONDS', 5.0),
+                reconnect=lambda: connect_db(config),
+                update_counters=config.get('STATS_COUNTERS', False)
+            )
+            _writer.start()
+            atexit.register(_writer.stop)
+        return _writer
+
+
+def get_writer_stats():
+    """Stats of the running writer, or None before it started"""
+    return _writer.stats() if _writer is not None else None
@@ -0,0 +1,194 @@
+import os
+import threading
+from app.models.person import Person
+from app.services.registry import get_face_service
+
+
+class GalleryService:
+    """Keeps the face gallery in step with the persons collection.
+
+    Only persons not marked 'found' are searchable. Changes arrive from a
+    Mongo change stream when the server supports one (replica sets);
+    otherwise the gallery version that every Person write bumps is polled.
+    Either way only the changed photos are added to or removed from the
+    matcher, so running streams pick them up without a restart and the
+    upload folder is never rescanned.
+    """
+
+    def __init__(self, face_service, upload_folder, mode='auto', poll_interval=2.0):
+        self.face_service = face_service
+        self.upload_folder = upload_folder
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.persons = {}
+        self.version = None
+        self.source = None
+        self._photos = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {'added': 0, 'removed': 0, 'reloads': 0, 'changes': 0}
+
+    def start(self):
+        """Load the searchable persons and start watching for changes"""
+        self.reload(prune=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='gallery-watch', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def person_for(self, photo_filename):
+        """The searchable person registered with a photo, or None"""
+        return self.persons.get(photo_filename)
+
+    def _add(self, person):
+        person_id = str(person['_id'])
+        photo = person['photo_path']
+
+        old_photo = self._photos.get(person_id)
+        if old_photo is not None and old_photo != photo:
+            self._remove(person_id)
+
+        self._photos[person_id] = photo
+        self.persons[photo] = person
+        if photo not in self.face_service.matcher:
+            embedding = self.face_service.activate_photo(photo, os.path.join(self.upload_folder, photo))
+            if embedding is not None:
+                self._stats['added'] += 1
+
+    def _remove(self, person_id):
+        photo = self._photos.pop(person_id, None)
+        if photo is None:
+            return
+        self.persons.pop(photo, None)
+        if self.face_service.deactivate_photo(photo):
+            self._stats['removed'] += 1
+
+    def apply(self, person):
+        """Add, update or (once found) remove one person"""
+        with self._lock:
+            if person.get('status') == 'found':
+                self._remove(str(person['_id']))
+            else:
+                self._add(person)
+
+    def remove(self, person_id):
+        """Drop a deleted person from the gallery"""
+        with self._lock:
+            self._remove(str(person_id))
+
+    def reload(self, prune=False):
+        """Diff the searchable persons against the gallery; prune also drops orphaned photos"""
+        if Person.get_collection() is None:
+            return
+
+        # Read the version first so a write during the query triggers another reload
+        version = Person.get_version()
+        persons = Person.get_searchable()
+
+        with self._lock:
+            active = {str(p['_id']) for p in persons}
+            for person_id in list(self._photos):
+                if person_id not in active:
+                    self._remove(person_id)
+            for person in persons:
+                self._add(person)
+
+            if prune:
+                # Photos of found or deleted persons left in the store from earlier runs
+                for label, _ in self.face_service.matcher.items():
+                    if label not in self.persons:
+                        self.face_service.deactivate_photo(label)
+
+            self.version = version
+            self._stats['reloads'] += 1
+
+        print(f"✓ Gallery: {len(self.persons)} searchable persons")
+
+    def _handle_change(self, change):
+        self._stats['changes'] += 1
+        operation = change['operationType']
+
+        if operation == 'delete':
+            self.remove(change['documentKey']['_id'])
+        elif operation in ('insert', 'update', 'replace'):
+            person = change.get('fullDocument')
+            if person is None:
+                self.remove(change['documentKey']['_id'])
+            else:
+                self.apply(person)
+        else:
+            # drop / rename / invalidate: start over from the collection
+            self.reload()
+
+    def _watch(self):
+        """Follow the change stream; False if the server does not support one"""
+        collection = Person.get_collection()
+        if collection is None:
+            return False
+
+        try:
+            stream = collection.watch(full_document='updateLookup', max_await_time_ms=1000)
+        except Exception as e:
+            print(f"Gallery: change streams unavailable ({e}), polling instead")
+            return False
+
+        self.source = 'change_stream'
+        with stream:
+            # Catch changes made between the initial load and opening the stream
+            self.reload()
+            while not self._stop.is_set():
+                try:
+                    change = stream.try_next()
+                    if change is not None:
+                        self._handle_change(change)
+                except Exception as e:
+                    print(f"Gallery change stream error: {e}")
+                    return False
+        return True
+
+    def _poll(self):
+        self.source = 'poll'
+        while not self._stop.wait(self.poll_interval):
+            try:
+                if Person.get_version() != self.version:
+                    self.reload()
+            except Exception as e:
+                print(f"Gallery poll error: {e}")
+
+    def _run(self):
+        if self.mode != 'poll' and self._watch():
+            return
+        self._poll()
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats.update(source=self.source, version=self.version, persons=len(self.persons))
+        return stats
+
+
+_gallery = None
+_gallery_lock = threading.Lock()
+
+
+def get_gallery(app):
+    """Get the process-wide gallery, loading and watching it on first use"""
+    global _gallery
+    with _gallery_lock:
+        if _gallery is None:
+            gallery = GalleryService(
+                get_face_service(app.config),
+                app.config['UPLOAD_FOLDER'],
+                mode=app.config.get('GALLERY_WATCH', 'auto'),
+                poll_interval=app.config.get('GALLERY_POLL_SECONDS', 2.0)
+            )
+            gallery.start()
+            _gallery = gallery
+        return _gallery
+
+
+def get_gallery_stats():
+    """Stats of the running gallery, or None before it started"""
+    return _gallery.stats() if _gallery is not None else None
@@ -0,0 +1,121 @@
+import inspect
+import os
+import cv2
+
+DEFAULT_CASCADE = 'haarcascade_frontalface_default.xml'
+MOTION_METHODS = ('diff', 'background')
+
+
+class MotionGate:
+    """Cheap pre-filter that skips recognition when nothing changed.
+
+    Each frame is downscaled to grayscale and compared with the previous
+    frame ('diff') or with a running-average background ('background').
+    If too few pixels changed the frame is skipped. An optional Haar
+    cascade then checks that something face-like is visible before the
+    full detector and recognizer run. After `max_skips` consecutive skips
+    one frame is always let through so a still scene is re-checked now
+    and then.
+    """
+
+    def __init__(self, enabled=True, method='diff', threshold=0.01, pixel_threshold=25,
+                 size=(160, 120), face_check=False, cascade_path=None, learning_rate=0.05,
+                 max_skips=30):
+        self.enabled = enabled
+        self.method = method
+        self.threshold = threshold
+        self.pixel_threshold = pixel_threshold
+        self.size = size
+        self.learning_rate = learning_rate
+        self.max_skips = max_skips
+
+        self.cascade = None
+        if face_check:
+            try:
+                cascade_path = cascade_path or os.path.join(cv2.data.haarcascades, DEFAULT_CASCADE)
+                self.cascade = cv2.CascadeClassifier(cascade_path)
+                if self.cascade.empty():
+                    raise ValueError(f"empty cascade {cascade_path}")
+            except Exception as e:
+                print(f"✗ Could not load face cascade, face check disabled: {e}")
+                self.cascade = None
+
+        self.last_motion = 1.0
+        self._previous = None
+        self._background = None
+        self._consecutive_skips = 0
+        self._stats = {'frames': 0, 'passed': 0, 'skipped_static': 0, 'skipped_no_face': 0}
+
+    def _motion(self, gray):
+        if self.method == 'background':
+            if self._background is None:
+                self._background = gray.astype('float32')
+                return 1.0
+            reference = cv2.convertScaleAbs(self._background)
+            cv2.accumulateWeighted(gray, self._background, self.learning_rate)
+        else:
+            reference = self._previous
+            self._previous = gray
+            if reference is None:
+                return 1.0
+
+        changed = cv2.absdiff(gray, reference) > self.pixel_threshold
+        return float(changed.mean())
+
+    def _has_face(self, frame):
+        # Twice the motion resolution is enough for the cascade and keeps it cheap
+        small = cv2.resize(frame, (self.size[0] * 2, self.size[1] * 2))
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        faces = self.cascade.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=3, minSize=(20, 20))
+        return len(faces) > 0
+
+    def check(self, frame):
+        """True if the frame should go on to the detector and recognizer"""
+        self._stats['frames'] += 1
+
+        if not self.enabled:
+            self._stats['passed'] += 1
+            return True
+
+        gray = cv2.cvtColor(cv2.resize(frame, self.size), cv2.COLOR_BGR2GRAY)
+        self.last_motion = self._motion(gray)
+        forced = self._consecutive_skips >= self.max_skips
+
+        if self.last_motion < self.threshold and not forced:
+            self._stats['skipped_static'] += 1
+            self._consecutive_skips += 1
+            return False
+
+        if self.cascade is not None and not forced and not self._has_face(frame):
+            self._stats['skipped_no_face'] += 1
+            self._consecutive_skips += 1
+            return False
+
+        self._consecutive_skips = 0
+        self._stats['passed'] += 1
+        return True
+
+    @property
+    def moving(self):
+        return self.last_motion >= self.threshold
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats['skipped'] = stats['skipped_static'] + stats['skipped_no_face']
+        stats['last_motion'] = round(self.last_motion, 4)
+        return stats
+
+
+def check_gate_config(gate, camera_id):
+    """Validate a camera's "gate" overrides so bad CAMERAS config fails at startup"""
+    if not isinstance(gate, dict):
+        raise ValueError(f"Camera {camera_id}: gate must be an object, got {gate!r}")
+
+    options = set(inspect.signature(MotionGate).parameters)
+    unknown = sorted(set(gate) - options)
+    if unknown:
+        raise ValueError(f"Camera {camera_id}: unknown gate option(s) {', '.join(unknown)}; "
+                         f"expected {', '.join(sorted(options))}")
+    if gate.get('method', 'diff') not in MOTION_METHODS:
+        raise ValueError(f"Camera {camera_id}: unsupported gate method {gate['method']!r}")
+    return gate
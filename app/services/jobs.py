@@ -0,0 +1,138 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class JobError(Exception):
+    """A job failed for a reason worth showing to the user"""
+
+
+class Job:
+    """One unit of background work and its outcome"""
+
+    def __init__(self, kind, label=None):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.label = label
+        self.status = 'pending'
+        self.result = None
+        self.error = None
+        self.created = datetime.now()
+        self.started = None
+        self.finished = None
+
+    def to_dict(self):
+        elapsed = (self.finished or time.time()) - self.started if self.started else None
+        return {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'label': self.label,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'created': self.created.isoformat(),
+            'elapsed': round(elapsed, 3) if elapsed is not None else None
+        }
+
+
+class JobQueue:
+    """In-process job queue: a small thread pool plus the status of recent jobs.
+
+    Requests submit work and return straight away with the job id; the
+    status is polled until the job is done or failed. Only the last
+    `max_jobs` jobs are remembered. Everything lives in this process, so
+    pending jobs are lost on restart; a job's own side effects must be
+    safe to redo.
+    """
+
+    def __init__(self, workers=2, max_jobs=1000, context=None):
+        self.max_jobs = max_jobs
+        self.context = context
+        self.jobs = OrderedDict()
+        self.submitted = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+
+    def submit(self, kind, fn, *args, label=None, **kwargs):
+        """Queue fn(*args, **kwargs); its return value becomes the job result"""
+        job = Job(kind, label)
+        with self._lock:
+            self.jobs[job.job_id] = job
+            self.submitted += 1
+            # Forget the oldest finished jobs
+            for old_id in [i for i, j in self.jobs.items() if j.status in ('done', 'failed')]:
+                if len(self.jobs) <= self.max_jobs:
+                    break
+                del self.jobs[old_id]
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = 'running'
+        job.started = time.time()
+        try:
+            if self.context is not None:
+                with self.context():
+                    job.result = fn(*args, **kwargs)
+            else:
+                job.result = fn(*args, **kwargs)
+            job.status = 'done'
+        except JobError as e:
+            job.error = str(e)
+            job.status = 'failed'
+        except Exception as e:
+            print(f"✗ {job.kind} job {job.job_id} failed: {e}")
+            job.error = f"Unexpected error: {e}"
+            job.status = 'failed'
+        finally:
+            job.finished = time.time()
+            if job.status == 'failed':
+                with self._lock:
+                    self.failed += 1
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def recent(self, kind=None, statuses=None, limit=20):
+        """Newest jobs first, optionally of one kind and status"""
+        with self._lock:
+            jobs = list(self.jobs.values())
+        jobs = [j for j in reversed(jobs)
+                if (kind is None or j.kind == kind) and (statuses is None or j.status in statuses)]
+        return jobs[:limit]
+
+    def stats(self):
+        with self._lock:
+            pending = sum(1 for j in self.jobs.values() if j.status == 'pending')
+            running = sum(1 for j in self.jobs.values() if j.status == 'running')
+            return {'submitted': self.submitted, 'failed': self.failed, 'pending': pending, 'running': running}
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue(app):
+    """Get the process-wide job queue; jobs run inside the app context"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(
+                workers=app.config.get('JOB_WORKERS', 2),
+                max_jobs=app.config.get('JOB_HISTORY', 1000),
+                context=app.app_context
+            )
+        return _queue
+
+
+def get_job_stats():
+    """Queue stats for the health endpoint, or None before the first job"""
+    return _queue.stats() if _queue is not None else None
@@ -0,0 +1,162 @@
+import threading
+import numpy as np
+
+DISTANCE_METRICS = ('cosine', 'euclidean', 'euclidean_l2')
+
+
+def top_matches(distances, labels, threshold, top_k=5):
+    """Top-k matches under threshold from one row of distances"""
+    matches = []
+    if not len(labels):
+        return matches
+
+    k = min(top_k, len(labels))
+    candidates = np.argpartition(distances, k - 1)[:k]
+    for j in candidates[np.argsort(distances[candidates])]:
+        distance = float(distances[j])
+        if distance >= threshold:
+            break
+
+        confidence = 1 - (distance / threshold)
+        confidence = max(0, min(1, confidence))
+
+        matches.append({
+            'photo_filename': labels[j],
+            'confidence': float(confidence),
+            'distance': distance,
+            'verified': True
+        })
+
+    return matches
+
+
+class EmbeddingMatcher:
+    """Vectorized 1:N face matcher.
+
+    Gallery embeddings live in one contiguous float32 matrix of L2-normalized
+    rows plus a vector of their original norms. A batch of probes is scored
+    against the whole gallery with a single matrix product; the norms let the
+    same product serve cosine, euclidean and euclidean_l2 distances.
+    """
+
+    def __init__(self, distance_metric='cosine'):
+        if distance_metric not in DISTANCE_METRICS:
+            raise ValueError(f"Unsupported distance metric: {distance_metric}")
+
+        self.distance_metric = distance_metric
+        self.labels = []
+        self._index = {}
+        self._matrix = None
+        self._norms = None
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1)
+        safe = np.where(norms > 0, norms, 1.0)
+        return vectors / safe[:, None], norms
+
+    def build(self, items):
+        """Replace the gallery with (label, embedding) pairs"""
+        items = list(items)
+
+        with self._lock:
+            self.labels = [label for label, _ in items]
+            self._index = {label: i for i, label in enumerate(self.labels)}
+            self._size = len(items)
+
+            if items:
+                matrix, norms = self._normalize([vector for _, vector in items])
+                self._matrix = np.ascontiguousarray(matrix)
+                self._norms = norms
+            else:
+                self._matrix = None
+                self._norms = None
+
+    def add(self, label, embedding):
+        """Add or replace a single gallery embedding"""
+        row, norm = self._normalize(embedding)
+
+        with self._lock:
+            if label in self._index:
+                i = self._index[label]
+                self._matrix[i] = row[0]
+                self._norms[i] = norm[0]
+                return
+
+            if self._matrix is None:
+                self._matrix = np.empty((8, row.shape[1]), dtype=np.float32)
+                self._norms = np.empty(8, dtype=np.float32)
+            elif self._size == len(self._matrix):
+                # Grow geometrically so repeated adds stay amortized O(1)
+                self._matrix = np.concatenate([self._matrix, np.empty_like(self._matrix)])
+                self._norms = np.concatenate([self._norms, np.empty_like(self._norms)])
+
+            self._matrix[self._size] = row[0]
+            self._norms[self._size] = norm[0]
+            self._index[label] = self._size
+            self.labels.append(label)
+            self._size += 1
+
+    def remove(self, label):
+        """Remove a gallery embedding; returns False if it was not present"""
+        with self._lock:
+            i = self._index.pop(label, None)
+            if i is None:
+                return False
+
+            # Move the last row into the hole to keep the matrix dense
+            last = self._size - 1
+            if i != last:
+                self._matrix[i] = self._matrix[last]
+                self._norms[i] = self._norms[last]
+                self.labels[i] = self.labels[last]
+                self._index[self.labels[i]] = i
+            self.labels.pop()
+            self._size = last
+            return True
+
+    def distances(self, probes):
+        """Distance matrix of shape (n_probes, n_gallery)"""
+        probes, probe_norms = self._normalize(probes)
+
+        with self._lock:
+            if self._size == 0:
+                return np.empty((len(probes), 0), dtype=np.float32), []
+            gallery = self._matrix[:self._size]
+            gallery_norms = self._norms[:self._size]
+            labels = list(self.labels)
+
+            similarity = probes @ gallery.T
+
+        if self.distance_metric == 'cosine':
+            distances = 1.0 - similarity
+        elif self.distance_metric == 'euclidean_l2':
+            distances = np.sqrt(np.maximum(2.0 - 2.0 * similarity, 0.0))
+        else:
+            squared = (probe_norms[:, None] ** 2 + gallery_norms[None, :] ** 2
+                       - 2.0 * probe_norms[:, None] * gallery_norms[None, :] * similarity)
+            distances = np.sqrt(np.maximum(squared, 0.0))
+
+        return distances, labels
+
+    def items(self):
+        """Snapshot of (label, embedding) pairs"""
+        with self._lock:
+            if self._size == 0:
+                return []
+            vectors = self._matrix[:self._size] * self._norms[:self._size, None]
+            return list(zip(self.labels, vectors))
+
+    def search(self, probes, threshold, top_k=5):
+        """Top-k matches under threshold for each probe"""
+        distances, labels = self.distances(probes)
+        return [top_matches(row, labels, threshold, top_k) for row in distances]
+
+    def __contains__(self, label):
+        return label in self._index
+
+    def __len__(self):
+        return self._size
@@ -0,0 +1,287 @@
+import threading
+import time
+from datetime import datetime
+import cv2
+from app.services.registry import get_face_service
+from app.services.gallery import get_gallery
+from app.services.events import get_detection_writer
+from app.services.broker import get_event_broker
+from app.services.sightings import get_sighting_store
+from app.services.scheduler import get_inference_scheduler
+from app.services.workers import get_inference_backend
+from app.services.cadence import AdaptiveCadence
+from app.services.gate import MotionGate
+from app.services.tracking import FaceTracker, UNKNOWN_RECHECK_SECONDS
+from app.services.aggregator import VoteAggregator
+
+
+class DetectionPipeline:
+    """Background face detection for one camera.
+
+    Reads the latest frame published by a CameraSource, tracks faces
+    across passes and only sends new tracks (or tracks due for a
+    re-check) to the recognizer. Results are voted per track and one
+    detection is logged, with the camera's id and location, once the vote
+    passes. Viewers draw `latest_detection` on their own frames.
+    """
+
+    def __init__(self, app, camera, detection_size=(320, 240)):
+        self.app = app
+        self.camera = camera
+        self.detection_size = detection_size
+        self.cadence = AdaptiveCadence(
+            min_interval=app.config.get('DETECTION_MIN_INTERVAL', 0.0),
+            max_interval=app.config.get('DETECTION_MAX_INTERVAL', 2.0),
+            min_frame_gap=app.config.get('SKIP_DETECTION_FRAMES', 5)
+        )
+
+        # Global gate settings, overridable per camera with a "gate" entry in CAMERAS
+        gate_config = {
+            'enabled': app.config.get('MOTION_GATE', True),
+            'method': app.config.get('MOTION_METHOD', 'diff'),
+            'threshold': app.config.get('MOTION_THRESHOLD', 0.01),
+            'face_check': app.config.get('FACE_PRESENCE_CHECK', False)
+        }
+        gate_config.update(camera.gate)
+        self.gate = MotionGate(**gate_config)
+
+        self.latest_detection = []
+        self.detection_count = 0
+        self._face_service = None
+        self._gallery = None
+        self._sightings = None
+        self._sighting_times = {}
+        self.sighting_interval = app.config.get('SIGHTING_INTERVAL_SECONDS', 5.0)
+        self.recognitions_skipped = 0
+        self.tracker = FaceTracker(
+            iou_threshold=app.config.get('TRACK_IOU_THRESHOLD', 0.3),
+            max_missed=app.config.get('TRACK_MAX_MISSED', 5),
+            recheck_interval=app.config.get('TRACK_RECHECK_SECONDS', 5.0),
+            unknown_recheck_interval=app.config.get('TRACK_UNKNOWN_RECHECK_SECONDS', UNKNOWN_RECHECK_SECONDS)
+        )
+        self.aggregator = VoteAggregator(
+            window=app.config.get('VOTE_WINDOW', 5),
+            min_votes=app.config.get('VOTE_MIN', 3),
+            max_age=app.config.get('VOTE_MAX_AGE_SECONDS', 10.0)
+        )
+        self._track_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the detection thread"""
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"detection-{self.camera.camera_id}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the detection thread"""
+        self._stop.set()
+
+    def _run(self):
+        with self.app.app_context():
+            try:
+                face_service = get_face_service(self.app.config)
+                backend = get_inference_backend(self.app)
+                scheduler = None if backend else get_inference_scheduler(self.app)
+                # Persons registered, deleted or found later reach the gallery while we run
+                gallery = get_gallery(self.app)
+                sightings = get_sighting_store(self.app)
+            except Exception as e:
+                print(f"❌ {self.camera.camera_id}: face service failed: {e}")
+                return
+
+            self._face_service = face_service
+            self._gallery = gallery
+            self._sightings = sightings
+            last_seq = 0
+            processed_seq = 0
+
+            print(f"✓ Detection started for {self.camera.camera_id} ({self.camera.location})")
+
+            while not self._stop.is_set():
+                try:
+                    last_seq, frame = self.camera.read_latest(last_seq)
+                    if frame is None or not self.cadence.due(last_seq, processed_seq):
+                        continue
+                    processed_seq = last_seq
+
+                    # Skip the detector and recognizer when the scene has not changed
+                    if not self.gate.check(frame):
+                        self._stop.wait(self.cadence.update(False))
+                        continue
+
+                    if backend is not None:
+                        # Detection and embedding run in a worker process
+                        faces = self.analyze_in_pool(backend, frame)
+                    elif scheduler is not None:
+                        # Detect here, recognize in the shared cross-camera batch
+                        faces = self.submit_frame(scheduler, frame)
+                    else:
+                        faces = self.process_frame(frame)
+
+                    # Run again right away while something is happening, back off otherwise
+                    delay = self.cadence.update(faces > 0 or self.gate.moving)
+                    if delay:
+                        self._stop.wait(delay)
+
+                except Exception as e:
+                    print(f"Detection worker error ({self.camera.camera_id}): {e}")
+                    self._stop.wait(1.0)
+
+            self.latest_detection = []
+            print(f"Detection stopped for {self.camera.camera_id}")
+
+    def _scale_boxes(self, items, frame, small_frame):
+        """Map face boxes back to full-resolution coordinates"""
+        scale_x = frame.shape[1] / small_frame.shape[1]
+        scale_y = frame.shape[0] / small_frame.shape[0]
+        for item in items:
+            x, y, w, h = item['box']
+            item['box'] = [int(x * scale_x), int(y * scale_y), int(w * scale_x), int(h * scale_y)]
+        return items
+
+    def track_faces(self, faces):
+        """Attach track ids to faces; returns the faces that need recognition"""
+        now = time.time()
+
+        with self._track_lock:
+            tracks = self.tracker.update([face['box'] for face in faces], now)
+            for track_id in self.tracker.expired:
+                self.aggregator.forget(self.camera.camera_id, track_id)
+                self._sighting_times.pop(track_id, None)
+
+            pending = []
+            for face, track in zip(faces, tracks):
+                face['track_id'] = track.track_id
+                if self.tracker.needs_recognition(track, now):
+                    # Marked now so an in-flight batch is not submitted twice
+                    track.last_recognized = now
+                    pending.append(face)
+
+            self._publish()
+
+        self.recognitions_skipped += len(faces) - len(pending)
+        return pending
+
+    def process_frame(self, frame):
+        """Detect, track and identify faces in one full-resolution frame; returns the face count"""
+        small_frame = cv2.resize(frame, self.detection_size)
+        faces = self._scale_boxes(self._face_service.detect_faces(small_frame), frame, small_frame)
+
+        pending = self.track_faces(faces)
+        if pending:
+            # Always embed: unmatched faces are kept as sightings, even with an empty gallery
+            embeddings = self._face_service.embed_faces([face['face'] for face in pending])
+            self.handle_matches(pending, self._face_service.match_embeddings(pending, embeddings))
+        return len(faces)
+
+    def analyze_in_pool(self, backend, frame):
+        """Detect and embed in the process pool, match against the gallery here"""
+        small_frame = cv2.resize(frame, self.detection_size)
+        faces, embeddings = backend.analyze(small_frame)
+        self._scale_boxes(faces, frame, small_frame)
+
+        for i, face in enumerate(faces):
+            face['embedding_index'] = i
+        pending = self.track_faces(faces)
+        if pending:
+            rows = [face['embedding_index'] for face in pending]
+            self.handle_matches(pending, self._face_service.match_embeddings(pending, embeddings[rows]))
+        return len(faces)
+
+    def submit_frame(self, scheduler, frame):
+        """Detect and track faces, queueing new or due tracks for batched recognition"""
+        small_frame = cv2.resize(frame, self.detection_size)
+        faces = self._scale_boxes(self._face_service.detect_faces(small_frame), frame, small_frame)
+
+        pending = self.track_faces(faces)
+        if pending:
+            scheduler.submit(self.camera.camera_id, pending,
+                             lambda request, matches: self.handle_matches(request.faces, matches))
+        return len(faces)
+
+    def handle_matches(self, faces, detected):
+        """Vote recognition results per track and log tracks whose vote passes"""
+        matches = {det['track_id']: det for det in detected}
+        events = []
+        unknown = []
+        now = time.time()
+
+        with self._track_lock:
+            for face in faces:
+                track = self.tracker.get(face['track_id'])
+                if track is None:
+                    continue
+
+                det = matches.get(face['track_id'])
+                person = self._gallery.person_for(det['photo_filename']) if det else None
+                if person is not None:
+                    det['person_id'] = str(person['_id'])
+                    det['name'] = person['name']
+                else:
+                    det = None
+                    unknown.append((face, track))
+
+                # A single frame never raises an alert; the track's recent votes decide
+                event = self.aggregator.add(self.camera.camera_id, track.track_id, det, now)
+                if event is not None:
+                    track.identity = event
+                    events.append(event)
+
+            self._publish()
+
+        self.record_sightings(unknown, now)
+
+        if events:
+            self.detection_count += 1
+            print(f"🎯 DETECTION #{self.detection_count} on {self.camera.camera_id} 🎯")
+            for event in events:
+                print(f"  MATCH: {event['name']} ({event['confidence']:.1%}) over "
+                      f"{event['frame_count']} frames, track {event['track_id']}")
+                self.log_detection(event)
+
+        return events
+
+    def record_sightings(self, faces, now):
+        """Keep the embedding of unmatched faces (at most one per track per interval) for retro-search"""
+        if self._sightings is None:
+            return
+
+        for face, track in faces:
+            if face.get('embedding') is None:
+                continue
+            if now - self._sighting_times.get(track.track_id, 0) < self.sighting_interval:
+                continue
+            self._sighting_times[track.track_id] = now
+            try:
+                self._sightings.append(self.camera.camera_id, self.camera.location,
+                                       face['embedding'], face['box'], now)
+            except Exception as e:
+                print(f"Sighting store error ({self.camera.camera_id}): {e}")
+
+    def _publish(self):
+        """Expose identified, currently visible tracks for overlays"""
+        self.latest_detection = [
+            dict(track.identity, box=track.box, track_id=track.track_id)
+            for track in self.tracker.visible() if track.identity
+        ]
+
+    def log_detection(self, det):
+        """Queue a detection event for this camera and push it to live feeds"""
+        event = {
+            'person_id': det['person_id'],
+            'person_name': det['name'],
+            'camera_id': self.camera.camera_id,
+            'location': self.camera.location,
+            'confidence': det['confidence'],
+            'timestamp': datetime.now()
+        }
+        for key in ('track_id', 'min_distance', 'mean_distance', 'frame_count'):
+            if det.get(key) is not None:
+                event[key] = det[key]
+        get_detection_writer(self.app).submit(event)
+        # Live feed subscribers get the event now, not when the batch is stored
+        get_event_broker().publish(event)
@@ -0,0 +1,59 @@
+import os
+from app.models.person import Person
+from app.services.bulk_import import embed_rows
+from app.services.jobs import JobError, get_job_queue
+from app.services.registry import get_face_service
+from app.services.sightings import get_retro_search
+from app.utils.helpers import remove_stored_image, save_face_crop
+
+
+def register_person(app, name, age, contact, description, filename, filepath, image=None):
+    """Detect, embed and store a newly uploaded person (runs as a job).
+
+    The photo (the decoded upload in `image`, else read from `filepath`)
+    is detected once; its largest face is embedded and the crop kept. When
+    that fails the stored photo is deleted and the job fails with a
+    readable reason.
+    The embedding is stored before the person document so the gallery
+    finds it when it sees the new person.
+    """
+    embedded = False
+    try:
+        service = get_face_service(app.config)
+        [(_, embedding, face, error)] = embed_rows(service, [(0, image if image is not None else filepath)])
+        if error == 'no face detected':
+            raise JobError('No face detected in image. Please upload a clear photo showing the face.')
+        if error is not None:
+            raise JobError(f"Could not process the photo: {error}")
+
+        save_face_crop(app.config['UPLOAD_FOLDER'], filename, face)
+        embedding = service.add_embedding(filename, embedding)
+        embedded = True
+        person_id = Person.create(name, age, contact, filename, description)
+    except Exception:
+        # Nothing refers to the upload yet; an embedding without a person must not match either
+        if embedded:
+            service.remove_photo(filename)
+        remove_stored_image(os.path.dirname(filepath), filename)
+        raise
+
+    # Check in the background whether a camera already saw this person
+    retro_search = get_retro_search(app)
+    if retro_search is not None:
+        retro_search.submit(person_id, name, embedding)
+
+    return {'person_id': person_id, 'name': name}
+
+
+def submit_registration(app, name, age, contact, description, filename, filepath, image=None):
+    """Queue register_person; returns the pending job"""
+    return get_job_queue(app).submit(
+        'register', register_person, app, name, age, contact, description, filename, filepath, image,
+        label=name
+    )
+
+
+def check_face(app, image):
+    """Whether a decoded image contains a face (runs as a job)"""
+    service = get_face_service(app.config)
+    return {'has_face': service.verify_face_in_image(image)}
@@ -0,0 +1,90 @@
+import threading
+import time
+from flask import current_app
+
+# One face service per process, shared by every request, stream and worker
+_service = None
+_lock = threading.Lock()
+_status = {
+    'ready': False,
+    'loading': False,
+    'error': None,
+    'load_seconds': None,
+    'warmup_seconds': None
+}
+
+
+def _build_service(config):
+    from app.services.search import FaceSearchService
+    from app.services.embeddings import EmbeddingStore
+    from app.services.ann import create_matcher
+
+    model = config.get('DEEPFACE_MODEL', 'VGG-Face')
+    detector = config.get('DETECTOR_BACKEND', 'opencv')
+    metric = config.get('DISTANCE_METRIC', 'cosine')
+
+    print("\nInitializing Face Service...")
+    service = FaceSearchService(
+        model_name=model,
+        detector_backend=detector,
+        distance_metric=metric,
+        embedding_store=EmbeddingStore(config['EMBEDDINGS_FOLDER'], model, detector),
+        matcher=create_matcher(config)
+    )
+    service.threshold = config.get('RECOGNITION_THRESHOLD', 0.70)
+    service.top_k = config.get('MATCH_TOP_K', 5)
+    print(f"  Threshold: {service.threshold}")
+
+    return service
+
+
+def get_face_service(config=None):
+    """Get the process-wide face service, creating it on first use"""
+    global _service
+
+    if _service is not None:
+        return _service
+
+    with _lock:
+        if _service is None:
+            config = config if config is not None else current_app.config
+            _status['loading'] = True
+            started = time.time()
+            try:
+                service = _build_service(config)
+                service.load_models()
+                _status['load_seconds'] = round(time.time() - started, 2)
+
+                if config.get('WARMUP_MODELS', True):
+                    started = time.time()
+                    service.warm_up()
+                    _status['warmup_seconds'] = round(time.time() - started, 2)
+
+                _service = service
+                _status['ready'] = True
+                _status['error'] = None
+                print("✓ Face service ready\n")
+            except Exception as e:
+                _status['error'] = str(e)
+                raise
+            finally:
+                _status['loading'] = False
+
+    return _service
+
+
+def init_face_service(app):
+    """Load (and optionally warm) the face service at startup"""
+    if not app.config.get('PRELOAD_MODELS', True):
+        return None
+
+    try:
+        return get_face_service(app.config)
+    except Exception as e:
+        print(f"✗ Face service preload failed: {e}")
+        return None
+
+
+def get_service_status():
+    """Readiness information for health checks"""
+    return dict(_status)
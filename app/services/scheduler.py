@@ -0,0 +1,205 @@
+import threading
+import time
+from collections import deque
+
+
+class InferenceRequest:
+    """Face crops from one camera frame waiting for recognition"""
+
+    def __init__(self, camera_id, faces, callback):
+        self.camera_id = camera_id
+        self.faces = faces
+        self.callback = callback
+        self.submitted = time.time()
+
+
+class InferenceScheduler:
+    """Batches face recognition across cameras.
+
+    Cameras submit detected face crops; a single thread gathers requests
+    for up to `batch_window` seconds and embeds all crops in one forward
+    pass. Each camera keeps at most `max_pending` requests: when it
+    submits faster than the recognizer keeps up, its oldest request is
+    dropped. Batches are filled round-robin across cameras, starting
+    from a different camera each time, so a busy camera cannot starve
+    the others.
+    """
+
+    def __init__(self, face_service, batch_window=0.05, max_batch_size=32, max_pending=1):
+        self.face_service = face_service
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.max_pending = max_pending
+
+        self._queues = {}
+        self._order = []
+        self._next = 0
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._camera_stats = {}
+        self._batches = 0
+        self._batched_faces = 0
+        self._last_batch_size = 0
+
+    def start(self):
+        """Start the scheduler thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='inference-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the scheduler thread"""
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+
+    def submit(self, camera_id, faces, callback):
+        """Queue faces for recognition; callback(request, matches) runs on the scheduler thread"""
+        request = InferenceRequest(camera_id, faces, callback)
+
+        with self._condition:
+            if camera_id not in self._queues:
+                self._queues[camera_id] = deque()
+                self._order.append(camera_id)
+                self._camera_stats[camera_id] = {
+                    'submitted': 0, 'processed': 0, 'dropped': 0, 'faces': 0, 'lag_ms': 0.0
+                }
+
+            queue = self._queues[camera_id]
+            stats = self._camera_stats[camera_id]
+            stats['submitted'] += 1
+
+            # Back-pressure: the oldest frame of this camera is the one that goes
+            while len(queue) >= self.max_pending:
+                queue.popleft()
+                stats['dropped'] += 1
+
+            queue.append(request)
+            self._condition.notify()
+
+        return request
+
+    def _has_pending(self):
+        return any(self._queues.values())
+
+    def _take_batch(self):
+        """Round-robin requests across cameras up to max_batch_size faces"""
+        batch = []
+        faces = 0
+        cameras = len(self._order)
+        start = self._next
+        self._next = (start + 1) % cameras
+
+        progress = True
+        while progress and faces < self.max_batch_size:
+            progress = False
+            for offset in range(cameras):
+                queue = self._queues[self._order[(start + offset) % cameras]]
+                if not queue:
+                    continue
+
+                size = len(queue[0].faces)
+                if batch and faces + size > self.max_batch_size:
+                    continue
+
+                batch.append(queue.popleft())
+                faces += size
+                progress = True
+                if faces >= self.max_batch_size:
+                    break
+
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._condition:
+                self._condition.wait_for(lambda: self._has_pending() or self._stop.is_set())
+                if self._stop.is_set():
+                    break
+
+            # Give other cameras a moment to contribute to the batch
+            self._stop.wait(self.batch_window)
+
+            with self._condition:
+                batch = self._take_batch()
+
+            if batch:
+                self._process(batch)
+
+    def _process(self, batch):
+        faces = [face for request in batch for face in request.faces]
+
+        try:
+            embeddings = self.face_service.embed_faces([face['face'] for face in faces])
+        except Exception as e:
+            print(f"Batch inference error: {e}")
+            return
+
+        offset = 0
+        finished = time.time()
+        for request in batch:
+            count = len(request.faces)
+            matches = self.face_service.match_embeddings(request.faces, embeddings[offset:offset + count])
+            offset += count
+
+            with self._condition:
+                stats = self._camera_stats[request.camera_id]
+                stats['processed'] += 1
+                stats['faces'] += count
+                stats['lag_ms'] = round((finished - request.submitted) * 1000, 1)
+
+            try:
+                request.callback(request, matches)
+            except Exception as e:
+                print(f"Detection callback error ({request.camera_id}): {e}")
+
+        with self._condition:
+            self._batches += 1
+            self._batched_faces += len(faces)
+            self._last_batch_size = len(faces)
+
+    def stats(self):
+        """Batch sizes and per-camera lag/drop counters"""
+        with self._condition:
+            return {
+                'batches': self._batches,
+                'last_batch_size': self._last_batch_size,
+                'avg_batch_size': round(self._batched_faces / self._batches, 2) if self._batches else 0,
+                'cameras': {
+                    camera_id: dict(stats, pending=len(self._queues[camera_id]))
+                    for camera_id, stats in self._camera_stats.items()
+                }
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_inference_scheduler(app):
+    """Get the process-wide inference scheduler, or None if batching is disabled"""
+    global _scheduler
+
+    if not app.config.get('BATCH_INFERENCE', True):
+        return None
+
+    with _scheduler_lock:
+        if _scheduler is None:
+            from app.services.registry import get_face_service
+            _scheduler = InferenceScheduler(
+                get_face_service(app.config),
+                batch_window=app.config.get('BATCH_WINDOW_MS', 50) / 1000.0,
+                max_batch_size=app.config.get('MAX_BATCH_SIZE', 32),
+                max_pending=app.config.get('MAX_PENDING_PER_CAMERA', 1)
+            )
+            _scheduler.start()
+        return _scheduler
+
+
+def get_scheduler_stats():
+    """Stats of the running scheduler, if any"""
+    return _scheduler.stats() if _scheduler is not None else None
@@ -1,33 +1,52 @@
-import cv2
 import numpy as np
 from deepface import DeepFace
-from datetime import datetime
-import os
-import tempfile
+from app.services.embeddings import EmbeddingStore
+from app.services.matcher import EmbeddingMatcher
 
 
 class FaceSearchService:
     """Face detection and recognition service using DeepFace"""
     
-    def __init__(self, model_name='Facenet512', distance_metric='cosine', detector_backend='opencv'):
+    def __init__(self, model_name='Facenet512', distance_metric='cosine', detector_backend='opencv',
+                 embedding_store=None, matcher=None):
         self.model_name = model_name
         self.distance_metric = distance_metric
         self.detector_backend = detector_backend
-        self.last_detection = {}
         
-        # Default threshold - will be overridden by config
+        # Gallery embeddings are computed once per photo, not per frame
+        if embedding_store is None:
+            embedding_store = EmbeddingStore(None, model_name, detector_backend, use_mongo=False)
+        self.embedding_store = embedding_store
+        # Exact matrix scan by default; an IVFIndex can be passed for large galleries
+        self.matcher = matcher if matcher is not None else EmbeddingMatcher(distance_metric)
+        self.matcher.build(embedding_store.items())
+        
+        # Defaults - will be overridden by config
         self.threshold = 0.50
+        self.top_k = 5
         
         print(f"✓ Face service initialized:")
         print(f"  Model: {model_name}")
         print(f"  Metric: {distance_metric}")
         print(f"  Detector: {detector_backend}")
     
-    def verify_face_in_image(self, image_path):
-        """Verify that image contains a face"""
+    def load_models(self):
+        """Load the recognition model into memory"""
+        DeepFace.build_model(model_name=self.model_name)
+        print(f"✓ Loaded {self.model_name}")
+    
+    def warm_up(self):
+        """Run one dummy inference so the first real request is not slow"""
+        dummy = np.zeros((224, 224, 3), dtype=np.uint8)
+        self.detect_faces(dummy)
+        self.embed_faces([dummy])
+        print(f"✓ Warmed up {self.model_name}/{self.detector_backend}")
+    
+    def verify_face_in_image(self, image):
+        """Verify that an image (file path or BGR array) contains a face"""
         try:
             faces = DeepFace.extract_faces(
-                img_path=image_path,
+                img_path=image,
                 detector_backend=self.detector_backend,
                 enforce_detection=False
             )
@@ -43,88 +62,168 @@ class FaceSearchService:
             print(f"✗ Face detection error: {e}")
             return False
     
-    def find_person_in_frame(self, frame, database_path, threshold=None):
-        """Find registered persons in video frame"""
-        if threshold is None:
-            threshold = self.threshold
+    def represent(self, img):
+        """Compute embeddings for every face found in an image"""
+        return DeepFace.represent(
+            img_path=img,
+            model_name=self.model_name,
+            detector_backend=self.detector_backend,
+            enforce_detection=False
+        )
+    
+    def embed_face(self, img):
+        """Embedding of the most prominent face in an image"""
+        faces = self.represent(img)
+        if not faces:
+            return None
         
-        detected_persons = []
-        temp_frame_path = None
+        face = max(faces, key=lambda f: f['facial_area']['w'] * f['facial_area']['h'])
+        return np.asarray(face['embedding'], dtype=np.float32)
+    
+    def detect_faces(self, img):
+        """Run the detector once and return every face crop with its box"""
+        faces = DeepFace.extract_faces(
+            img_path=img,
+            detector_backend=self.detector_backend,
+            enforce_detection=False
+        )
         
-        try:
-            # Save frame temporarily
-            with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as tmp:
-                temp_frame_path = tmp.name
-                cv2.imwrite(temp_frame_path, frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+        detections = []
+        for face in faces:
+            # With enforce_detection=False a faceless image comes back whole with confidence 0
+            if not face.get('confidence'):
+                continue
             
-            # Get registered images
-            if not os.path.exists(database_path):
-                print(f"Database path not found: {database_path}")
-                return detected_persons
+            area = face['facial_area']
+            crop = face['face']
+            if crop.dtype != np.uint8:
+                crop = (crop * 255).astype(np.uint8)
             
-            registered_images = [f for f in os.listdir(database_path) 
-                                if f.lower().endswith(('.jpg', '.jpeg', '.png', '.gif'))]
-            
-            if not registered_images:
-                print("No registered images found")
-                return detected_persons
-            
-            print(f"Checking against {len(registered_images)} registered image(s)...")
+            detections.append({
+                'face': crop[:, :, ::-1],  # DeepFace returns RGB crops, models expect BGR
+                'box': [int(area['x']), int(area['y']), int(area['w']), int(area['h'])],
+                'detector_confidence': float(face['confidence'])
+            })
+        
+        return detections
+    
+    def embed_faces(self, crops):
+        """Embed pre-detected face crops in one batched forward pass"""
+        if not crops:
+            return np.empty((0, 0), dtype=np.float32)
+        
+        try:
+            # Recent DeepFace releases accept a list of images and batch the model call
+            results = DeepFace.represent(
+                img_path=list(crops),
+                model_name=self.model_name,
+                detector_backend='skip',
+                enforce_detection=False
+            )
+            if len(results) != len(crops):
+                raise ValueError("batched represent returned an unexpected shape")
+        except Exception:
+            results = [DeepFace.represent(
+                img_path=crop,
+                model_name=self.model_name,
+                detector_backend='skip',
+                enforce_detection=False
+            ) for crop in crops]
+        
+        embeddings = []
+        for result in results:
+            if isinstance(result, list):
+                result = result[0]
+            embeddings.append(result['embedding'])
+        
+        return np.asarray(embeddings, dtype=np.float32)
+    
+    def match_faces(self, faces, threshold=None):
+        """Match detected faces against the gallery, one result per matched face
+        
+        Faces are embedded even when the gallery is empty: unmatched faces
+        keep their embedding for the sighting store.
+        """
+        if not faces:
+            return []
+        
+        embeddings = self.embed_faces([face['face'] for face in faces])
+        return self.match_embeddings(faces, embeddings, threshold)
+    
+    def match_embeddings(self, faces, embeddings, threshold=None):
+        """Match already-embedded faces against the gallery"""
+        if threshold is None:
+            threshold = self.threshold
+        
+        # Kept on the face so callers can store embeddings of faces nobody matched
+        for face, embedding in zip(faces, embeddings):
+            face['embedding'] = embedding
+        
+        if not faces or len(self.matcher) == 0:
+            return []
+        
+        results = self.matcher.search(embeddings, threshold, self.top_k)
+        
+        detected_persons = []
+        for face, matches in zip(faces, results):
+            if not matches:
+                continue
             
-            # Compare against each registered person
-            for img_file in registered_images:
-                try:
-                    img_path = os.path.join(database_path, img_file)
-                    
-                    # Verify faces match
-                    result = DeepFace.verify(
-                        img1_path=temp_frame_path,
-                        img2_path=img_path,
-                        model_name=self.model_name,
-                        distance_metric=self.distance_metric,
-                        detector_backend=self.detector_backend,
-                        enforce_detection=False
-                    )
-                    
-                    distance = result['distance']
-                    
-                    print(f"  {img_file}: distance = {distance:.4f} (threshold = {threshold:.4f})")
-                    
-                    # Check if match
-                    if distance < threshold:
-                        confidence = 1 - (distance / threshold)
-                        confidence = max(0, min(1, confidence))
-                        
-                        detected_persons.append({
-                            'photo_filename': img_file,
-                            'confidence': float(confidence),
-                            'distance': float(distance),
-                            'verified': True
-                        })
-                        print(f"  ✓✓✓ MATCH! {img_file}")
-                
-                except Exception as e:
-                    print(f"  Error comparing {img_file}: {e}")
-                    continue
+            best = dict(matches[0])
+            best['box'] = face['box']
+            if 'track_id' in face:
+                best['track_id'] = face['track_id']
+            best['alternatives'] = matches[1:]
+            detected_persons.append(best)
         
+        return detected_persons
+    
+    def register_photo(self, photo_filename, image):
+        """Compute and store the gallery embedding for a registered photo"""
+        try:
+            embedding = self.embed_face(image)
         except Exception as e:
-            print(f"Frame detection error: {e}")
+            print(f"✗ Embedding error for {photo_filename}: {e}")
+            return None
         
-        finally:
-            if temp_frame_path and os.path.exists(temp_frame_path):
-                try:
-                    os.remove(temp_frame_path)
-                except:
-                    pass
+        if embedding is None:
+            print(f"✗ No embedding computed for {photo_filename}")
+            return None
         
-        return detected_persons
+        return self.add_embedding(photo_filename, embedding)
+    
+    def add_embedding(self, photo_filename, embedding):
+        """Store an already computed gallery embedding and make it searchable"""
+        embedding = self.embedding_store.put(photo_filename, embedding)
+        self.matcher.add(photo_filename, embedding)
+        print(f"✓ Stored embedding for {photo_filename}")
+        return embedding
+    
+    def remove_photo(self, photo_filename):
+        """Drop a photo from the gallery"""
+        self.matcher.remove(photo_filename)
+        self.embedding_store.remove(photo_filename)
+        print(f"✓ Removed {photo_filename} from gallery")
+    
+    def activate_photo(self, photo_filename, image):
+        """Make a photo searchable, reusing its stored embedding when there is one"""
+        embedding = self.embedding_store.get(photo_filename)
+        if embedding is None:
+            return self.register_photo(photo_filename, image)
+        
+        self.matcher.add(photo_filename, embedding)
+        return embedding
     
-    def compare_faces(self, img1_path, img2_path):
-        """Compare two face images"""
+    def deactivate_photo(self, photo_filename):
+        """Stop matching a photo but keep its embedding (e.g. person found)"""
+        return self.matcher.remove(photo_filename)
+    
+    def compare_faces(self, img1, img2):
+        """Compare two face images (file paths or BGR arrays)"""
         try:
             result = DeepFace.verify(
-                img1_path=img1_path,
-                img2_path=img2_path,
+                img1_path=img1,
+                img2_path=img2,
                 model_name=self.model_name,
                 distance_metric=self.distance_metric,
                 detector_backend=self.detector_backend,
@@ -134,19 +233,3 @@ class FaceSearchService:
         except Exception as e:
             print(f"Comparison error: {e}")
             return False, 1.0
-    
-    def should_log_detection(self, person_id, cooldown_seconds=10):
-        """Check if enough time passed since last detection"""
-        current_time = datetime.now()
-        
-        if person_id not in self.last_detection:
-            self.last_detection[person_id] = current_time
-            return True
-        
-        time_diff = (current_time - self.last_detection[person_id]).seconds
-        
-        if time_diff >= cooldown_seconds:
-            self.last_detection[person_id] = current_time
-            return True
-        
-        return False
@@ -0,0 +1,315 @@
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from bson.objectid import ObjectId
+from app.services.matcher import EmbeddingMatcher
+
+
+def record_dtype(dim):
+    """One sighting: time, camera code, face box and a float16 embedding"""
+    return np.dtype([
+        ('timestamp', '<f8'),
+        ('camera', '<u2'),
+        ('box', '<i2', (4,)),
+        ('embedding', '<f2', (dim,))
+    ])
+
+
+class SightingStore:
+    """Append-only store of unknown-face embeddings seen by the cameras.
+
+    Only embeddings are kept, never frames. Records are fixed-size
+    (float16 vector + time, camera and box) and appended to one binary
+    file per model/detector, so a retro-search can memory-map the file and
+    scan it in large vectorized chunks. Camera ids are stored as small
+    integer codes listed in cameras.json.
+    """
+
+    def __init__(self, store_dir, model_name, detector_backend):
+        self.dir = os.path.join(store_dir, f"{model_name}__{detector_backend}")
+        os.makedirs(self.dir, exist_ok=True)
+        self.path = os.path.join(self.dir, 'sightings.bin')
+        self._cameras_path = os.path.join(self.dir, 'cameras.json')
+        self._dim_path = os.path.join(self.dir, 'dim')
+        self._lock = threading.Lock()
+        self._file = None
+
+        self.cameras = []
+        if os.path.exists(self._cameras_path):
+            with open(self._cameras_path, encoding='utf-8') as f:
+                self.cameras = json.load(f)
+        self._codes = {(c['camera_id'], c['location']): i for i, c in enumerate(self.cameras)}
+
+        self.dim = None
+        if os.path.exists(self._dim_path):
+            with open(self._dim_path) as f:
+                self.dim = int(f.read())
+
+    def _camera_code(self, camera_id, location):
+        key = (camera_id, location)
+        if key not in self._codes:
+            self._codes[key] = len(self.cameras)
+            self.cameras.append({'camera_id': camera_id, 'location': location})
+            with open(self._cameras_path, 'w', encoding='utf-8') as f:
+                json.dump(self.cameras, f)
+        return self._codes[key]
+
+    def append(self, camera_id, location, embedding, box, timestamp=None):
+        """Record one unknown face"""
+        embedding = np.asarray(embedding, dtype=np.float32).ravel()
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = len(embedding)
+                with open(self._dim_path, 'w') as f:
+                    f.write(str(self.dim))
+            if len(embedding) != self.dim:
+                return False
+
+            record = np.zeros(1, dtype=record_dtype(self.dim))
+            record['timestamp'] = timestamp if timestamp is not None else time.time()
+            record['camera'] = self._camera_code(camera_id, location)
+            record['box'] = box
+            record['embedding'] = embedding
+
+            if self._file is None:
+                self._file = open(self.path, 'ab')
+            self._file.write(record.tobytes())
+            self._file.flush()
+            return True
+
+    def records(self):
+        """Read-only memory map of every complete record"""
+        if self.dim is None or not os.path.exists(self.path):
+            return None
+        dtype = record_dtype(self.dim)
+        count = os.path.getsize(self.path) // dtype.itemsize
+        if count == 0:
+            return None
+        return np.memmap(self.path, dtype=dtype, mode='r', shape=(count,))
+
+    def search(self, embedding, threshold, distance_metric='cosine', since=None, chunk_size=65536):
+        """Records within `threshold` of an embedding; returns (records, distances)"""
+        return self.search_many([embedding], threshold, distance_metric, since, chunk_size)[0]
+
+    def search_many(self, embeddings, threshold, distance_metric='cosine', since=None, chunk_size=65536):
+        """search() for several embeddings in one pass over the file; one (records, distances) each"""
+        empty = ([], np.empty(0, dtype=np.float32))
+        records = self.records()
+        if records is None or not len(embeddings):
+            return [empty for _ in embeddings]
+
+        probe = EmbeddingMatcher(distance_metric)
+        probe.build([(i, np.asarray(embedding, dtype=np.float32).ravel()) for i, embedding in enumerate(embeddings)])
+
+        hits = [[] for _ in embeddings]
+        distances = [[] for _ in embeddings]
+        for start in range(0, len(records), chunk_size):
+            chunk = records[start:start + chunk_size]
+            if since is not None:
+                chunk = chunk[chunk['timestamp'] >= since]
+                if not len(chunk):
+                    continue
+
+            # The probes are the "gallery": one product scores the whole chunk against all of them
+            chunk_distances = probe.distances(chunk['embedding'].astype(np.float32))[0]
+            for i in range(len(embeddings)):
+                mask = chunk_distances[:, i] < threshold
+                if mask.any():
+                    hits[i].append(np.array(chunk[mask]))
+                    distances[i].append(chunk_distances[mask, i])
+
+        return [(np.concatenate(h), np.concatenate(d)) if h else empty for h, d in zip(hits, distances)]
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __len__(self):
+        records = self.records()
+        return 0 if records is None else len(records)
+
+
+def group_hits(store, records, distances, threshold, window=60.0):
+    """Collapse hits into one retrospective detection per camera and `window` seconds"""
+    order = np.argsort(records['timestamp'])
+    groups = []
+    open_groups = {}
+
+    for i in order:
+        record = records[i]
+        camera = store.cameras[int(record['camera'])]
+        timestamp = float(record['timestamp'])
+        distance = float(distances[i])
+
+        group = open_groups.get(camera['camera_id'])
+        if group is None or timestamp - group['last'] > window:
+            group = {'camera': camera, 'first': timestamp, 'last': timestamp, 'distances': [],
+                     'box': None, 'best': None}
+            open_groups[camera['camera_id']] = group
+            groups.append(group)
+
+        group['last'] = timestamp
+        group['distances'].append(distance)
+        if group['best'] is None or distance < group['best']:
+            group['best'] = distance
+            group['box'] = [int(v) for v in record['box']]
+
+    detections = []
+    for group in groups:
+        best = group['best']
+        detections.append({
+            'camera_id': group['camera']['camera_id'],
+            'location': group['camera']['location'],
+            'timestamp': datetime.fromtimestamp(group['first']),
+            'confidence': float(max(0.0, min(1.0, 1 - best / threshold))),
+            'min_distance': best,
+            'mean_distance': float(np.mean(group['distances'])),
+            'frame_count': len(group['distances']),
+            'box': group['box'],
+            'sighting_id': f"{group['camera']['camera_id']}@{group['first']!r}",
+            'retrospective': True
+        })
+    return detections
+
+
+def retro_detection_id(person_id, detection):
+    """Same _id every time a person's retro-search finds the same sighting group
+
+    The writer skips documents whose _id is already stored, so re-running a
+    retro-search does not log its detections twice. The id starts with the
+    sighting time like any ObjectId.
+    """
+    digest = hashlib.sha1(f"{person_id}|{detection['sighting_id']}".encode()).digest()
+    return ObjectId(struct.pack('>I', int(detection['timestamp'].timestamp())) + digest[:8])
+
+
+class RetroSearch:
+    """Runs retro-searches for newly registered persons in the background"""
+
+    def __init__(self, store, distance_metric, threshold, window=60.0, on_detection=None):
+        self.store = store
+        self.distance_metric = distance_metric
+        self.threshold = threshold
+        self.window = window
+        self.on_detection = on_detection
+        self.results = {}
+        self._lock = threading.Lock()
+
+    def search(self, person_id, name, embedding):
+        """Search the sightings for one person; returns the retrospective detections"""
+        started = time.time()
+        records, distances = self.store.search(embedding, self.threshold, self.distance_metric)
+        return self._record(person_id, name, records, distances, started)
+
+    def search_many(self, persons):
+        """search() for several (person_id, name, embedding) in one pass over the store"""
+        started = time.time()
+        found = self.store.search_many([embedding for _, _, embedding in persons],
+                                       self.threshold, self.distance_metric)
+        return [self._record(person_id, name, records, distances, started)
+                for (person_id, name, _), (records, distances) in zip(persons, found)]
+
+    def _record(self, person_id, name, records, distances, started):
+        detections = group_hits(self.store, records, distances, self.threshold, self.window) if len(records) else []
+
+        for detection in detections:
+            detection.update(person_id=person_id, person_name=name,
+                             _id=retro_detection_id(person_id, detection))
+            if self.on_detection is not None:
+                self.on_detection(detection)
+
+        result = {
+            'person_id': person_id,
+            'status': 'done',
+            'sightings_scanned': len(self.store),
+            'matches': len(records),
+            'detections': len(detections),
+            'seconds': round(time.time() - started, 3)
+        }
+        with self._lock:
+            self.results[person_id] = result
+        print(f"✓ Retro-search for {name}: {len(detections)} past detection(s) "
+              f"from {result['matches']} of {result['sightings_scanned']} sightings")
+        return detections
+
+    def submit(self, person_id, name, embedding):
+        """Run search() on a background thread"""
+        self.submit_many([(person_id, name, embedding)])
+
+    def submit_many(self, persons):
+        """Run search_many() on one background thread"""
+        if not persons:
+            return
+        with self._lock:
+            for person_id, _, _ in persons:
+                self.results[person_id] = {'person_id': person_id, 'status': 'running'}
+
+        def run():
+            try:
+                self.search_many(persons)
+            except Exception as e:
+                print(f"✗ Retro-search for {len(persons)} person(s) failed: {e}")
+                with self._lock:
+                    for person_id, _, _ in persons:
+                        self.results[person_id] = {'person_id': person_id, 'status': 'failed', 'error': str(e)}
+
+        threading.Thread(target=run, name=f"retro-search-{persons[0][0]}", daemon=True).start()
+
+    def result(self, person_id):
+        with self._lock:
+            return self.results.get(person_id)
+
+
+_store = None
+_retro = None
+_lock = threading.Lock()
+
+
+def get_sighting_store(app):
+    """Get the process-wide unknown-face store, or None when SIGHTINGS is off"""
+    global _store
+    if not app.config.get('SIGHTINGS', True):
+        return None
+    with _lock:
+        if _store is None:
+            _store = SightingStore(
+                app.config['SIGHTINGS_FOLDER'],
+                app.config.get('DEEPFACE_MODEL', 'VGG-Face'),
+                app.config.get('DETECTOR_BACKEND', 'opencv')
+            )
+        return _store
+
+
+def get_retro_search(app):
+    """Get the process-wide retro-search runner, or None when SIGHTINGS is off"""
+    global _retro
+    store = get_sighting_store(app)
+    if store is None:
+        return None
+    with _lock:
+        if _retro is None:
+            from app.services.events import get_detection_writer
+            from app.services.broker import get_event_broker
+
+            writer = get_detection_writer(app)
+
+            def record(detection):
+                writer.submit(detection)
+                get_event_broker().publish(detection)
+
+            _retro = RetroSearch(
+                store,
+                app.config.get('DISTANCE_METRIC', 'cosine'),
+                app.config.get('RECOGNITION_THRESHOLD', 0.50),
+                window=app.config.get('RETRO_GROUP_SECONDS', 60.0),
+                on_detection=record
+            )
+        return _retro
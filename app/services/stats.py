@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+from app.models.person import Person, Detection, DetectionCounter
+
+EMPTY_STATS = {
+    'total_persons': 0,
+    'total_detections': 0,
+    'recent_detections': 0
+}
+
+
+def get_stats(use_counters=False, recent_hours=24):
+    """Person and detection totals plus detections in the last `recent_hours`.
+
+    Counts run in MongoDB: totals come from collection metadata and the
+    recent count is an index-only `count_documents` on `timestamp`. With
+    `use_counters` the detection numbers are read from the rolled-up
+    counters the detection writer maintains (built on first use), which
+    keeps the home page constant-time; the recent count is then accurate
+    to the hour.
+    """
+    if Detection.get_collection() is None:
+        return dict(EMPTY_STATS)
+
+    since = datetime.now() - timedelta(hours=recent_hours)
+    stats = {'total_persons': Person.count()}
+
+    if use_counters:
+        total = DetectionCounter.get_total()
+        if total is None:
+            total = DetectionCounter.rebuild()
+        stats['total_detections'] = total
+        stats['recent_detections'] = DetectionCounter.sum_since(since)
+    else:
+        stats['total_detections'] = Detection.count()
+        stats['recent_detections'] = Detection.count(since=since)
+
+    return stats
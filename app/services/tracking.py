@@ -0,0 +1,113 @@
+import itertools
+import time
+
+# Shared by FaceTracker, the detection pipeline and the TRACK_UNKNOWN_RECHECK_SECONDS config default
+UNKNOWN_RECHECK_SECONDS = 0.5
+
+
+def box_iou(a, b):
+    """Intersection over union of two [x, y, w, h] boxes"""
+    ax2, ay2 = a[0] + a[2], a[1] + a[3]
+    bx2, by2 = b[0] + b[2], b[1] + b[3]
+
+    iw = max(0, min(ax2, bx2) - max(a[0], b[0]))
+    ih = max(0, min(ay2, by2) - max(a[1], b[1]))
+    intersection = iw * ih
+    union = a[2] * a[3] + b[2] * b[3] - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+class Track:
+    """One face followed across detection passes"""
+
+    def __init__(self, track_id, box, now):
+        self.track_id = track_id
+        self.box = box
+        self.created = now
+        self.last_seen = now
+        self.last_recognized = None
+        self.identity = None
+        self.hits = 1
+        self.misses = 0
+
+
+class FaceTracker:
+    """IoU tracker that keeps face identities across frames.
+
+    Faces are greedily associated with the existing track they overlap
+    most (IoU >= iou_threshold). A track is dropped after `max_missed`
+    passes without a matching face. Recognition is only needed for new
+    tracks and then every `recheck_interval` seconds to confirm identity
+    (every `unknown_recheck_interval` seconds while still unidentified).
+    """
+
+    def __init__(self, iou_threshold=0.3, max_missed=5, recheck_interval=5.0,
+                 unknown_recheck_interval=UNKNOWN_RECHECK_SECONDS):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.recheck_interval = recheck_interval
+        self.unknown_recheck_interval = unknown_recheck_interval
+        self.tracks = {}
+        self.expired = []
+        self._ids = itertools.count(1)
+
+    def update(self, boxes, now=None):
+        """Associate this pass's boxes with tracks; returns one track per box"""
+        now = now if now is not None else time.time()
+
+        pairs = sorted(
+            ((box_iou(box, track.box), i, track_id)
+             for i, box in enumerate(boxes)
+             for track_id, track in self.tracks.items()),
+            reverse=True
+        )
+
+        assigned = [None] * len(boxes)
+        used = set()
+        for iou, i, track_id in pairs:
+            if iou < self.iou_threshold:
+                break
+            if assigned[i] is not None or track_id in used:
+                continue
+            assigned[i] = self.tracks[track_id]
+            used.add(track_id)
+
+        for i, box in enumerate(boxes):
+            track = assigned[i]
+            if track is None:
+                track = Track(next(self._ids), box, now)
+                self.tracks[track.track_id] = track
+                assigned[i] = track
+            else:
+                track.box = box
+                track.last_seen = now
+                track.hits += 1
+                track.misses = 0
+            used.add(track.track_id)
+
+        self.expired = []
+        for track_id in list(self.tracks):
+            if track_id not in used:
+                track = self.tracks[track_id]
+                track.misses += 1
+                if track.misses > self.max_missed:
+                    del self.tracks[track_id]
+                    self.expired.append(track_id)
+
+        return assigned
+
+    def needs_recognition(self, track, now=None):
+        """True for new tracks and tracks due for an identity re-check"""
+        now = now if now is not None else time.time()
+        if track.last_recognized is None:
+            return True
+
+        interval = self.recheck_interval if track.identity else self.unknown_recheck_interval
+        return now - track.last_recognized >= interval
+
+    def get(self, track_id):
+        return self.tracks.get(track_id)
+
+    def visible(self):
+        """Tracks seen in the latest pass"""
+        return [track for track in self.tracks.values() if track.misses == 0]
@@ -0,0 +1,320 @@
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+import cv2
+import numpy as np
+
+
+def video_info(path):
+    """Frame count and frame rate of a video file"""
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Cannot open video: {path}")
+    try:
+        frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+    finally:
+        capture.release()
+    return frames, fps
+
+
+def sample_frames(path, start, end, step):
+    """Decode frames [start, end) and yield (index, frame) for every `step`-th frame.
+
+    Skipped frames are only grabbed, never converted, which is most of
+    the decode cost at low sample rates.
+    """
+    capture = cv2.VideoCapture(path)
+    try:
+        if start:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+        index = start
+        while index < end:
+            if not capture.grab():
+                break
+            if index % step == 0:
+                ok, frame = capture.retrieve()
+                if ok:
+                    yield index, frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def scan_chunk(service, path, start, end, step, detection_width=640):
+    """Detect and embed faces in one chunk; returns (samples, faces, embeddings).
+
+    faces are dicts with the frame index and full-resolution box; the
+    embeddings are rows in the same order.
+    """
+    samples = 0
+    faces = []
+    embeddings = []
+
+    for index, frame in sample_frames(path, start, end, step):
+        samples += 1
+        scale = 1.0
+        if detection_width and frame.shape[1] > detection_width:
+            scale = frame.shape[1] / detection_width
+            frame = cv2.resize(frame, (detection_width, int(frame.shape[0] / scale)))
+
+        detected = service.detect_faces(frame)
+        if not detected:
+            continue
+
+        embeddings.append(service.embed_faces([face['face'] for face in detected]))
+        for face in detected:
+            x, y, w, h = face['box']
+            faces.append({
+                'frame': index,
+                'box': [int(x * scale), int(y * scale), int(w * scale), int(h * scale)]
+            })
+
+    embeddings = np.concatenate(embeddings) if embeddings else np.empty((0, 0), dtype=np.float32)
+    return samples, faces, embeddings
+
+
+def _scan_chunk_in_worker(path, start, end, step, detection_width):
+    """Process pool task: scan a chunk with the worker's own models"""
+    from app.services import workers
+    return scan_chunk(workers._worker_service, path, start, end, step, detection_width)
+
+
+def format_offset(seconds):
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{seconds:06.3f}"
+
+
+class VideoSearchJob:
+    """Searches one recorded video for registered persons.
+
+    The video is split into chunks that are decoded and scanned in
+    parallel (a process pool with its own models, or in-process when
+    `workers` <= 1). Every `step`-th frame is sampled to reach
+    `sample_fps`. Embeddings come back to this process and are matched
+    against the shared gallery, producing a timeline of matches with the
+    offset, person, distance and box, plus a per-person summary.
+    """
+
+    def __init__(self, path, sample_fps=2.0, workers=None, detection_width=640, threshold=None,
+                 remove_video=False):
+        self.job_id = uuid.uuid4().hex
+        self.path = path
+        # Uploaded footage is deleted once the job ends; files from VIDEO_SEARCH_FOLDER are kept
+        self.remove_video = remove_video
+        self.sample_fps = sample_fps
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.detection_width = detection_width
+        self.threshold = threshold
+        self.status = 'queued'
+        self.error = None
+        self.created = datetime.now()
+        self.started = None
+        self.finished = None
+        self.duration = None
+        self.chunks_total = 0
+        self.chunks_done = 0
+        self.frames_sampled = 0
+        self.timeline = []
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _chunks(self, frames, fps):
+        step = max(1, int(round(fps / self.sample_fps))) if self.sample_fps else 1
+        if frames <= 0:
+            # Length unknown (some containers): one sequential chunk to the end
+            return step, [(0, sys.maxsize)]
+        # Several chunks per worker keep every core busy until the end
+        count = max(1, min(self.workers * 4, frames // (step * 10) or 1))
+        size = -(-frames // count)
+        return step, [(start, min(start + size, frames)) for start in range(0, frames, size)]
+
+    def _match(self, service, person_for, fps, faces, embeddings):
+        if not faces or len(service.matcher) == 0:
+            return []
+
+        threshold = self.threshold if self.threshold is not None else service.threshold
+        entries = []
+        for face, matches in zip(faces, service.matcher.search(embeddings, threshold, 1)):
+            if not matches:
+                continue
+            match = matches[0]
+            person = person_for(match['photo_filename']) if person_for else None
+            offset = face['frame'] / fps
+            entries.append({
+                'offset': round(offset, 3),
+                'time': format_offset(offset),
+                'frame': face['frame'],
+                'person_id': str(person['_id']) if person else None,
+                'name': person['name'] if person else match['photo_filename'],
+                'photo_filename': match['photo_filename'],
+                'distance': round(float(match['distance']), 4),
+                'confidence': round(float(match['confidence']), 4),
+                'box': face['box']
+            })
+        return entries
+
+    def run(self, service, person_for=None, model_config=None):
+        """Scan the whole video; model_config = (model, detector, metric) for worker processes"""
+        self.status = 'running'
+        self.started = time.time()
+        executor = None
+
+        try:
+            frames, fps = video_info(self.path)
+            self.duration = round(frames / fps, 3) if frames > 0 else None
+            step, chunks = self._chunks(frames, fps)
+            self.chunks_total = len(chunks)
+
+            if self.workers > 1 and model_config is not None:
+                from app.services.workers import _init_worker
+                executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=model_config
+                )
+                futures = [executor.submit(_scan_chunk_in_worker, self.path, start, end, step,
+                                           self.detection_width) for start, end in chunks]
+            else:
+                executor = ThreadPoolExecutor(max_workers=1)
+                futures = [executor.submit(scan_chunk, service, self.path, start, end, step,
+                                           self.detection_width) for start, end in chunks]
+
+            for future in as_completed(futures):
+                if self._cancel.is_set():
+                    self.status = 'cancelled'
+                    break
+                samples, faces, embeddings = future.result()
+                self.frames_sampled += samples
+                self.timeline.extend(self._match(service, person_for, fps, faces, embeddings))
+                self.chunks_done += 1
+
+            self.timeline.sort(key=lambda entry: (entry['frame'], entry['box'][0]))
+            if self.status == 'running':
+                self.status = 'done'
+
+        except Exception as e:
+            self.status = 'failed'
+            self.error = str(e)
+            print(f"✗ Video search {self.job_id} failed: {e}")
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+            self.finished = time.time()
+
+        return self.timeline
+
+    def summary(self):
+        """Per-person first/last offset, hit count and best distance"""
+        persons = {}
+        for entry in self.timeline:
+            key = entry['person_id'] or entry['photo_filename']
+            person = persons.get(key)
+            if person is None:
+                persons[key] = dict(
+                    person_id=entry['person_id'], name=entry['name'], hits=1,
+                    first_seen=entry['offset'], last_seen=entry['offset'],
+                    best_distance=entry['distance']
+                )
+            else:
+                person['hits'] += 1
+                person['last_seen'] = entry['offset']
+                person['best_distance'] = min(person['best_distance'], entry['distance'])
+        return sorted(persons.values(), key=lambda p: p['first_seen'])
+
+    def to_dict(self, include_timeline=True):
+        elapsed = (self.finished or time.time()) - self.started if self.started else None
+        data = {
+            'job_id': self.job_id,
+            'path': self.path,
+            'status': self.status,
+            'error': self.error,
+            'created': self.created.isoformat(),
+            'sample_fps': self.sample_fps,
+            'workers': self.workers,
+            'duration': self.duration,
+            'elapsed': round(elapsed, 2) if elapsed is not None else None,
+            'speed': round(self.duration / elapsed, 2) if elapsed and self.duration else None,
+            'progress': round(self.chunks_done / self.chunks_total, 3) if self.chunks_total else 0.0,
+            'frames_sampled': self.frames_sampled,
+            'matches': len(self.timeline),
+            'persons': self.summary()
+        }
+        if include_timeline:
+            data['timeline'] = self.timeline
+        return data
+
+
+class VideoSearchManager:
+    """Runs video search jobs in the background, one at a time, and keeps their results"""
+
+    def __init__(self, app, max_jobs=100):
+        self.app = app
+        self.max_jobs = max_jobs
+        self.jobs = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='video-search')
+        self._lock = threading.Lock()
+
+    def submit(self, path, **options):
+        job = VideoSearchJob(path, **options)
+        with self._lock:
+            self.jobs[job.job_id] = job
+            # Forget the oldest finished jobs
+            finished = [j for j in self.jobs.values() if j.status in ('done', 'failed', 'cancelled')]
+            for old in finished[:max(0, len(self.jobs) - self.max_jobs)]:
+                del self.jobs[old.job_id]
+        self._executor.submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        try:
+            with self.app.app_context():
+                run_video_search(self.app, job)
+        finally:
+            if job.remove_video and os.path.exists(job.path):
+                os.remove(job.path)
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+
+def run_video_search(app, job):
+    """Run a job against the app's face service and gallery"""
+    from app.services.registry import get_face_service
+    from app.services.gallery import get_gallery
+
+    try:
+        service = get_face_service(app.config)
+        gallery = get_gallery(app)
+    except Exception as e:
+        job.status = 'failed'
+        job.error = f"face service unavailable: {e}"
+        return job
+
+    config = app.config
+    model_config = (config.get('DEEPFACE_MODEL', 'VGG-Face'), config.get('DETECTOR_BACKEND', 'opencv'),
+                    config.get('DISTANCE_METRIC', 'cosine'))
+    job.run(service, person_for=gallery.person_for, model_config=model_config)
+    return job
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_video_search_manager(app):
+    """Get the process-wide video search job manager"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = VideoSearchManager(app)
+        return _manager
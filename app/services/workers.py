@@ -0,0 +1,166 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import numpy as np
+
+# Set in each worker process by _init_worker
+_worker_service = None
+
+
+def _init_worker(model_name, detector_backend, distance_metric):
+    """Load the detector and recognizer once per worker process"""
+    global _worker_service
+    from app.services.search import FaceSearchService
+
+    _worker_service = FaceSearchService(
+        model_name=model_name,
+        detector_backend=detector_backend,
+        distance_metric=distance_metric
+    )
+    _worker_service.load_models()
+    print(f"✓ Inference worker {os.getpid()} ready")
+
+
+def _detect_and_embed(shm_name, shape, dtype):
+    """Worker task: detect and embed every face of a frame held in shared memory"""
+    block = shared_memory.SharedMemory(name=shm_name)
+    try:
+        frame = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        faces = _worker_service.detect_faces(frame)
+        embeddings = _worker_service.embed_faces([face['face'] for face in faces])
+
+        # Crops stay in the worker; only boxes and vectors travel back
+        boxes = [face['box'] for face in faces]
+        del frame
+        return boxes, embeddings
+    finally:
+        block.close()
+
+
+class SharedFramePool:
+    """Reusable shared memory blocks for passing frames to workers"""
+
+    def __init__(self):
+        self._free = []
+        self._all = []
+        self._lock = threading.Lock()
+
+    def acquire(self, nbytes):
+        with self._lock:
+            for block in self._free:
+                if block.size >= nbytes:
+                    self._free.remove(block)
+                    return block
+
+        block = shared_memory.SharedMemory(create=True, size=nbytes)
+        with self._lock:
+            self._all.append(block)
+        return block
+
+    def release(self, block):
+        with self._lock:
+            self._free.append(block)
+
+    def close(self):
+        with self._lock:
+            for block in self._all:
+                block.close()
+                block.unlink()
+            self._all = []
+            self._free = []
+
+
+class ProcessInferenceBackend:
+    """Runs detection and embedding in a pool of worker processes.
+
+    Each worker holds its own copy of the models, so Python-level pre- and
+    post-processing no longer competes with the web process for the GIL.
+    Frames are copied once into a shared memory block instead of being
+    pickled; gallery matching stays in the parent, which owns the index.
+    """
+
+    def __init__(self, model_name, detector_backend, distance_metric, workers=None, initializer=_init_worker):
+        self.workers = workers or os.cpu_count() or 1
+        self.restarts = 0
+        self._initializer = initializer
+        self._initargs = (model_name, detector_backend, distance_metric)
+        self._frames = SharedFramePool()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._executor = self._start_pool()
+        print(f"✓ Process inference backend: {self.workers} worker(s)")
+
+    def _start_pool(self):
+        # Spawn, not fork: the parent already runs camera threads
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=self._initializer,
+            initargs=self._initargs
+        )
+
+    def _restart_pool(self, broken):
+        """Replace a pool whose worker died; other callers may have done it already"""
+        with self._lock:
+            if self._executor is not broken or self._closed:
+                return
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._start_pool()
+            self.restarts += 1
+        print(f"⚠ Process inference backend: a worker died, pool restarted ({self.restarts})")
+
+    def analyze(self, frame, timeout=30):
+        """Detect and embed faces in a BGR frame; returns (faces, embeddings)"""
+        frame = np.ascontiguousarray(frame)
+        block = self._frames.acquire(frame.nbytes)
+        np.ndarray(frame.shape, dtype=frame.dtype, buffer=block.buf)[...] = frame
+
+        executor = self._executor
+        try:
+            future = executor.submit(_detect_and_embed, block.name, frame.shape, frame.dtype.str)
+            boxes, embeddings = future.result(timeout=timeout)
+        except BrokenProcessPool:
+            # The workers are gone, so nothing reads the block any more; later frames use a new pool
+            self._frames.release(block)
+            self._restart_pool(executor)
+            raise
+        # A timed-out task may still be reading the block, so it is only recycled on success
+        self._frames.release(block)
+
+        return [{'box': box} for box in boxes], embeddings
+
+    def shutdown(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._frames.close()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_inference_backend(app):
+    """Get the process pool backend, or None when INFERENCE_BACKEND is 'thread'"""
+    global _backend
+
+    if app.config.get('INFERENCE_BACKEND', 'thread') != 'process':
+        return None
+
+    with _backend_lock:
+        if _backend is None:
+            _backend = ProcessInferenceBackend(
+                app.config.get('DEEPFACE_MODEL', 'VGG-Face'),
+                app.config.get('DETECTOR_BACKEND', 'opencv'),
+                app.config.get('DISTANCE_METRIC', 'cosine'),
+                workers=app.config.get('INFERENCE_WORKERS') or None
+            )
+            # Unlink the shared memory blocks and stop the workers on exit
+            atexit.register(_backend.shutdown)
+        return _backend
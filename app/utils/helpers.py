@@ -1,25 +1,98 @@
+import hashlib
+import io
 import os
-from werkzeug.utils import secure_filename
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
 from datetime import datetime
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
+# Sizes (longest side) of the stored photo and its thumbnails
+CANONICAL_SIZE = 1024
+THUMBNAIL_SIZE = 320
+THUMBNAIL_FORMATS = (('webp', 'WEBP'), ('jpg', 'JPEG'))
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def save_uploaded_file(file, upload_folder):
-    """Save uploaded file and return filename"""
+def derived_path(filename, kind, ext='jpg'):
+    """Path, relative to the upload folder, of an image derived from a stored photo
+    
+    kind is 'thumbs' (small previews) or 'faces' (the aligned crop that was embedded).
+    """
+    return f"{kind}/{os.path.splitext(filename)[0]}.{ext}"
+
+def ingest_image(data, upload_folder, prefix=None, max_size=CANONICAL_SIZE, thumb_size=THUMBNAIL_SIZE):
+    """Decode an uploaded image once and store it normalized
+    
+    The photo is turned upright from its EXIF orientation, converted to RGB
+    and downscaled to `max_size` as a JPEG, plus WebP and JPEG thumbnails.
+    The file name carries a hash of the stored content, so every URL can be
+    cached forever. Returns (filename, filepath, BGR array), or None when
+    the data is not an image.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    except Exception:
+        return None
+    
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    content = buffer.getvalue()
+    
+    prefix = prefix or datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"{prefix}_{hashlib.sha256(content).hexdigest()[:16]}.jpg"
+    filepath = os.path.join(upload_folder, filename)
+    with open(filepath, 'wb') as f:
+        f.write(content)
+    
+    thumb = image.copy()
+    thumb.thumbnail((thumb_size, thumb_size), Image.LANCZOS)
+    os.makedirs(os.path.join(upload_folder, 'thumbs'), exist_ok=True)
+    for ext, image_format in THUMBNAIL_FORMATS:
+        thumb.save(os.path.join(upload_folder, derived_path(filename, 'thumbs', ext)), image_format, quality=80)
+    
+    return filename, filepath, cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR)
+
+def save_face_crop(upload_folder, filename, face):
+    """Keep the aligned face crop (BGR) that a stored photo was embedded from"""
+    os.makedirs(os.path.join(upload_folder, 'faces'), exist_ok=True)
+    cv2.imwrite(os.path.join(upload_folder, derived_path(filename, 'faces')), face)
+
+def remove_stored_image(upload_folder, filename):
+    """Delete a stored photo together with its thumbnails and face crop"""
+    paths = [filename, derived_path(filename, 'faces')]
+    paths += [derived_path(filename, 'thumbs', ext) for ext, _ in THUMBNAIL_FORMATS]
+    for path in paths:
+        path = os.path.join(upload_folder, path)
+        if os.path.exists(path):
+            os.remove(path)
+
+def save_uploaded_file(file, upload_folder, max_size=CANONICAL_SIZE, thumb_size=THUMBNAIL_SIZE):
+    """Store an uploaded photo normalized (see ingest_image)
+    
+    Returns (filename, filepath, BGR array); all None for a missing,
+    disallowed or undecodable file.
+    """
     if file and allowed_file(file.filename):
-        # Create unique filename with timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        original_filename = secure_filename(file.filename)
-        filename = f"{timestamp}_{original_filename}"
-        filepath = os.path.join(upload_folder, filename)
-        file.save(filepath)
-        return filename, filepath
-    return None, None
+        stored = ingest_image(file.read(), upload_folder, max_size=max_size, thumb_size=thumb_size)
+        if stored is not None:
+            return stored
+    return None, None, None
+
+def decode_uploaded_image(file):
+    """Decode an uploaded image into a BGR array without touching disk"""
+    if not (file and allowed_file(file.filename)):
+        return None
+    data = np.frombuffer(file.read(), dtype=np.uint8)
+    if data.size == 0:
+        return None
+    return cv2.imdecode(data, cv2.IMREAD_COLOR)
 
 def format_detection_time(timestamp):
     """Format timestamp for display"""
@@ -0,0 +1,58 @@
+import base64
+from datetime import datetime
+from bson import json_util
+
+MAX_PAGE_SIZE = 500
+
+
+class PaginationError(ValueError):
+    """Bad cursor, field list or filter in a paginated request"""
+
+
+def encode_cursor(values):
+    """Opaque cursor for the sort key values of the last item of a page"""
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Sort key values from a cursor made by encode_cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception:
+        raise PaginationError('Invalid cursor')
+    if not isinstance(values, list):
+        raise PaginationError('Invalid cursor')
+    return values
+
+
+def parse_fields(fields, allowed, always=('_id',)):
+    """Mongo projection for a comma-separated `fields=` value (None = all fields)"""
+    if not fields:
+        return None
+
+    requested = [f.strip() for f in fields.split(',') if f.strip()]
+    unknown = sorted(set(requested) - set(allowed))
+    if unknown:
+        raise PaginationError(f"Unknown field(s): {', '.join(unknown)}")
+
+    projection = {field: 1 for field in always}
+    projection.update({field: 1 for field in requested})
+    return projection
+
+
+def parse_limit(limit, default):
+    """Page size clamped to 1..MAX_PAGE_SIZE"""
+    if limit is None:
+        return default
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def parse_time(value):
+    """ISO 8601 query parameter to datetime (None if absent)"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise PaginationError(f"Invalid time: {value}")
@@ -0,0 +1,40 @@
+from app.services.aggregator import VoteAggregator
+
+
+def vote(person_id, distance):
+    return {'person_id': person_id, 'distance': distance, 'confidence': 1 - distance}
+
+
+def test_event_after_min_votes_once_per_track():
+    aggregator = VoteAggregator(window=5, min_votes=3)
+    assert aggregator.add('cam', 1, vote('a', 0.30), now=0) is None
+    assert aggregator.add('cam', 1, None, now=1) is None
+    assert aggregator.add('cam', 1, vote('a', 0.20), now=2) is None
+
+    event = aggregator.add('cam', 1, vote('a', 0.40), now=3)
+    assert event['person_id'] == 'a'
+    assert event['frame_count'] == 3
+    assert event['min_distance'] == 0.20
+    assert abs(event['mean_distance'] - 0.30) < 1e-9
+    assert abs(event['confidence'] - 0.80) < 1e-9
+
+    assert aggregator.add('cam', 1, vote('a', 0.10), now=4) is None
+
+
+def test_single_frame_false_positive_is_not_reported():
+    aggregator = VoteAggregator(window=3, min_votes=2)
+    assert aggregator.add('cam', 1, vote('a', 0.3), now=0) is None
+    assert aggregator.add('cam', 1, vote('b', 0.3), now=1) is None
+    assert aggregator.add('cam', 1, None, now=2) is None
+    # The first 'a' vote has slid out of the window
+    assert aggregator.add('cam', 1, vote('a', 0.3), now=3) is None
+
+
+def test_old_votes_expire_and_tracks_are_forgotten():
+    aggregator = VoteAggregator(window=5, min_votes=2, max_age=5.0)
+    aggregator.add('cam', 1, vote('a', 0.3), now=0)
+    assert aggregator.add('cam', 1, vote('a', 0.3), now=10) is None
+    assert aggregator.add('cam', 2, vote('a', 0.3), now=10) is None
+
+    aggregator.forget('cam', 1)
+    assert len(aggregator) == 1
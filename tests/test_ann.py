@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from app.services.ann import IVFIndex
+from app.services.matcher import EmbeddingMatcher
+
+
+@pytest.fixture
+def gallery():
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(20, 64))
+    vectors = centers[rng.integers(20, size=2000)] + 0.3 * rng.normal(size=(2000, 64))
+    return [(f"person_{i}.jpg", v) for i, v in enumerate(vectors)]
+
+
+def test_small_gallery_uses_exact_search(gallery):
+    index = IVFIndex('cosine', exact_threshold=5000)
+    index.build(gallery)
+
+    assert not index.trained
+    exact = EmbeddingMatcher('cosine')
+    exact.build(gallery)
+    probe = gallery[10][1]
+    assert index.search(probe, 0.3, 5) == exact.search(probe, 0.3, 5)
+
+
+def test_ivf_recall_and_full_probe_is_exact(gallery):
+    index = IVFIndex('cosine', n_lists=20, nprobe=3, exact_threshold=100)
+    index.build(gallery)
+    assert index.trained
+
+    hits = sum(index.search(v, 0.2, 1)[0][0]['photo_filename'] == label for label, v in gallery[:200])
+    assert hits / 200 > 0.9
+
+    index.nprobe = 20
+    exact = EmbeddingMatcher('cosine')
+    exact.build(gallery)
+    probe = gallery[5][1] + 0.05
+    assert [m['photo_filename'] for m in index.search(probe, 1.0, 10)[0]] == \
+        [m['photo_filename'] for m in exact.search(probe, 1.0, 10)[0]]
+
+
+def test_incremental_updates_and_reload(gallery, tmp_path):
+    path = str(tmp_path / 'index.npz')
+    index = IVFIndex('cosine', n_lists=16, exact_threshold=100, path=path)
+    index.build(gallery[:-1])
+
+    index.add(*gallery[-1])
+    assert index.search(gallery[-1][1], 0.1, 1)[0][0]['photo_filename'] == gallery[-1][0]
+    assert index.remove(gallery[-1][0])
+    assert len(index) == len(gallery) - 1
+
+    reloaded = IVFIndex('cosine', n_lists=16, exact_threshold=100, path=path)
+    reloaded.build(gallery)
+    assert np.array_equal(reloaded.centroids, index.centroids)
@@ -0,0 +1,84 @@
+import json
+import time
+import numpy as np
+import cv2
+from app.services import pipeline
+from app.services.broadcast import FrameBroadcaster
+from app.services.camera import CameraManager, parse_camera_config
+
+
+class FakeCamera:
+    """Publishes a single frame, then nothing new"""
+    camera_id = 'cam1'
+    location = 'Gate'
+
+    def read_latest(self, last_seq=0, timeout=1.0):
+        if last_seq == 0:
+            return 1, np.zeros((480, 640, 3), np.uint8)
+        time.sleep(0.01)
+        return last_seq, None
+
+
+class FakePipeline:
+    latest_detection = []
+
+    def __init__(self, app, camera):
+        pass
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+def decode(chunk):
+    jpeg = chunk.split(b'\r\n\r\n', 1)[1][:-2]
+    return cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+
+
+def test_viewers_share_one_encoded_chunk(monkeypatch):
+    encodes = []
+    imencode = cv2.imencode
+    monkeypatch.setattr(cv2, 'imencode', lambda *args: encodes.append(1) or imencode(*args))
+
+    detections = [{'box': [100, 100, 80, 80], 'name': 'Ann', 'confidence': 0.9}]
+    broadcaster = FrameBroadcaster(FakeCamera(), lambda: detections, 'thumb')
+    broadcaster.start()
+    try:
+        seq_a, chunk_a = broadcaster.read_latest(0, timeout=2.0)
+        seq_b, chunk_b = broadcaster.read_latest(0, timeout=2.0)
+        # Nothing newer arrives for a viewer that already has the frame
+        assert broadcaster.read_latest(seq_a, timeout=0.1) == (seq_a, None)
+    finally:
+        broadcaster.stop()
+
+    assert seq_a == seq_b == 1
+    assert chunk_a is chunk_b
+    assert len(encodes) == 1 and broadcaster.frames_encoded == 1
+    assert decode(chunk_a).shape == (240, 320, 3)
+
+
+def test_broadcaster_stops_when_its_last_viewer_leaves(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, 'DetectionPipeline', FakePipeline)
+    cameras = parse_camera_config(json.dumps([{'id': 'CAM_A', 'source': str(tmp_path / 'missing.mp4')}]))
+    manager = CameraManager(type('FakeApp', (), {'config': {'CAMERAS': cameras}})())
+
+    broadcaster = manager.subscribe_stream('CAM_A', 'thumb')
+    assert manager.subscribe_stream('CAM_A', 'thumb') is broadcaster
+    raw = manager.subscribe_stream('CAM_A', 'raw')
+    assert raw is not broadcaster
+
+    manager.unsubscribe_stream('CAM_A', 'thumb')
+    assert broadcaster._thread.is_alive()
+
+    manager.unsubscribe_stream('CAM_A', 'thumb')
+    broadcaster._thread.join(timeout=5.0)
+    assert not broadcaster._thread.is_alive()
+    assert list(manager.broadcasters) == [('CAM_A', 'raw')]
+
+    manager.unsubscribe_stream('CAM_A', 'raw')
+    raw._thread.join(timeout=5.0)
+    assert not raw._thread.is_alive() and manager.broadcasters == {}
+    manager.cameras['CAM_A']._thread.join(timeout=5.0)
+    assert not manager.cameras['CAM_A']._thread.is_alive()
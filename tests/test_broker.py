@@ -0,0 +1,47 @@
+import json
+from app.services.broker import EventBroker
+
+
+def event(i, camera_id='cam1'):
+    return {'_id': f'{i:04d}', 'camera_id': camera_id, 'person_id': 'p1'}
+
+
+def test_fan_out_with_filters():
+    broker = EventBroker()
+    everything = broker.subscribe()
+    cam2 = broker.subscribe(camera_id='cam2')
+
+    broker.publish(event(1))
+    broker.publish(event(2, 'cam2'))
+
+    assert [i for i, _ in everything.get(timeout=0)] == ['0001', '0002']
+    items = cam2.get(timeout=0)
+    assert [i for i, _ in items] == ['0002']
+    assert json.loads(items[0][1])['camera_id'] == 'cam2'
+    assert everything.get(timeout=0.01) == []
+
+
+def test_slow_subscriber_drops_oldest():
+    broker = EventBroker(buffer_size=3)
+    slow = broker.subscribe()
+    for i in range(5):
+        broker.publish(event(i))
+
+    assert [i for i, _ in slow.get(timeout=0)] == ['0002', '0003', '0004']
+    assert slow.dropped == 2
+
+
+def test_resume_from_history_and_backfill():
+    stored = [event(i) for i in range(10)]
+    broker = EventBroker(history=3, backfill=lambda last, limit: [e for e in stored if e['_id'] > last][:limit])
+    for e in stored[7:]:
+        broker.publish(e)
+
+    resumed = broker.subscribe(last_event_id='0007')
+    assert [i for i, _ in resumed.get(timeout=0)] == ['0008', '0009']
+
+    # Older than the in-memory history: served by the backfill
+    resumed = broker.subscribe(last_event_id='0004')
+    assert [i for i, _ in resumed.get(timeout=0)] == ['0005', '0006', '0007', '0008', '0009']
+    resumed.close()
+    assert broker.stats()['subscribers'] == 1
@@ -0,0 +1,212 @@
+import zipfile
+import cv2
+import numpy as np
+from pymongo.errors import BulkWriteError
+from app.models.person import Person
+from app.services.bulk_import import ImportJob, embed_rows, prepare_import_dir, read_rows
+
+
+class FakeFaceService:
+    """Finds a face in bright images only"""
+
+    def __init__(self):
+        self.batches = []
+        self.added = []
+
+    def detect_faces(self, image):
+        if image.mean() < 128:
+            return []
+        return [{'face': image[:4, :4], 'box': [0, 0, 4, 4]}, {'face': image, 'box': [0, 0, 16, 16]}]
+
+    def embed_faces(self, crops):
+        self.batches.append(len(crops))
+        return np.asarray([[float(crop.shape[0]), 1.0] for crop in crops], dtype=np.float32)
+
+    def add_embedding(self, photo_filename, embedding):
+        self.added.append(photo_filename)
+        return embedding
+
+    def remove_photo(self, photo_filename):
+        self.added.remove(photo_filename)
+
+
+class FakeRetroSearch:
+    def __init__(self):
+        self.batches = []
+
+    def submit_many(self, persons):
+        self.batches.append([(person_id, name) for person_id, name, _ in persons])
+
+
+def create_into(stored):
+    """Person.create_many stand-in that keeps the records and assigns ids"""
+    def create_many(records):
+        for record in records:
+            record.setdefault('_id', f"id-{record['name']}")
+        stored.extend(records)
+        return [record['_id'] for record in records]
+    return create_many
+
+
+def write_import(tmp_path):
+    csv_text = ('name,age,contact,description,photo\n'
+                'Ann,30,555-1,,ann.jpg\n'
+                'Bob,41,555-2,tall,bob.jpg\n'
+                ',22,555-3,,cat.jpg\n'
+                'Dan,50,555-4,,missing.jpg\n')
+    archive = tmp_path / 'import.zip'
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr('export/persons.csv', csv_text)
+        zf.writestr('export/ann.jpg', cv2.imencode('.jpg', np.full((16, 16, 3), 255, np.uint8))[1].tobytes())
+        zf.writestr('export/bob.jpg', cv2.imencode('.jpg', np.zeros((16, 16, 3), np.uint8))[1].tobytes())
+        zf.writestr('../../evil.jpg', b'x')
+        zf.writestr('notes.txt', b'x')
+    import_dir = tmp_path / 'imports' / 'abc'
+    prepare_import_dir(str(import_dir), archive=str(archive))
+    return import_dir
+
+
+def test_zip_is_unpacked_inside_the_import_dir(tmp_path):
+    import_dir = write_import(tmp_path)
+    assert sorted(p.name for p in (import_dir / 'images').iterdir()) == ['ann.jpg', 'bob.jpg', 'evil.jpg']
+    assert not (tmp_path / 'evil.jpg').exists()
+
+
+def test_rows_are_validated(tmp_path):
+    rows = read_rows(str(write_import(tmp_path)))
+    errors = {number: error for number, _, _, error in rows}
+    assert errors == {1: None, 2: None, 3: 'missing name', 4: 'photo missing.jpg not found'}
+
+
+def test_embed_rows_uses_largest_face_and_one_batch(tmp_path):
+    import_dir = write_import(tmp_path)
+    service = FakeFaceService()
+    rows = [(1, str(import_dir / 'images' / 'ann.jpg')), (2, str(import_dir / 'images' / 'bob.jpg'))]
+
+    (ann, ann_embedding, ann_face, ann_error), (bob, bob_embedding, _, bob_error) = embed_rows(service, rows)
+    assert ann_error is None and ann_embedding[0] == 16 and ann_face.shape == (16, 16, 3)
+    assert bob_embedding is None and bob_error == 'no face detected'
+    assert service.batches == [1]
+
+
+def test_import_reports_failures_and_resumes(tmp_path, monkeypatch):
+    import_dir = write_import(tmp_path)
+    uploads = tmp_path / 'uploads'
+    uploads.mkdir()
+    stored = []
+    monkeypatch.setattr(Person, 'get_imported_rows',
+                        staticmethod(lambda import_id: {r['import_row'] for r in stored}))
+    monkeypatch.setattr(Person, 'create_many', staticmethod(create_into(stored)))
+
+    service = FakeFaceService()
+    job = ImportJob(str(import_dir), import_id='abc', workers=1).run(service, str(uploads))
+    assert job.status == 'done'
+    assert job.imported == 1 and [r['name'] for r in stored] == ['Ann']
+    assert [f['row'] for f in job.failures] == [2, 3, 4]
+    photo = stored[0]['photo_path']
+    assert photo.startswith('import_abc_1_') and (uploads / photo).exists()
+    assert (uploads / 'faces' / photo).exists() and (uploads / 'thumbs' / photo.replace('.jpg', '.webp')).exists()
+    # Bob had no face: his stored photo and thumbnails are removed again
+    assert [p.name for p in uploads.glob('*.jpg')] == [photo]
+    assert len(list((uploads / 'thumbs').iterdir())) == 2
+    assert (import_dir / 'report.json').exists()
+
+    again = ImportJob(str(import_dir), import_id='abc', workers=1).run(service, str(uploads))
+    assert again.skipped == 1 and again.imported == 0 and len(stored) == 1
+
+
+def test_faces_are_embedded_from_the_upright_stored_photo(tmp_path, monkeypatch):
+    import io
+    from PIL import Image
+
+    # Orientation 6: a 40x20 landscape file that displays as a 20x40 portrait
+    buffer = io.BytesIO()
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    Image.new('RGB', (40, 20), (255, 255, 255)).save(buffer, 'JPEG', exif=exif)
+    archive = tmp_path / 'import.zip'
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr('persons.csv', 'name,age,contact,photo\nAnn,30,555-1,ann.jpg\n')
+        zf.writestr('ann.jpg', buffer.getvalue())
+    import_dir = tmp_path / 'imports' / 'abc'
+    prepare_import_dir(str(import_dir), archive=str(archive))
+    uploads = tmp_path / 'uploads'
+    uploads.mkdir()
+    stored = []
+    monkeypatch.setattr(Person, 'get_imported_rows', staticmethod(lambda import_id: set()))
+    monkeypatch.setattr(Person, 'create_many', staticmethod(create_into(stored)))
+
+    service = FakeFaceService()
+    ImportJob(str(import_dir), import_id='abc', workers=1).run(service, str(uploads))
+
+    face = cv2.imread(str(uploads / 'faces' / stored[0]['photo_path']))
+    assert face.shape[:2] == (40, 20)
+    assert service.batches == [1]
+
+
+def test_new_persons_are_retro_searched_once_per_chunk(tmp_path, monkeypatch):
+    import_dir = write_import(tmp_path)
+    uploads = tmp_path / 'uploads'
+    uploads.mkdir()
+    monkeypatch.setattr(Person, 'get_imported_rows', staticmethod(lambda import_id: set()))
+    monkeypatch.setattr(Person, 'create_many', staticmethod(create_into([])))
+
+    retro = FakeRetroSearch()
+    ImportJob(str(import_dir), import_id='abc', workers=1).run(FakeFaceService(), str(uploads), retro_search=retro)
+    assert retro.batches == [[('id-Ann', 'Ann')]]
+
+
+def test_failed_insert_removes_the_chunk_embeddings_and_files(tmp_path, monkeypatch):
+    import_dir = write_import(tmp_path)
+    uploads = tmp_path / 'uploads'
+    uploads.mkdir()
+
+    def fail(records):
+        raise RuntimeError('database unavailable')
+    monkeypatch.setattr(Person, 'get_imported_rows', staticmethod(lambda import_id: set()))
+    monkeypatch.setattr(Person, 'create_many', staticmethod(fail))
+
+    service = FakeFaceService()
+    job = ImportJob(str(import_dir), import_id='abc', workers=1).run(service, str(uploads))
+    assert job.status == 'failed'
+    assert service.added == []
+    assert not any(path.is_file() for path in uploads.rglob('*'))
+
+
+def test_partly_inserted_chunk_keeps_its_stored_rows_and_resumes(tmp_path, monkeypatch):
+    bright = cv2.imencode('.jpg', np.full((16, 16, 3), 255, np.uint8))[1].tobytes()
+    archive = tmp_path / 'import.zip'
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr('persons.csv', 'name,age,contact,photo\nAnn,30,555-1,ann.jpg\nBob,41,555-2,bob.jpg\n')
+        zf.writestr('ann.jpg', bright)
+        zf.writestr('bob.jpg', bright)
+    import_dir = tmp_path / 'imports' / 'abc'
+    prepare_import_dir(str(import_dir), archive=str(archive))
+    uploads = tmp_path / 'uploads'
+    uploads.mkdir()
+
+    stored = []
+    monkeypatch.setattr(Person, 'get_imported_rows',
+                        staticmethod(lambda import_id: {r['import_row'] for r in stored}))
+
+    def insert_all_but_bob(records):
+        create_into(stored)([r for r in records if r['name'] != 'Bob'])
+        index = next(i for i, r in enumerate(records) if r['name'] == 'Bob')
+        raise BulkWriteError({'writeErrors': [{'index': index, 'code': 121, 'errmsg': 'validation failed'}]})
+    monkeypatch.setattr(Person, 'create_many', staticmethod(insert_all_but_bob))
+
+    service = FakeFaceService()
+    retro = FakeRetroSearch()
+    job = ImportJob(str(import_dir), import_id='abc', workers=1).run(service, str(uploads), retro_search=retro)
+    assert job.status == 'failed' and job.imported == 1
+    # Ann was stored: her photo and embedding stay, Bob's are removed
+    assert service.added == [stored[0]['photo_path']]
+    assert [p.name for p in uploads.glob('*.jpg')] == [stored[0]['photo_path']]
+    assert retro.batches == [[('id-Ann', 'Ann')]]
+
+    monkeypatch.setattr(Person, 'create_many', staticmethod(create_into(stored)))
+    again = ImportJob(str(import_dir), import_id='abc', workers=1).run(service, str(uploads), retro_search=retro)
+    assert again.status == 'done' and again.skipped == 1 and again.imported == 1
+    assert [r['name'] for r in stored] == ['Ann', 'Bob']
+    assert sorted(service.added) == sorted(r['photo_path'] for r in stored)
+    assert sorted(p.name for p in uploads.glob('*.jpg')) == sorted(r['photo_path'] for r in stored)
@@ -0,0 +1,28 @@
+import pytest
+from app.services.cadence import AdaptiveCadence
+
+
+def test_idle_passes_back_off_up_to_the_max():
+    cadence = AdaptiveCadence(min_interval=0.0, max_interval=2.0, backoff=2.0, idle_step=0.25)
+
+    waits = [cadence.update(False) for _ in range(6)]
+    assert waits == [0.5, 1.0, 2.0, 2.0, 2.0, 2.0]
+    assert cadence.stats() == {'interval': 2.0, 'active_passes': 0, 'idle_passes': 6}
+
+
+def test_activity_resets_to_the_min_interval():
+    cadence = AdaptiveCadence(min_interval=0.1, max_interval=2.0, backoff=2.0)
+    for _ in range(5):
+        cadence.update(False)
+
+    assert cadence.update(True) == 0.1
+    # Backoff starts over from the min interval, not from where it left off
+    assert cadence.update(False) == pytest.approx(0.5)
+    assert cadence.stats()['active_passes'] == 1
+
+
+def test_min_frame_gap():
+    cadence = AdaptiveCadence(min_frame_gap=3)
+    assert not cadence.due(12, 10)
+    assert cadence.due(13, 10)
+    assert AdaptiveCadence(min_frame_gap=0).due(11, 10)
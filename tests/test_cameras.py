@@ -0,0 +1,120 @@
+import json
+from types import SimpleNamespace
+import pytest
+from app.services import pipeline
+from app.services.camera import CameraManager, parse_camera_config
+
+
+class FakePipeline:
+    def __init__(self, app, camera):
+        self.camera = camera
+        self.running = False
+        self.detection_count = 0
+        self.recognitions_skipped = 0
+        self.cadence = self.gate = SimpleNamespace(stats=lambda: {})
+        self.tracker = SimpleNamespace(tracks={})
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+
+class FakeApp:
+    def __init__(self, cameras):
+        self.config = {'CAMERAS': cameras}
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, 'DetectionPipeline', FakePipeline)
+    # A missing file keeps the capture thread retrying until it is stopped
+    cameras = parse_camera_config(json.dumps([{'id': 'CAM_A', 'source': str(tmp_path / 'missing.mp4')}]))
+    manager = CameraManager(FakeApp(cameras))
+    yield manager
+    for camera in manager.cameras.values():
+        camera.stop()
+
+
+def test_default_camera_comes_from_the_index():
+    assert parse_camera_config(None, 2, mirror=False) == [
+        {'id': 'CAM_001', 'source': 2, 'location': 'Main Entrance', 'mirror': False, 'gate': {}}
+    ]
+
+
+def test_cameras_json_fills_in_defaults():
+    cameras = parse_camera_config(json.dumps([
+        {'id': 'GATE', 'source': 'rtsp://10.0.0.5/stream', 'location': 'Car Park', 'mirror': False},
+        {'source': 1}
+    ]), default_index=0, mirror=True)
+
+    assert cameras[0] == {'id': 'GATE', 'source': 'rtsp://10.0.0.5/stream', 'location': 'Car Park',
+                          'mirror': False, 'gate': {}}
+    assert cameras[1] == {'id': 'CAM_002', 'source': 1, 'location': 'Unknown', 'mirror': True, 'gate': {}}
+
+
+def test_bad_gate_config_fails_at_startup():
+    with pytest.raises(ValueError, match='GATE.*face_chek'):
+        parse_camera_config(json.dumps([{'id': 'GATE', 'source': 0, 'gate': {'face_chek': True}}]))
+
+
+def test_camera_runs_until_its_last_subscriber_leaves(manager):
+    camera = manager.subscribe('CAM_A')
+    assert manager.subscribe('CAM_A') is camera
+    assert manager.subscribe('CAM_B') is None
+    thread = camera._thread
+    pipeline_ = manager.pipelines['CAM_A']
+
+    manager.unsubscribe('CAM_A')
+    assert thread.is_alive() and pipeline_.running
+
+    manager.unsubscribe('CAM_A')
+    thread.join(timeout=5.0)
+    assert not thread.is_alive()
+    assert not pipeline_.running and 'CAM_A' not in manager.pipelines
+
+    # Extra unsubscribes are ignored
+    manager.unsubscribe('CAM_A')
+    assert manager.status()[0]['viewers'] == 0
+
+
+def test_monitored_camera_outlives_its_viewers(manager):
+    manager.start_monitoring()
+    manager.start_monitoring()
+    manager.subscribe('CAM_A')
+    manager.unsubscribe('CAM_A')
+
+    status = manager.status()[0]
+    assert status['monitored'] and status['viewers'] == 0
+    assert manager.cameras['CAM_A']._thread.is_alive()
+    assert manager.pipelines['CAM_A'].running
+
+
+def test_slow_camera_start_does_not_block_other_cameras(tmp_path, monkeypatch):
+    import threading
+    from app.services.camera import CameraSource
+
+    monkeypatch.setattr(pipeline, 'DetectionPipeline', FakePipeline)
+    cameras = parse_camera_config(json.dumps([{'id': 'SLOW', 'source': str(tmp_path / 'a.mp4')},
+                                              {'id': 'FAST', 'source': str(tmp_path / 'b.mp4')}]))
+    manager = CameraManager(FakeApp(cameras))
+
+    # SLOW's start waits as if its previous capture thread were still releasing the device
+    release = threading.Event()
+    monkeypatch.setattr(manager.cameras['SLOW'], 'start', lambda: release.wait(5.0))
+    slow = threading.Thread(target=manager.subscribe, args=('SLOW',))
+    slow.start()
+    try:
+        fast = threading.Thread(target=lambda: (manager.subscribe('FAST'), manager.unsubscribe('FAST')))
+        fast.start()
+        fast.join(timeout=2.0)
+        assert not fast.is_alive()
+        assert 'SLOW' not in manager.pipelines
+    finally:
+        release.set()
+        slow.join()
+        for camera in manager.cameras.values():
+            CameraSource.stop(camera)
+
+    assert manager.pipelines['SLOW'].running
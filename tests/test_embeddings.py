@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from app.models.person import FaceEmbedding
+from app.services.embeddings import EmbeddingStore
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    mongomock = pytest.importorskip('mongomock')
+    collection = mongomock.MongoClient().db['embeddings']
+    monkeypatch.setattr(FaceEmbedding, 'get_collection', staticmethod(lambda: collection))
+    return collection
+
+
+def test_vectors_are_reloaded_from_disk(tmp_path):
+    store = EmbeddingStore(str(tmp_path), 'Facenet512', 'opencv', use_mongo=False)
+    store.put('ann.jpg', [1, 2, 3])
+    store.put('bob.jpg', [4, 5, 6])
+    store.remove('bob.jpg')
+
+    reloaded = EmbeddingStore(str(tmp_path), 'Facenet512', 'opencv', use_mongo=False)
+    assert [name for name, _ in reloaded.items()] == ['ann.jpg']
+    assert reloaded.get('ann.jpg').dtype == np.float32
+    assert reloaded.get('ann.jpg').tolist() == [1, 2, 3]
+
+
+def test_model_change_does_not_reuse_stale_vectors(tmp_path):
+    EmbeddingStore(str(tmp_path), 'Facenet512', 'opencv', use_mongo=False).put('ann.jpg', [1, 2, 3])
+
+    assert len(EmbeddingStore(str(tmp_path), 'VGG-Face', 'opencv', use_mongo=False)) == 0
+    assert len(EmbeddingStore(str(tmp_path), 'Facenet512', 'retinaface', use_mongo=False)) == 0
+    assert 'ann.jpg' in EmbeddingStore(str(tmp_path), 'Facenet512', 'opencv', use_mongo=False)
+
+
+def test_mongo_mirror_fills_a_fresh_host(tmp_path, mongo):
+    store = EmbeddingStore(str(tmp_path / 'a'), 'Facenet512', 'opencv')
+    store.put('ann.jpg', [1, 2, 3])
+    store.put('ann.jpg', [3, 2, 1])
+    EmbeddingStore(str(tmp_path / 'a'), 'VGG-Face', 'opencv').put('ann.jpg', [9, 9])
+    assert mongo.count_documents({}) == 2
+
+    # Another host with an empty disk cache pulls the vector and caches it locally
+    other = EmbeddingStore(str(tmp_path / 'b'), 'Facenet512', 'opencv')
+    assert other.get('ann.jpg').tolist() == [3, 2, 1]
+    assert (tmp_path / 'b' / 'Facenet512__opencv' / 'ann.jpg.npy').exists()
+
+    other.remove('ann.jpg')
+    assert mongo.count_documents({'model_name': 'Facenet512'}) == 0
+    assert mongo.count_documents({'model_name': 'VGG-Face'}) == 1
@@ -0,0 +1,89 @@
+from datetime import datetime
+from app.models.person import Person, Detection, DetectionCounter
+from app.services.events import DetectionWriter
+
+
+class FakeDB:
+    def __init__(self, up=True):
+        self.up = up
+        self.detections = {}
+        self.last_seen = []
+        self.counted = []
+        self.last_seen_calls = 0
+        self.fail_calls = set()
+
+    def install(self, monkeypatch):
+        monkeypatch.setattr(Detection, 'get_collection', staticmethod(lambda: object() if self.up else None))
+        monkeypatch.setattr(Detection, 'insert_many', staticmethod(self.insert_many))
+        monkeypatch.setattr(Person, 'bulk_update_last_seen', staticmethod(self.bulk_update_last_seen))
+        monkeypatch.setattr(DetectionCounter, 'increment', staticmethod(self.counted.extend))
+
+    def insert_many(self, docs):
+        inserted = [doc for doc in docs if doc['_id'] not in self.detections]
+        for doc in inserted:
+            self.detections[doc['_id']] = doc
+        return inserted
+
+    def bulk_update_last_seen(self, updates):
+        self.last_seen_calls += 1
+        if self.last_seen_calls in self.fail_calls:
+            raise RuntimeError('connection lost')
+        self.last_seen.append(sorted(updates))
+
+
+def event(person_id, second, location='Gate'):
+    return {'person_id': person_id, 'camera_id': 'cam', 'location': location,
+            'confidence': 0.9, 'timestamp': datetime(2024, 1, 1, 12, 0, second)}
+
+
+def test_batch_coalesces_last_seen_per_person(tmp_path, monkeypatch):
+    db = FakeDB()
+    db.install(monkeypatch)
+    writer = DetectionWriter(str(tmp_path / 'spill.jsonl'))
+
+    for e in [event('a', 1, 'Gate'), event('b', 2), event('a', 3, 'Hall'), event('a', 2, 'Lobby')]:
+        writer.submit(e)
+    writer.flush(writer._take_batch())
+
+    assert len(db.detections) == 4
+    assert db.last_seen == [[('a', 'Hall', datetime(2024, 1, 1, 12, 0, 3)),
+                             ('b', 'Gate', datetime(2024, 1, 1, 12, 0, 2))]]
+
+
+def test_spill_when_database_is_down_and_replay_once_back(tmp_path, monkeypatch):
+    db = FakeDB(up=False)
+    db.install(monkeypatch)
+    spill = tmp_path / 'spill.jsonl'
+    writer = DetectionWriter(str(spill), retry_interval=0)
+
+    events = [event('a', 1), event('b', 2)]
+    for e in events:
+        writer.submit(e)
+    writer.flush(writer._take_batch())
+    assert spill.exists()
+    assert writer.stats()['spilled'] == 2
+
+    db.up = True
+    assert writer.replay() == 2
+    assert not spill.exists()
+    assert set(db.detections) == {e['_id'] for e in events}
+    assert writer.replay() == 0
+
+
+def test_interrupted_replay_does_not_count_events_twice(tmp_path, monkeypatch):
+    db = FakeDB(up=False)
+    db.install(monkeypatch)
+    writer = DetectionWriter(str(tmp_path / 'spill.jsonl'), batch_size=1, retry_interval=0, update_counters=True)
+
+    for e in [event('a', 1), event('b', 2)]:
+        writer.submit(e)
+    writer.flush([writer._queue.get_nowait(), writer._queue.get_nowait()])
+
+    # The second chunk fails after its insert; the retry re-sends both chunks
+    db.up = True
+    db.fail_calls = {2}
+    assert writer.replay() == 0
+    assert writer.replay() == 2
+
+    assert len(db.detections) == 2
+    assert sorted(db.counted) == [datetime(2024, 1, 1, 12, 0, 1), datetime(2024, 1, 1, 12, 0, 2)]
@@ -0,0 +1,56 @@
+from app.models.person import Person
+from app.services.gallery import GalleryService
+from app.services.matcher import EmbeddingMatcher
+
+
+class FakeFaceService:
+    def __init__(self):
+        self.matcher = EmbeddingMatcher('cosine')
+        self.embedded = []
+
+    def activate_photo(self, photo_filename, image):
+        self.embedded.append(photo_filename)
+        self.matcher.add(photo_filename, [1.0, float(len(self.embedded))])
+        return True
+
+    def deactivate_photo(self, photo_filename):
+        return self.matcher.remove(photo_filename)
+
+
+def person(person_id, photo, status='missing'):
+    return {'_id': person_id, 'name': person_id, 'photo_path': photo, 'status': status}
+
+
+def test_reload_applies_only_changes(monkeypatch):
+    rows = [person('a', 'a.jpg'), person('b', 'b.jpg')]
+    monkeypatch.setattr(Person, 'get_collection', staticmethod(lambda: object()))
+    monkeypatch.setattr(Person, 'get_version', staticmethod(lambda: len(rows)))
+    monkeypatch.setattr(Person, 'get_searchable', staticmethod(lambda: list(rows)))
+
+    service = FakeFaceService()
+    service.matcher.add('orphan.jpg', [0.0, 1.0])
+    gallery = GalleryService(service, '/uploads')
+    gallery.reload(prune=True)
+
+    assert sorted(label for label, _ in service.matcher.items()) == ['a.jpg', 'b.jpg']
+    assert gallery.person_for('a.jpg')['name'] == 'a'
+
+    rows[:] = [person('b', 'b.jpg'), person('c', 'c.jpg')]
+    gallery.reload()
+
+    assert service.embedded == ['a.jpg', 'b.jpg', 'c.jpg']
+    assert gallery.person_for('a.jpg') is None
+    assert 'a.jpg' not in service.matcher
+
+
+def test_found_and_deleted_persons_leave_the_gallery():
+    service = FakeFaceService()
+    gallery = GalleryService(service, '/uploads')
+    gallery.apply(person('a', 'a.jpg'))
+    gallery.apply(person('b', 'b.jpg'))
+
+    gallery.apply(person('a', 'a.jpg', status='found'))
+    gallery._handle_change({'operationType': 'delete', 'documentKey': {'_id': 'b'}})
+
+    assert len(service.matcher) == 0
+    assert gallery.persons == {}
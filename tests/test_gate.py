@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from app.services.gate import MotionGate, check_gate_config
+
+
+def frame(value):
+    return np.full((240, 320, 3), value, dtype=np.uint8)
+
+
+def test_static_scene_is_skipped():
+    gate = MotionGate(threshold=0.01, max_skips=100)
+
+    assert gate.check(frame(0))
+    assert not gate.check(frame(0))
+    assert not gate.check(frame(0))
+
+    stats = gate.stats()
+    assert stats['passed'] == 1 and stats['skipped'] == 2
+
+
+def test_motion_passes_the_gate():
+    gate = MotionGate(threshold=0.01)
+    gate.check(frame(0))
+
+    moved = frame(0)
+    moved[50:150, 50:150] = 255
+    assert gate.check(moved)
+    assert gate.moving
+
+
+def test_still_scene_is_rechecked_after_max_skips():
+    gate = MotionGate(max_skips=2)
+    results = [gate.check(frame(0)) for _ in range(5)]
+
+    assert results == [True, False, False, True, False]
+
+
+def test_background_method_and_disabled_gate():
+    gate = MotionGate(method='background')
+    assert gate.check(frame(10))
+    assert not gate.check(frame(10))
+
+    assert MotionGate(enabled=False).check(frame(0))
+
+
+def test_face_check_rejects_faceless_motion():
+    gate = MotionGate(face_check=True)
+
+    assert not gate.check(frame(0))
+    assert not gate.check(frame(200))
+    assert gate.stats()['skipped_no_face'] == 2
+
+
+def test_gate_overrides_are_validated():
+    assert check_gate_config({'method': 'background', 'threshold': 0.02}, 'CAM_1') == {
+        'method': 'background', 'threshold': 0.02}
+
+    with pytest.raises(ValueError, match='CAM_1.*threshhold'):
+        check_gate_config({'threshhold': 0.02}, 'CAM_1')
+    with pytest.raises(ValueError, match='unsupported gate method'):
+        check_gate_config({'method': 'optical-flow'}, 'CAM_1')
+    with pytest.raises(ValueError, match='gate must be an object'):
+        check_gate_config(True, 'CAM_1')
@@ -0,0 +1,61 @@
+import io
+import numpy as np
+from PIL import Image
+from app.utils.helpers import derived_path, ingest_image, remove_stored_image
+
+
+def jpeg_bytes(width, height, orientation=None):
+    image = Image.new('RGB', (width, height), (200, 30, 30))
+    buffer = io.BytesIO()
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    image.save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+def test_ingest_rotates_downscales_and_makes_thumbnails(tmp_path):
+    # Orientation 6: stored landscape, displayed rotated to portrait
+    filename, filepath, image = ingest_image(jpeg_bytes(400, 200, orientation=6), str(tmp_path),
+                                             prefix='p', max_size=100, thumb_size=20)
+
+    assert image.shape == (100, 50, 3)
+    assert Image.open(filepath).size == (50, 100)
+    assert Image.open(tmp_path / derived_path(filename, 'thumbs', 'webp')).size == (10, 20)
+    assert Image.open(tmp_path / derived_path(filename, 'thumbs')).format == 'JPEG'
+
+
+def test_names_follow_content(tmp_path):
+    first = ingest_image(jpeg_bytes(40, 40), str(tmp_path), prefix='p')[0]
+    same = ingest_image(jpeg_bytes(40, 40), str(tmp_path), prefix='p')[0]
+    other = ingest_image(jpeg_bytes(40, 41), str(tmp_path), prefix='p')[0]
+    assert first == same != other
+
+
+def test_png_with_alpha_and_garbage(tmp_path):
+    buffer = io.BytesIO()
+    Image.fromarray(np.zeros((8, 8, 4), np.uint8)).save(buffer, 'PNG')
+    filename, _, image = ingest_image(buffer.getvalue(), str(tmp_path))
+    assert filename.endswith('.jpg') and image.shape == (8, 8, 3)
+    assert ingest_image(b'not an image', str(tmp_path)) is None
+
+    remove_stored_image(str(tmp_path), filename)
+    assert not any(path.is_file() for path in tmp_path.rglob('*'))
+
+
+def test_uploads_are_decoded_in_memory(monkeypatch):
+    import tempfile
+    from werkzeug.datastructures import FileStorage
+    from app.utils.helpers import decode_uploaded_image
+
+    def no_temp_files(*args, **kwargs):
+        raise AssertionError('uploads must be decoded without a temp file')
+    monkeypatch.setattr(tempfile, 'NamedTemporaryFile', no_temp_files)
+
+    image = decode_uploaded_image(FileStorage(io.BytesIO(jpeg_bytes(40, 20)), filename='ann.jpg'))
+    assert image.shape == (20, 40, 3) and image.dtype == np.uint8
+    # Red in RGB comes back as BGR
+    assert image[10, 20, 2] > 150 and image[10, 20, 0] < 80
+
+    assert decode_uploaded_image(FileStorage(io.BytesIO(b''), filename='empty.jpg')) is None
+    assert decode_uploaded_image(FileStorage(io.BytesIO(jpeg_bytes(4, 4)), filename='notes.txt')) is None
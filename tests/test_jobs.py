@@ -0,0 +1,45 @@
+import threading
+import time
+from app.services.jobs import JobError, JobQueue
+
+
+def wait(job, timeout=5.0):
+    deadline = time.time() + timeout
+    while job.finished is None and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+def test_job_result_and_status():
+    queue = JobQueue(workers=1)
+    release = threading.Event()
+    job = queue.submit('add', lambda a, b: release.wait() and a + b, 2, 3, label='sum')
+    assert job.status in ('pending', 'running')
+
+    release.set()
+    wait(job)
+    assert job.status == 'done' and job.result == 5
+    assert queue.get(job.job_id).to_dict()['label'] == 'sum'
+
+
+def test_failures_keep_the_reason():
+    def no_face():
+        raise JobError('No face detected')
+
+    queue = JobQueue(workers=1)
+    expected = wait(queue.submit('register', no_face))
+    unexpected = wait(queue.submit('register', lambda: 1 / 0))
+
+    assert expected.status == 'failed' and expected.error == 'No face detected'
+    assert unexpected.error.startswith('Unexpected error')
+    assert queue.stats()['failed'] == 2
+
+
+def test_only_recent_finished_jobs_are_kept():
+    queue = JobQueue(workers=1, max_jobs=2)
+    jobs = [wait(queue.submit('check', lambda: None)) for _ in range(3)]
+    last = queue.submit('register', lambda: None)
+
+    assert queue.get(jobs[0].job_id) is None and queue.get(jobs[1].job_id) is None
+    assert queue.get(last.job_id) is last
+    assert [j.job_id for j in queue.recent('check')] == [jobs[2].job_id]
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from app.services.matcher import EmbeddingMatcher, DISTANCE_METRICS
+
+
+def naive_distance(a, b, metric):
+    if metric == 'cosine':
+        return 1 - np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+    if metric == 'euclidean':
+        return np.linalg.norm(a - b)
+    return np.linalg.norm(a / np.linalg.norm(a) - b / np.linalg.norm(b))
+
+
+@pytest.fixture
+def gallery():
+    rng = np.random.default_rng(0)
+    return [(f"person_{i}.jpg", rng.normal(size=128)) for i in range(50)]
+
+
+@pytest.mark.parametrize('metric', DISTANCE_METRICS)
+def test_distances_match_pairwise(gallery, metric):
+    matcher = EmbeddingMatcher(metric)
+    matcher.build(gallery)
+    probe = gallery[3][1] + 0.1
+
+    distances, labels = matcher.distances(probe)
+
+    expected = [naive_distance(probe, vector, metric) for _, vector in gallery]
+    assert labels == [label for label, _ in gallery]
+    assert np.allclose(distances[0], expected, atol=1e-4)
+
+
+def test_search_returns_top_k_under_threshold(gallery):
+    matcher = EmbeddingMatcher('cosine')
+    matcher.build(gallery)
+
+    matches = matcher.search(gallery[7][1], threshold=0.5, top_k=3)[0]
+
+    assert matches[0]['photo_filename'] == 'person_7.jpg'
+    assert matches[0]['distance'] == pytest.approx(0, abs=1e-5)
+    assert matches[0]['confidence'] == pytest.approx(1, abs=1e-5)
+    assert all(m['distance'] < 0.5 for m in matches)
+
+
+def test_incremental_add_and_remove(gallery):
+    matcher = EmbeddingMatcher('euclidean_l2')
+    for label, vector in gallery:
+        matcher.add(label, vector)
+
+    assert matcher.remove('person_0.jpg')
+    assert not matcher.remove('person_0.jpg')
+    assert len(matcher) == len(gallery) - 1
+
+    matches = matcher.search(gallery[-1][1], threshold=0.1)[0]
+    assert [m['photo_filename'] for m in matches] == ['person_49.jpg']
@@ -0,0 +1,137 @@
+from bson.objectid import ObjectId
+from app.models.person import Person, Detection
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query=None, projection=None):
+        self.queries.append(query)
+        ids = query['_id']['$in']
+        return [dict(doc) for doc in self.docs if doc['_id'] in ids]
+
+
+def test_summaries_use_one_query_and_cache(monkeypatch):
+    ann, bob = ObjectId(), ObjectId()
+    collection = FakeCollection([{'_id': ann, 'name': 'Ann'}, {'_id': bob, 'name': 'Bob'}])
+    monkeypatch.setattr(Person, 'get_collection', staticmethod(lambda: collection))
+
+    unknown = str(ObjectId())
+    summaries = Person.get_summaries([str(ann), str(bob), str(ann), unknown, 'not-an-id'])
+
+    assert summaries[str(ann)]['name'] == 'Ann'
+    assert summaries[unknown] is None and summaries['not-an-id'] is None
+    assert len(collection.queries) == 1
+
+    Person.get_summaries([str(ann), str(bob), unknown])
+    assert len(collection.queries) == 1
+
+
+def test_recent_detections_get_person_names(monkeypatch):
+    ann = ObjectId()
+    collection = FakeCollection([{'_id': ann, 'name': 'Ann'}])
+    monkeypatch.setattr(Person, 'get_collection', staticmethod(lambda: collection))
+    monkeypatch.setattr(Detection, 'get_recent', staticmethod(
+        lambda limit=50: [{'person_id': str(ann)}, {'person_id': str(ann)}, {'person_id': str(ObjectId())}]
+    ))
+
+    detections = Detection.get_recent_with_persons()
+
+    assert [d['person_name'] for d in detections] == ['Ann', 'Ann', 'Unknown']
+    assert len(collection.queries) == 1
+
+
+def test_counters_roll_up_by_hour(monkeypatch):
+    from datetime import datetime
+    from app.models.person import DetectionCounter
+
+    class FakeCounters:
+        requests = None
+
+        def bulk_write(self, requests, ordered=True):
+            self.requests = requests
+
+    counters = FakeCounters()
+    monkeypatch.setattr(DetectionCounter, 'get_collection', staticmethod(lambda: counters))
+
+    DetectionCounter.increment([
+        datetime(2024, 1, 1, 12, 5), datetime(2024, 1, 1, 12, 55), datetime(2024, 1, 1, 13, 1)
+    ])
+
+    updates = {r._filter['_id']: r._doc['$inc']['count'] for r in counters.requests}
+    assert updates == {'total': 3, datetime(2024, 1, 1, 12): 2, datetime(2024, 1, 1, 13): 1}
+
+
+def test_create_many_returns_only_inserted_ids(monkeypatch):
+    from pymongo.errors import BulkWriteError
+
+    class DuplicateCollection:
+        """Already holds every record named Bob"""
+        def insert_many(self, records, ordered=True):
+            errors = [{'index': i, 'code': 11000, 'errmsg': 'duplicate key'}
+                      for i, record in enumerate(records) if record['name'] == 'Bob']
+            if errors:
+                raise BulkWriteError({'writeErrors': errors})
+
+    bumps = []
+    monkeypatch.setattr(Person, 'get_collection', staticmethod(DuplicateCollection))
+    monkeypatch.setattr(Person, 'bump_version', staticmethod(lambda: bumps.append(1)))
+
+    ann, bob = ObjectId(), ObjectId()
+    assert Person.create_many([{'_id': ann, 'name': 'Ann'}, {'_id': bob, 'name': 'Bob'}]) == [str(ann)]
+    assert bumps == [1]
+
+    # Every row was a duplicate: nothing new, no gallery reload
+    assert Person.create_many([{'_id': bob, 'name': 'Bob'}]) == []
+    assert bumps == [1]
+
+
+def test_counter_rebuild_does_not_race_the_writer(monkeypatch):
+    import threading
+    import time
+    from datetime import datetime
+    from app.models.person import DetectionCounter
+    from app.services.events import DetectionWriter
+
+    class FakeCounters:
+        def __init__(self, docs):
+            self.docs = docs
+
+        def bulk_write(self, requests, ordered=True):
+            for request in requests:
+                key, update = request._filter['_id'], request._doc
+                if '$set' in update:
+                    self.docs[key] = update['$set']['count']
+                elif key in self.docs or request._upsert:
+                    self.docs[key] = self.docs.get(key, 0) + update['$inc']['count']
+
+        def delete_many(self, query):
+            for key in [k for k in self.docs if k not in query['_id']['$nin']]:
+                del self.docs[key]
+
+    noon, one_pm = datetime(2024, 1, 1, 12), datetime(2024, 1, 1, 13)
+    # A stale bucket from deleted detections, and a wrong total
+    counters = FakeCounters({datetime(2024, 1, 1, 10): 7, 'total': 9})
+    stored = [{'_id': 1, 'timestamp': noon}, {'_id': 2, 'timestamp': noon}]
+    writer = DetectionWriter(None, update_counters=True)
+    late = threading.Thread(target=writer._write, args=([{'_id': 3, 'person_id': 'a', 'location': 'Gate',
+                                                          'timestamp': one_pm}],))
+
+    class FakeDetections:
+        def aggregate(self, pipeline):
+            # The writer stores a batch while the rebuild is counting
+            late.start()
+            time.sleep(0.1)
+            assert len(stored) == 2
+            return [{'_id': noon, 'count': len(stored)}]
+
+    monkeypatch.setattr(DetectionCounter, 'get_collection', staticmethod(lambda: counters))
+    monkeypatch.setattr(Detection, 'get_collection', staticmethod(FakeDetections))
+    monkeypatch.setattr(Detection, 'insert_many', staticmethod(lambda docs: stored.extend(docs) or docs))
+    monkeypatch.setattr(Person, 'bulk_update_last_seen', staticmethod(lambda updates: list(updates)))
+
+    assert DetectionCounter.rebuild() == 2
+    late.join()
+    assert counters.docs == {noon: 2, one_pm: 1, 'total': 3}
@@ -0,0 +1,45 @@
+from datetime import datetime
+import pytest
+from bson.objectid import ObjectId
+from app.utils.pagination import (
+    PaginationError, decode_cursor, encode_cursor, parse_fields, parse_limit
+)
+
+
+def test_cursor_round_trip():
+    key = [datetime(2024, 1, 1, 12, 30, 5), ObjectId()]
+    cursor = encode_cursor(key)
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == key
+
+
+def test_bad_cursor_is_rejected():
+    with pytest.raises(PaginationError):
+        decode_cursor('not a cursor')
+
+
+def test_fields_projection():
+    assert parse_fields(None, ('name',)) is None
+    assert parse_fields('name, status', ('name', 'status')) == {'_id': 1, 'name': 1, 'status': 1}
+    with pytest.raises(PaginationError):
+        parse_fields('name,password', ('name',))
+
+
+def test_limit_is_clamped():
+    assert parse_limit(None, 50) == 50
+    assert parse_limit(0, 50) == 1
+    assert parse_limit(10 ** 6, 50) == 500
+
+
+def test_api_rejects_cursors_of_the_wrong_length():
+    from flask import Flask
+    from app.api.v1 import api_bp
+
+    app = Flask(__name__)
+    app.register_blueprint(api_bp, url_prefix='/api/v1')
+    client = app.test_client()
+
+    # W10 is the cursor for [] - no key at all
+    assert client.get('/api/v1/persons?cursor=W10').status_code == 400
+    person_cursor = encode_cursor([ObjectId()])
+    assert client.get(f'/api/v1/detections?cursor={person_cursor}').status_code == 400
@@ -0,0 +1,46 @@
+import numpy as np
+from app.services.pipeline import DetectionPipeline
+
+
+class FakeApp:
+    def __init__(self, **config):
+        self.config = config
+
+
+class FakeCamera:
+    camera_id = 'CAM_001'
+    location = 'Gate'
+    gate = {}
+
+
+class FakeFaceService:
+    """One face per frame and an empty gallery"""
+
+    def detect_faces(self, frame):
+        return [{'face': frame[:8, :8], 'box': [10, 10, 40, 40]}]
+
+    def embed_faces(self, crops):
+        return np.ones((len(crops), 4), dtype=np.float32)
+
+    def match_embeddings(self, faces, embeddings, threshold=None):
+        for face, embedding in zip(faces, embeddings):
+            face['embedding'] = embedding
+        return []
+
+
+class FakeSightings:
+    def __init__(self):
+        self.appended = []
+
+    def append(self, camera_id, location, embedding, box, timestamp=None):
+        self.appended.append((camera_id, location, box))
+
+
+def test_sync_path_stores_sightings_with_an_empty_gallery():
+    pipeline = DetectionPipeline(FakeApp(), FakeCamera())
+    pipeline._face_service = FakeFaceService()
+    pipeline._sightings = FakeSightings()
+
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    assert pipeline.process_frame(frame) == 1
+    assert pipeline._sightings.appended == [('CAM_001', 'Gate', [20, 20, 80, 80])]
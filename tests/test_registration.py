@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from app.models.person import Person
+from app.services import registration
+from app.utils.helpers import ingest_image
+
+
+class FakeApp:
+    def __init__(self, upload_folder):
+        self.config = {'UPLOAD_FOLDER': upload_folder}
+
+
+class FakeFaceService:
+    def __init__(self):
+        self.gallery = {}
+
+    def detect_faces(self, image):
+        return [{'face': image[:8, :8], 'box': [0, 0, 8, 8]}]
+
+    def embed_faces(self, crops):
+        return np.ones((len(crops), 4), dtype=np.float32)
+
+    def add_embedding(self, photo_filename, embedding):
+        self.gallery[photo_filename] = embedding
+        return embedding
+
+    def remove_photo(self, photo_filename):
+        self.gallery.pop(photo_filename, None)
+
+
+def test_failed_insert_leaves_no_embedding_or_files(tmp_path, monkeypatch):
+    import cv2
+    service = FakeFaceService()
+    monkeypatch.setattr(registration, 'get_face_service', lambda config: service)
+
+    def fail(*args):
+        raise RuntimeError('database unavailable')
+    monkeypatch.setattr(Person, 'create', staticmethod(fail))
+
+    data = cv2.imencode('.jpg', np.full((32, 32, 3), 255, np.uint8))[1].tobytes()
+    filename, filepath, image = ingest_image(data, str(tmp_path))
+
+    with pytest.raises(RuntimeError):
+        registration.register_person(FakeApp(str(tmp_path)), 'Ann', '30', '555', '', filename, filepath, image)
+
+    assert service.gallery == {}
+    assert not any(path.is_file() for path in tmp_path.rglob('*'))
+
+
+def delete_through_api(tmp_path, monkeypatch, get_face_service):
+    import cv2
+    from flask import Flask
+    from app.api import v1
+    from app.api.v1 import api_bp
+
+    data = cv2.imencode('.jpg', np.full((32, 32, 3), 255, np.uint8))[1].tobytes()
+    filename, _, _ = ingest_image(data, str(tmp_path), 'ann')
+    deleted = []
+    monkeypatch.setattr(v1, 'get_face_service', get_face_service)
+    monkeypatch.setattr(Person, 'get_by_id', staticmethod(lambda person_id: {'_id': person_id, 'photo_path': filename}))
+    monkeypatch.setattr(Person, 'delete', staticmethod(deleted.append))
+
+    app = Flask(__name__)
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    app.register_blueprint(api_bp, url_prefix='/api/v1')
+    response = app.test_client().delete('/api/v1/persons/abc')
+    return response, filename, deleted
+
+
+def test_api_delete_succeeds_while_the_face_service_is_unavailable(tmp_path, monkeypatch):
+    def unavailable(*args):
+        raise RuntimeError('face service still loading')
+
+    response, _, deleted = delete_through_api(tmp_path, monkeypatch, unavailable)
+
+    assert response.status_code == 200 and deleted == ['abc']
+    assert not any(path.is_file() for path in tmp_path.rglob('*'))
+
+
+def test_api_delete_removes_the_stored_photo(tmp_path, monkeypatch):
+    service = FakeFaceService()
+    removed = []
+    service.remove_photo = removed.append
+
+    response, filename, _ = delete_through_api(tmp_path, monkeypatch, lambda *args: service)
+
+    assert response.get_json() == {'deleted': True}
+    assert removed == [filename]
+    assert not any(path.is_file() for path in tmp_path.rglob('*'))
@@ -0,0 +1,80 @@
+import threading
+import time
+import pytest
+from flask import Flask
+from app.api.v1 import api_bp
+from app.services import registry
+
+
+class FakeFaceService:
+    def __init__(self):
+        self.warmed = False
+
+    def load_models(self):
+        time.sleep(0.05)
+
+    def warm_up(self):
+        self.warmed = True
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    monkeypatch.setattr(registry, '_service', None)
+    monkeypatch.setattr(registry, '_status', dict(registry._status, ready=False, error=None))
+    built = []
+
+    def build(config):
+        if config.get('FAIL'):
+            raise RuntimeError('model weights not found')
+        built.append(FakeFaceService())
+        return built[-1]
+    monkeypatch.setattr(registry, '_build_service', build)
+    return built
+
+
+def health(client):
+    response = client.get('/api/v1/health')
+    return response.status_code, response.get_json()['status']
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(api_bp, url_prefix='/api/v1')
+    return app.test_client()
+
+
+def test_one_service_is_shared_across_threads(builds):
+    services = []
+    threads = [threading.Thread(target=lambda: services.append(registry.get_face_service({})))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert all(service is builds[0] for service in services)
+    assert registry.get_face_service({}) is builds[0]
+
+
+def test_warm_up_makes_the_service_ready(builds, client):
+    assert health(client) == (503, 'starting')
+
+    service = registry.init_face_service(type('FakeApp', (), {'config': {'WARMUP_MODELS': True}})())
+
+    assert service.warmed
+    status = registry.get_service_status()
+    assert status['ready'] and not status['loading'] and status['warmup_seconds'] is not None
+    assert health(client) == (200, 'healthy')
+
+
+def test_load_failure_reports_degraded(builds, client):
+    app = type('FakeApp', (), {'config': {'FAIL': True}})()
+
+    assert registry.init_face_service(app) is None
+    status = registry.get_service_status()
+    assert not status['ready'] and status['error'] == 'model weights not found'
+    assert health(client) == (503, 'degraded')
+    with pytest.raises(RuntimeError):
+        registry.get_face_service(app.config)
@@ -0,0 +1,71 @@
+import time
+import numpy as np
+from app.services.scheduler import InferenceScheduler
+
+
+class FakeFaceService:
+    """Stands in for FaceSearchService: records batch sizes"""
+
+    def __init__(self):
+        self.batches = []
+
+    def embed_faces(self, crops):
+        self.batches.append(len(crops))
+        return np.zeros((len(crops), 4), dtype=np.float32)
+
+    def match_embeddings(self, faces, embeddings):
+        return [{'box': face['box']} for face in faces]
+
+
+def make_faces(count):
+    return [{'face': None, 'box': [0, 0, 1, 1]} for _ in range(count)]
+
+
+def test_batches_faces_across_cameras():
+    service = FakeFaceService()
+    scheduler = InferenceScheduler(service, batch_window=0, max_batch_size=8)
+    results = []
+
+    for camera_id in ('CAM_001', 'CAM_002', 'CAM_003'):
+        scheduler.submit(camera_id, make_faces(2), lambda request, matches: results.append(request.camera_id))
+
+    scheduler._process(scheduler._take_batch())
+
+    assert service.batches == [6]
+    assert sorted(results) == ['CAM_001', 'CAM_002', 'CAM_003']
+
+
+def test_drops_oldest_frame_per_camera():
+    scheduler = InferenceScheduler(FakeFaceService(), max_pending=1)
+    first = scheduler.submit('CAM_001', make_faces(1), lambda request, matches: None)
+    latest = scheduler.submit('CAM_001', make_faces(1), lambda request, matches: None)
+
+    batch = scheduler._take_batch()
+
+    assert batch == [latest] and first not in batch
+    assert scheduler.stats()['cameras']['CAM_001']['dropped'] == 1
+
+
+def test_busy_camera_cannot_starve_others():
+    scheduler = InferenceScheduler(FakeFaceService(), max_batch_size=4, max_pending=5)
+    for _ in range(5):
+        scheduler.submit('BUSY', make_faces(4), lambda request, matches: None)
+    scheduler.submit('QUIET', make_faces(1), lambda request, matches: None)
+
+    served = [request.camera_id for _ in range(2) for request in scheduler._take_batch()]
+
+    assert 'QUIET' in served
+
+
+def test_thread_delivers_results():
+    scheduler = InferenceScheduler(FakeFaceService(), batch_window=0.01)
+    scheduler.start()
+    done = []
+    scheduler.submit('CAM_001', make_faces(1), lambda request, matches: done.append(matches))
+
+    deadline = time.time() + 2
+    while not done and time.time() < deadline:
+        time.sleep(0.01)
+    scheduler.stop()
+
+    assert done and done[0][0]['box'] == [0, 0, 1, 1]
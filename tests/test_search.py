@@ -0,0 +1,136 @@
+import importlib
+import sys
+import tempfile
+import types
+import numpy as np
+import pytest
+
+
+class FakeDeepFace:
+    """Records every call; answers are set per test"""
+
+    def __init__(self):
+        self.calls = []
+        self.faces = []
+        self.verified = {'verified': True, 'distance': 0.2}
+        self.batch_fails = False
+
+    def represent(self, **kwargs):
+        self.calls.append(('represent', kwargs))
+        crops = kwargs['img_path']
+        if isinstance(crops, list):
+            if self.batch_fails:
+                raise ValueError('this release takes one image at a time')
+            return [{'embedding': [float(crop.mean()), 1.0]} for crop in crops]
+        return [{'embedding': [float(crops.mean()), 1.0]}]
+
+    def extract_faces(self, **kwargs):
+        self.calls.append(('extract_faces', kwargs))
+        return self.faces
+
+    def verify(self, **kwargs):
+        self.calls.append(('verify', kwargs))
+        return self.verified
+
+
+@pytest.fixture
+def deepface(monkeypatch):
+    # DeepFace is heavy and not needed here: a stub module stands in when it is missing
+    try:
+        importlib.import_module('deepface')
+    except ImportError:
+        monkeypatch.setitem(sys.modules, 'deepface', types.SimpleNamespace(DeepFace=None))
+    search = importlib.import_module('app.services.search')
+
+    fake = FakeDeepFace()
+    monkeypatch.setattr(search, 'DeepFace', fake)
+
+    def no_temp_files(*args, **kwargs):
+        raise AssertionError('in-memory images must not go through a temp file')
+    monkeypatch.setattr(tempfile, 'NamedTemporaryFile', no_temp_files)
+    monkeypatch.setattr(tempfile, 'mkstemp', no_temp_files)
+    return fake
+
+
+@pytest.fixture
+def service(deepface):
+    from app.services.search import FaceSearchService
+    return FaceSearchService(model_name='Facenet512', distance_metric='cosine')
+
+
+def test_verify_face_in_image_takes_the_array_itself(service, deepface):
+    image = np.zeros((32, 32, 3), np.uint8)
+    deepface.faces = [{'confidence': 0.9}]
+
+    assert service.verify_face_in_image(image)
+    assert deepface.calls[0][1]['img_path'] is image
+
+    deepface.faces = []
+    assert not service.verify_face_in_image(image)
+
+
+def test_compare_faces_accepts_arrays(service, deepface):
+    a, b = np.zeros((32, 32, 3), np.uint8), np.ones((32, 32, 3), np.uint8)
+
+    assert service.compare_faces(a, b) == (True, 0.2)
+    name, kwargs = deepface.calls[0]
+    assert name == 'verify' and kwargs['img1_path'] is a and kwargs['img2_path'] is b
+
+
+def test_detect_faces_returns_bgr_uint8_crops_with_boxes(service, deepface):
+    rgb = np.zeros((4, 4, 3), np.float64)
+    rgb[..., 0] = 1.0  # pure red, as DeepFace returns it: RGB floats in [0, 1]
+    deepface.faces = [
+        {'face': rgb, 'facial_area': {'x': 1.0, 'y': 2, 'w': 30, 'h': 40}, 'confidence': 0.97},
+        # enforce_detection=False hands back the whole image with confidence 0 when nothing is found
+        {'face': rgb, 'facial_area': {'x': 0, 'y': 0, 'w': 320, 'h': 240}, 'confidence': 0}
+    ]
+
+    faces = service.detect_faces(np.zeros((240, 320, 3), np.uint8))
+
+    assert len(faces) == 1
+    face = faces[0]
+    assert face['box'] == [1, 2, 30, 40] and face['detector_confidence'] == 0.97
+    assert face['face'].dtype == np.uint8
+    assert face['face'][0, 0].tolist() == [0, 0, 255]
+
+
+def test_crops_are_embedded_in_one_batched_call(service, deepface):
+    crops = [np.full((8, 8, 3), value, np.uint8) for value in (10, 20, 30)]
+
+    embeddings = service.embed_faces(crops)
+
+    assert embeddings.dtype == np.float32 and embeddings[:, 0].tolist() == [10, 20, 30]
+    assert len(deepface.calls) == 1
+    kwargs = deepface.calls[0][1]
+    assert kwargs['detector_backend'] == 'skip' and len(kwargs['img_path']) == 3
+
+
+def test_embedding_falls_back_to_one_call_per_crop(service, deepface):
+    deepface.batch_fails = True
+    crops = [np.full((8, 8, 3), value, np.uint8) for value in (10, 20)]
+
+    assert service.embed_faces(crops)[:, 0].tolist() == [10, 20]
+    assert len(deepface.calls) == 3
+    assert all(not isinstance(kwargs['img_path'], list) for _, kwargs in deepface.calls[1:])
+    assert service.embed_faces([]).shape == (0, 0)
+
+
+def test_unmatched_faces_keep_their_embedding(service, deepface):
+    faces = [{'face': np.full((8, 8, 3), 50, np.uint8), 'box': [0, 0, 8, 8]}]
+
+    assert len(service.matcher) == 0
+    assert service.match_faces(faces) == []
+    assert faces[0]['embedding'].tolist() == [50, 1]
+
+
+def test_every_face_is_matched_in_one_search(service, deepface):
+    service.add_embedding('ann.jpg', [50.0, 1.0])
+    service.add_embedding('bob.jpg', [1.0, -50.0])
+    faces = [{'face': np.full((8, 8, 3), 50, np.uint8), 'box': [0, 0, 8, 8], 'track_id': 3},
+             {'face': np.full((8, 8, 3), 0, np.uint8), 'box': [20, 0, 8, 8]}]
+
+    matches = service.match_faces(faces, threshold=0.1)
+
+    assert [(m['photo_filename'], m['box'], m['track_id']) for m in matches] == [('ann.jpg', [0, 0, 8, 8], 3)]
+    assert all('embedding' in face for face in faces)
@@ -0,0 +1,68 @@
+import numpy as np
+from app.services.sightings import RetroSearch, SightingStore
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_append_and_search(tmp_path):
+    store = SightingStore(str(tmp_path), 'Facenet', 'opencv')
+    store.append('cam1', 'Gate', unit(1, 0, 0), [1, 2, 3, 4], timestamp=100.0)
+    store.append('cam2', 'Hall', unit(0, 1, 0), [5, 6, 7, 8], timestamp=110.0)
+    store.append('cam1', 'Gate', unit(1, 0.1, 0), [1, 2, 3, 4], timestamp=120.0)
+    store.close()
+
+    # Reopened from disk
+    store = SightingStore(str(tmp_path), 'Facenet', 'opencv')
+    assert len(store) == 3
+    records, distances = store.search(unit(1, 0, 0), threshold=0.1, chunk_size=2)
+    assert list(records['timestamp']) == [100.0, 120.0]
+    assert distances.max() < 0.1
+    assert store.cameras[int(records[0]['camera'])]['camera_id'] == 'cam1'
+
+
+def test_retro_search_groups_hits_into_detections(tmp_path):
+    store = SightingStore(str(tmp_path), 'Facenet', 'opencv')
+    for t in (0.0, 5.0, 10.0, 500.0):
+        store.append('cam1', 'Gate', unit(1, 0, 0), [1, 2, 3, 4], timestamp=1_700_000_000 + t)
+    store.append('cam2', 'Hall', unit(0, 0, 1), [1, 2, 3, 4], timestamp=1_700_000_000)
+
+    logged = []
+    retro = RetroSearch(store, 'cosine', threshold=0.3, window=60.0, on_detection=logged.append)
+    detections = retro.search('p1', 'Ann', unit(1, 0.05, 0))
+
+    assert [d['frame_count'] for d in detections] == [3, 1]
+    assert all(d['retrospective'] and d['person_id'] == 'p1' and d['camera_id'] == 'cam1' for d in detections)
+    assert logged == detections
+    assert retro.result('p1')['matches'] == 4
+
+
+def test_search_many_matches_search(tmp_path):
+    store = SightingStore(str(tmp_path), 'Facenet', 'opencv')
+    store.append('cam1', 'Gate', unit(1, 0, 0), [1, 2, 3, 4], timestamp=100.0)
+    store.append('cam2', 'Hall', unit(0, 1, 0), [5, 6, 7, 8], timestamp=110.0)
+
+    probes = [unit(1, 0, 0), unit(0, 1, 0), unit(0, 0, 1)]
+    found = store.search_many(probes, threshold=0.1, chunk_size=1)
+    assert [list(records['timestamp']) if len(records) else [] for records, _ in found] == [[100.0], [110.0], []]
+
+
+def test_repeated_retro_search_reuses_detection_ids(tmp_path):
+    store = SightingStore(str(tmp_path), 'Facenet', 'opencv')
+    for t in (0.0, 5.0, 500.0):
+        store.append('cam1', 'Gate', unit(1, 0, 0), [1, 2, 3, 4], timestamp=1_700_000_000 + t)
+
+    stored = {}
+    retro = RetroSearch(store, 'cosine', threshold=0.3, window=60.0,
+                        on_detection=lambda detection: stored.setdefault(detection['_id'], detection))
+    first = retro.search('p1', 'Ann', unit(1, 0.05, 0))
+    again = retro.search('p1', 'Ann', unit(1, 0.05, 0))
+    other = retro.search('p2', 'Bob', unit(1, 0.05, 0))
+
+    assert [d['_id'] for d in again] == [d['_id'] for d in first]
+    assert len({d['sighting_id'] for d in first}) == 2
+    # The same sightings matched for another person are that person's own detections
+    assert len(stored) == 4 and not {d['_id'] for d in other} & {d['_id'] for d in first}
+    assert first[0]['_id'].generation_time.timestamp() == 1_700_000_000
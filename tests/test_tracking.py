@@ -0,0 +1,41 @@
+from app.services.tracking import FaceTracker, box_iou
+
+
+def test_box_iou():
+    assert box_iou([0, 0, 10, 10], [0, 0, 10, 10]) == 1.0
+    assert box_iou([0, 0, 10, 10], [20, 20, 10, 10]) == 0.0
+    assert box_iou([0, 0, 10, 10], [5, 0, 10, 10]) == 50 / 150
+
+
+def test_tracks_follow_moving_faces():
+    tracker = FaceTracker(iou_threshold=0.3)
+    first = tracker.update([[0, 0, 50, 50], [200, 0, 50, 50]], now=0)
+    second = tracker.update([[205, 2, 50, 50], [5, 3, 50, 50]], now=1)
+
+    assert [t.track_id for t in second] == [first[1].track_id, first[0].track_id]
+    assert len(tracker.tracks) == 2
+
+
+def test_recognition_only_for_new_and_due_tracks():
+    tracker = FaceTracker(recheck_interval=5.0, unknown_recheck_interval=1.0)
+    track = tracker.update([[0, 0, 50, 50]], now=0)[0]
+    assert tracker.needs_recognition(track, now=0)
+
+    track.last_recognized = 0
+    assert not tracker.needs_recognition(track, now=0.5)
+    assert tracker.needs_recognition(track, now=1.0)
+
+    track.identity = {'person_id': 'abc'}
+    assert not tracker.needs_recognition(track, now=4.0)
+    assert tracker.needs_recognition(track, now=5.0)
+
+
+def test_lost_tracks_expire():
+    tracker = FaceTracker(max_missed=2)
+    tracker.update([[0, 0, 50, 50]], now=0)
+
+    for now in range(1, 4):
+        tracker.update([], now=now)
+
+    assert tracker.tracks == {}
+    assert tracker.update([[0, 0, 50, 50]], now=5)[0].track_id == 2
@@ -0,0 +1,110 @@
+import cv2
+import numpy as np
+from app.services.matcher import EmbeddingMatcher
+from app.services.video_search import VideoSearchJob, sample_frames
+
+
+class FakeFaceService:
+    """Sees 'ann' in bright frames"""
+
+    threshold = 0.3
+
+    def __init__(self):
+        self.matcher = EmbeddingMatcher('cosine')
+        self.matcher.add('ann.jpg', [1.0, 0.0])
+
+    def detect_faces(self, frame):
+        if frame.mean() < 128:
+            return []
+        return [{'face': frame[:10, :10], 'box': [10, 20, 30, 40]}]
+
+    def embed_faces(self, crops):
+        return np.asarray([[1.0, 0.05]] * len(crops), dtype=np.float32)
+
+
+def write_video(path, frames=50, fps=10):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), fps, (64, 48))
+    for i in range(frames):
+        # Bright between 2s and 3s
+        value = 255 if 20 <= i < 30 else 0
+        writer.write(np.full((48, 64, 3), value, np.uint8))
+    writer.release()
+
+
+def test_sample_frames_every_step(tmp_path):
+    video = tmp_path / 'clip.avi'
+    write_video(video)
+    assert [i for i, _ in sample_frames(str(video), 10, 30, 5)] == [10, 15, 20, 25]
+
+
+def test_job_builds_timeline(tmp_path):
+    video = tmp_path / 'clip.avi'
+    write_video(video)
+    persons = {'ann.jpg': {'_id': 'p1', 'name': 'Ann'}}
+
+    job = VideoSearchJob(str(video), sample_fps=2.0, workers=1)
+    job.run(FakeFaceService(), person_for=persons.get)
+
+    assert job.status == 'done'
+    assert job.frames_sampled == 10
+    assert [entry['offset'] for entry in job.timeline] == [2.0, 2.5]
+    assert job.timeline[0]['name'] == 'Ann' and job.timeline[0]['box'] == [10, 20, 30, 40]
+    assert job.summary() == [{'person_id': 'p1', 'name': 'Ann', 'hits': 2, 'first_seen': 2.0,
+                              'last_seen': 2.5, 'best_distance': job.timeline[0]['distance']}]
+
+
+class FakeManager:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, path, **options):
+        self.submitted.append((path, options))
+        return VideoSearchJob(path, **options)
+
+
+def test_api_caps_workers_and_marks_uploads_for_removal(tmp_path, monkeypatch):
+    import io
+    from flask import Flask
+    from app.api.v1 import api_bp
+    from app.services import video_search
+
+    manager = FakeManager()
+    monkeypatch.setattr(video_search, 'get_video_search_manager', lambda app: manager)
+    (tmp_path / 'cam1.avi').write_bytes(b'x')
+    app = Flask(__name__)
+    app.config.update(VIDEO_SEARCH_FOLDER=str(tmp_path), VIDEO_SEARCH_FPS=2.0, VIDEO_SEARCH_WORKERS=2)
+    app.register_blueprint(api_bp, url_prefix='/api/v1')
+    client = app.test_client()
+
+    assert client.post('/api/v1/search_video', json={'path': 'cam1.avi', 'workers': 500}).status_code == 202
+    assert client.post('/api/v1/search_video', json={'path': 'cam1.avi'}).status_code == 202
+    assert client.post('/api/v1/search_video', json={'path': 'cam1.avi', 'workers': 0}).status_code == 400
+    assert client.post('/api/v1/search_video', json={'path': 'cam1.avi', 'workers': -3}).status_code == 400
+    assert [options['workers'] for _, options in manager.submitted] == [2, 2]
+    assert not any(options.get('remove_video') for _, options in manager.submitted)
+
+    response = client.post('/api/v1/search_video', data={'video': (io.BytesIO(b'x'), 'upload.avi'), 'workers': '1'},
+                           content_type='multipart/form-data')
+    assert response.status_code == 202
+    path, options = manager.submitted[-1]
+    assert options['remove_video'] and options['workers'] == 1
+
+
+def test_uploaded_video_is_removed_even_when_the_job_fails(tmp_path, monkeypatch):
+    from flask import Flask
+    from app.services import video_search
+
+    def fail(app, job):
+        job.status = 'failed'
+        raise RuntimeError('face service unavailable')
+    monkeypatch.setattr(video_search, 'run_video_search', fail)
+    manager = video_search.VideoSearchManager(Flask(__name__))
+
+    uploaded, kept = tmp_path / 'upload.avi', tmp_path / 'cam1.avi'
+    uploaded.write_bytes(b'x')
+    kept.write_bytes(b'x')
+    manager.submit(str(uploaded), remove_video=True)
+    manager.submit(str(kept))
+    manager._executor.shutdown(wait=True)
+
+    assert not uploaded.exists() and kept.exists()
@@ -0,0 +1,61 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import numpy as np
+import pytest
+from app.services import workers
+from app.services.workers import ProcessInferenceBackend
+
+
+class StubFaceService:
+    """Reports the frame it received as a face box; a white pixel kills the worker"""
+
+    def detect_faces(self, frame):
+        if frame[0, 0, 0] == 255:
+            os._exit(1)
+        return [{'face': frame, 'box': [frame.shape[1], frame.shape[0], int(frame[0, 0, 0]), 1]}]
+
+    def embed_faces(self, crops):
+        return np.full((len(crops), 4), float(crops[0].mean()), dtype=np.float32)
+
+
+def init_stub(model_name, detector_backend, distance_metric):
+    workers._worker_service = StubFaceService()
+
+
+@pytest.fixture
+def backend():
+    backend = ProcessInferenceBackend('stub', 'stub', 'cosine', workers=1, initializer=init_stub)
+    yield backend
+    backend.shutdown()
+
+
+def test_frame_round_trips_through_shared_memory(backend):
+    frame = np.full((48, 64, 3), 7, dtype=np.uint8)
+    faces, embeddings = backend.analyze(frame)
+
+    assert faces == [{'box': [64, 48, 7, 1]}]
+    assert embeddings.tolist() == [[7.0] * 4]
+    # The block is reused for the next frame of the same size
+    backend.analyze(frame)
+    assert len(backend._frames._all) == 1
+
+
+def test_pool_is_rebuilt_after_a_worker_dies(backend):
+    with pytest.raises(BrokenProcessPool):
+        backend.analyze(np.full((8, 8, 3), 255, dtype=np.uint8))
+
+    faces, _ = backend.analyze(np.full((8, 8, 3), 3, dtype=np.uint8))
+    assert faces == [{'box': [8, 8, 3, 1]}]
+    assert backend.restarts == 1
+
+
+def test_shutdown_unlinks_shared_memory(backend):
+    backend.analyze(np.zeros((8, 8, 3), dtype=np.uint8))
+    names = [block.name for block in backend._frames._all]
+
+    backend.shutdown()
+    backend.shutdown()
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)